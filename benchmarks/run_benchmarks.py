@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Data-Processing Benchmarks
+Function: Time the offline scripts on synthetic inputs at realistic scale and fail
+when a change makes them slower or hungrier than the recorded baseline
+
+Benchmarks:
+    canonicalize        convert_smiles.convert_compound over the SMILES input (needs RDKit)
+    extract             extract_cytotoxicity.py, full extraction over all CID files
+    extract_incremental extract_cytotoxicity.py --incremental with nothing changed
+    log_parse           retry_failed.parse_log_file over the processing log
+    failed_detection    retry_failed.identify_failed_compounds (log + results + input)
+
+Synthetic data is generated once per scale into --data-dir and reused. Each
+benchmark runs in its own process; wall time, throughput and peak resident
+memory are recorded. Baselines are machine-specific: record one with
+--update-baseline on the machine that runs the comparison. A comparison run
+exits non-zero on any regression, and also when no benchmark could be
+compared (no baseline for the scale, or every benchmark skipped).
+
+Scales:
+    full    1,000,000 SMILES rows, 100,000 CID files, 2 GB processing log
+    quick   10,000 SMILES rows, 1,000 CID files, 20 MB processing log
+
+Usage:
+    python3 benchmarks/run_benchmarks.py [--scale full|quick] [--only NAME ...] [--repeat N]
+                                         [--update-baseline] [--tolerance 0.25] [--baseline FILE]
+
+Examples:
+    python3 benchmarks/run_benchmarks.py --scale quick --update-baseline   # Record a baseline
+    python3 benchmarks/run_benchmarks.py --scale quick                     # Compare against it
+    python3 -m pytest tests/test_benchmarks.py -m slow                     # Quick scale from pytest
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import subprocess
+from contextlib import redirect_stdout
+from multiprocessing import Pool
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / 'src'))
+sys.path.insert(0, str(BENCH_DIR.parent))
+import config
+
+BASELINE_FILE = BENCH_DIR / 'baseline.json'
+DEFAULT_DATA_DIR = BENCH_DIR / 'data'
+DEFAULT_TOLERANCE = 0.25  # Allowed slowdown / memory growth over the baseline (fraction)
+NOISE_FLOOR = {'seconds': 0.05, 'peak_rss_mb': 5}  # Smaller absolute differences are never regressions
+
+SCALES = {
+    'full': {'smiles_rows': 1000000, 'cid_files': 100000, 'log_bytes': 2 * 1024 ** 3},
+    'quick': {'smiles_rows': 10000, 'cid_files': 1000, 'log_bytes': 20 * 1024 ** 2},
+}
+
+# Fragments that can be joined in any order into a valid SMILES chain; every
+# chain starts with a carbon scaffold so the default pre-screen accepts it
+SCAFFOLD_FRAGMENTS = ['C', 'CC', 'C(C)', 'c1ccccc1']
+CHAIN_FRAGMENTS = ['C', 'CC', 'C(C)', 'C(=O)', 'O', 'N', 'C(F)', 'c1ccccc1', 'C(Cl)', 'S']
+TERMINAL_FRAGMENTS = ['C', 'O', 'N', 'F', 'Cl', 'C(=O)O', 'C#N']
+
+REPORT_HEADER = ['Classification', 'Target', 'Shorthand', 'Prediction', 'Probability']
+REPORT_MODELS = [
+    ('Organ toxicity', 'Hepatotoxicity', 'dili'),
+    ('Organ toxicity', 'Neurotoxicity', 'neuro'),
+    ('Organ toxicity', 'Nephrotoxicity', 'nephro'),
+    ('Organ toxicity', 'Respiratory toxicity', 'respi'),
+    ('Organ toxicity', 'Cardiotoxicity', 'cardio'),
+    ('Toxicity end points', 'Carcinogenicity', 'carcino'),
+    ('Toxicity end points', 'Immunotoxicity', 'immuno'),
+    ('Toxicity end points', 'Mutagenicity', 'mutagen'),
+    ('Toxicity end points', 'Cytotoxicity', 'cyto'),
+    ('Toxicity end points', 'BBB-barrier', 'bbb'),
+    ('Toxicity end points', 'Ecotoxicity', 'eco'),
+    ('Toxicity end points', 'Clinical toxicity', 'clinical'),
+    ('Toxicity end points', 'Nutritional toxicity', 'nutri'),
+] + [('Tox21-Nuclear receptor signalling pathways', f'Receptor {i}', f'nr_{i}') for i in range(12)] \
+  + [('Tox21-Stress response pathways', f'Stress response {i}', f'sr_{i}') for i in range(6)] \
+  + [('Molecular Initiating Events', f'Event {i}', f'mie_{i}') for i in range(15)] \
+  + [('Metabolism', f'Cytochrome {name}', name) for name in ['CYP1A2', 'CYP2C19', 'CYP2C9', 'CYP2D6', 'CYP3A4', 'CYP2E1']]
+
+FIRST_ID = 1000  # PubChem_ID of the first synthetic compound
+DATA_VERSION = 2  # Bump when the generator changes so stale data is regenerated
+
+
+# ----------------------------------------------------------------------
+# Synthetic data
+# ----------------------------------------------------------------------
+
+def synthetic_smiles(rng):
+    """Random valid SMILES of 3-12 fragments, starting with a carbon scaffold"""
+    parts = [rng.choice(SCAFFOLD_FRAGMENTS)] + [rng.choice(CHAIN_FRAGMENTS) for _ in range(rng.randint(1, 10))]
+    return ''.join(parts) + rng.choice(TERMINAL_FRAGMENTS)
+
+
+def write_smiles_files(data_dir, rows, rng):
+    """Write the raw input (PubChem_ID,SMILES) and canonical input files"""
+    with open(data_dir / 'input.csv', 'w', newline='', encoding='utf-8') as raw, \
+            open(data_dir / 'canonical_smiles.csv', 'w', newline='', encoding='utf-8') as canonical:
+        raw_writer = csv.writer(raw)
+        canonical_writer = csv.writer(canonical)
+        raw_writer.writerow(['PubChem_ID', 'SMILES'])
+        canonical_writer.writerow(['PubChem_ID', 'Original_SMILES', 'Canonical_SMILES'])
+        for pubchem_id in range(FIRST_ID, FIRST_ID + rows):
+            smiles = synthetic_smiles(rng)
+            raw_writer.writerow([pubchem_id, smiles])
+            canonical_writer.writerow([pubchem_id, smiles, smiles])
+
+
+def write_results_dir(results_dir, files, rng):
+    """Write CID_*.csv reports; about 5% lack the Cytotoxicity row"""
+    results_dir.mkdir(parents=True, exist_ok=True)
+    for pubchem_id in range(FIRST_ID, FIRST_ID + files):
+        with open(results_dir / f"CID_{pubchem_id}.csv", 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(REPORT_HEADER)
+            drop_cyto = rng.random() < 0.05
+            for classification, target, shorthand in REPORT_MODELS:
+                if drop_cyto and shorthand == 'cyto':
+                    continue
+                probability = rng.random()
+                writer.writerow([classification, target, shorthand,
+                                 'Active' if probability > 0.7 else 'Inactive', f"{probability:.2f}"])
+
+
+def write_processing_log(log_file, target_bytes, compounds, rng):
+    """Write a processing log in the format of protox_full_automation.log_message"""
+    written = 0
+    pubchem_id = FIRST_ID
+    started = time.mktime((2026, 1, 1, 0, 0, 0, 0, 0, -1))
+    with open(log_file, 'w', encoding='utf-8') as f:
+        while written < target_bytes:
+            stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started + pubchem_id * 90))
+            lines = [
+                f"[{stamp}] Processing compound: PubChem_ID={pubchem_id}",
+                f"[{stamp}]   Navigating to {config.PROTOX_INPUT_URL}",
+                f"[{stamp}]   Page loaded in 1.2s (warm, 17/18 assets from cache)",
+                f"[{stamp}]   Filling SMILES input field...",
+                f"[{stamp}]   Clicking start button...",
+            ]
+            lines += [f"[{stamp}]   Waiting... ({seconds}s elapsed)" for seconds in range(10, rng.randint(20, 200), 10)]
+            if rng.random() < 0.1:
+                lines.append(f"[{stamp}] ✗ Compound {pubchem_id} processing failed (timeout)")
+            else:
+                lines.append(f"[{stamp}] ✓ Compound {pubchem_id} processed successfully")
+            block = '\n'.join(lines) + '\n'
+            f.write(block)
+            written += len(block.encode('utf-8'))
+            pubchem_id = FIRST_ID + (pubchem_id - FIRST_ID + 1) % compounds
+
+
+def prepare_data(data_dir, scale):
+    """Generate the synthetic inputs of a scale unless they already exist"""
+    sizes = SCALES[scale]
+    data_dir = Path(data_dir) / scale
+    marker = data_dir / 'sizes.json'
+    if marker.exists() and json.loads(marker.read_text()) == dict(sizes, version=DATA_VERSION):
+        return data_dir
+
+    data_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(42)
+    print(f"Generating {scale} synthetic data in {data_dir}")
+    started = time.time()
+    write_smiles_files(data_dir, sizes['smiles_rows'], rng)
+    print(f"  ✓ {sizes['smiles_rows']} SMILES rows")
+    write_results_dir(data_dir / 'results', sizes['cid_files'], rng)
+    print(f"  ✓ {sizes['cid_files']} CID files")
+    write_processing_log(data_dir / 'processing_log.txt', sizes['log_bytes'], sizes['smiles_rows'], rng)
+    print(f"  ✓ {sizes['log_bytes'] / 1024 ** 2:.0f} MB processing log")
+    marker.write_text(json.dumps(dict(sizes, version=DATA_VERSION)))
+    print(f"  Generated in {time.time() - started:.1f}s")
+    print()
+    return data_dir
+
+
+# ----------------------------------------------------------------------
+# Benchmarks (each runs in its own process and returns the item count)
+# ----------------------------------------------------------------------
+
+def bench_canonicalize(data_dir):
+    from convert_smiles import convert_compound
+    with open(data_dir / 'input.csv', 'r', encoding='utf-8') as f:
+        tasks = [(row, False) for row in csv.DictReader(f)]
+    with Pool(config.CONVERT_WORKERS) as pool:
+        outcomes = list(pool.imap(convert_compound, tasks, chunksize=64))
+    failed = [outcome for outcome in outcomes if outcome['status'] != 'converted']
+    if failed:
+        raise RuntimeError(f"{len(failed)} synthetic SMILES did not convert, e.g. {failed[0]}")
+    return len(tasks)
+
+
+def _point_extract_at(data_dir):
+    import extract_cytotoxicity
+    extract_cytotoxicity.RESULT_DIR = str(data_dir / 'results')
+    extract_cytotoxicity.OUTPUT_FILE = str(data_dir / 'cytotoxicity_summary.csv')
+    extract_cytotoxicity.MANIFEST_FILE = str(data_dir / '.summary_manifest.json')
+    return extract_cytotoxicity
+
+
+def bench_extract(data_dir):
+    extract_cytotoxicity = _point_extract_at(data_dir)
+    extract_cytotoxicity.extract_cytotoxicity(incremental=False)
+    return SCALES[data_dir.name]['cid_files']
+
+
+def bench_extract_incremental(data_dir):
+    extract_cytotoxicity = _point_extract_at(data_dir)
+    if not os.path.exists(extract_cytotoxicity.MANIFEST_FILE):
+        extract_cytotoxicity.extract_cytotoxicity(incremental=False)
+    # Only the no-op rescan is timed, not the full extraction that seeds it
+    started = time.perf_counter()
+    extract_cytotoxicity.extract_cytotoxicity(incremental=True)
+    return SCALES[data_dir.name]['cid_files'], time.perf_counter() - started
+
+
+def bench_log_parse(data_dir):
+    from retry_failed import parse_log_file
+    parse_log_file(str(data_dir / 'processing_log.txt'))
+    return os.path.getsize(data_dir / 'processing_log.txt') // (1024 * 1024)
+
+
+def bench_failed_detection(data_dir):
+    config.PROCESSING_LOG_FILE = str(data_dir / 'processing_log.txt')
+    config.RESULTS_DIR = str(data_dir / 'results')
+    config.CANONICAL_SMILES_FILE = str(data_dir / 'canonical_smiles.csv')
+    from retry_failed import identify_failed_compounds
+    identify_failed_compounds()
+    return SCALES[data_dir.name]['smiles_rows']
+
+
+BENCHMARKS = {
+    'canonicalize': (bench_canonicalize, 'rows/s'),
+    'extract': (bench_extract, 'files/s'),
+    'extract_incremental': (bench_extract_incremental, 'files/s'),
+    'log_parse': (bench_log_parse, 'MB/s'),
+    'failed_detection': (bench_failed_detection, 'rows/s'),
+}
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process and its children (MB)"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024  # Bytes on macOS, KB on Linux
+    return max(own, children) / scale
+
+
+def run_one(name, data_dir):
+    """Run one benchmark in this process and print its measurement as JSON"""
+    function, unit = BENCHMARKS[name]
+    started = time.perf_counter()
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            items = function(Path(data_dir))
+    except ImportError as e:
+        print(json.dumps({'skipped': f"missing dependency: {e.name}"}))
+        return
+    seconds = time.perf_counter() - started
+    if isinstance(items, tuple):  # (items, seconds) of the timed part only
+        items, seconds = items
+    print(json.dumps({
+        'seconds': round(seconds, 3),
+        'items': items,
+        'throughput': round(items / seconds, 1) if seconds else None,
+        'unit': unit,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }))
+
+
+def measure(name, data_dir, repeat=1):
+    """Run one benchmark in a fresh process per repetition and keep the fastest run"""
+    best = None
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, __file__, '--run-one', name, '--data-dir', str(data_dir)],
+            capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else
+                    f"exit code {completed.returncode}"}
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        if 'skipped' in result:
+            return result
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+# ----------------------------------------------------------------------
+# Baseline comparison
+# ----------------------------------------------------------------------
+
+def load_baseline(baseline_file=BASELINE_FILE):
+    if not Path(baseline_file).exists():
+        return {}
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(baseline, baseline_file=BASELINE_FILE):
+    temp_file = str(baseline_file) + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+    os.replace(temp_file, baseline_file)
+
+
+def compare(result, reference, tolerance):
+    """
+    Compare a measurement with its baseline
+
+    Returns:
+        list: Regression messages (empty if within tolerance)
+    """
+    regressions = []
+    for key, label in (('seconds', 'time'), ('peak_rss_mb', 'peak memory')):
+        if (reference.get(key) and result[key] > reference[key] * (1 + tolerance)
+                and result[key] - reference[key] > NOISE_FLOOR[key]):
+            regressions.append(f"{label} {result[key]} vs baseline {reference[key]} "
+                               f"(+{(result[key] / reference[key] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Benchmark the data-processing scripts')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='full',
+                        help='Synthetic data size (default: full)')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=None,
+                        help='Benchmarks to run (default: all)')
+    parser.add_argument('--data-dir', default=str(DEFAULT_DATA_DIR),
+                        help='Directory for generated data (default: benchmarks/data)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'Allowed regression as a fraction of the baseline (default: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Runs per benchmark; the fastest is kept (default: 1)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Record these measurements as the new baseline')
+    parser.add_argument('--baseline', default=str(BASELINE_FILE),
+                        help='Baseline file (default: benchmarks/baseline.json)')
+    parser.add_argument('--run-one', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        run_one(args.run_one, args.data_dir)
+        return
+
+    data_dir = prepare_data(args.data_dir, args.scale)
+    baseline = load_baseline(args.baseline)
+    scale_baseline = baseline.get(args.scale, {})
+
+    print("=" * 60)
+    print(f"Benchmarks ({args.scale} scale, tolerance {args.tolerance * 100:.0f}%)")
+    print("=" * 60)
+
+    results = {}
+    failures = []
+    compared, uncompared = [], []
+    for name in args.only or list(BENCHMARKS):
+        result = measure(name, data_dir, max(1, args.repeat))
+        if 'error' in result:
+            print(f"✗ {name}: {result['error']}")
+            failures.append(name)
+            continue
+        if 'skipped' in result:
+            print(f"⚠ {name}: skipped ({result['skipped']})")
+            uncompared.append(name)
+            continue
+        results[name] = result
+        print(f"{name}: {result['seconds']:.2f}s, {result['throughput']} {result['unit']}, "
+              f"peak {result['peak_rss_mb']:.0f} MB")
+        if args.update_baseline:
+            continue
+        if name not in scale_baseline:
+            print("  ⚠ No baseline to compare with")
+            uncompared.append(name)
+            continue
+        compared.append(name)
+        regressions = compare(result, scale_baseline[name], args.tolerance)
+        for message in regressions:
+            print(f"  ✗ Regression: {message}")
+        if regressions:
+            failures.append(name)
+
+    print("=" * 60)
+    if args.update_baseline:
+        scale_baseline.update(results)
+        baseline[args.scale] = scale_baseline
+        save_baseline(baseline, args.baseline)
+        print(f"✓ Baseline updated: {args.baseline}")
+    elif not scale_baseline:
+        print(f"⚠ No {args.scale} baseline yet; record one with --update-baseline")
+
+    if failures:
+        print(f"✗ {len(failures)} benchmark(s) failed: {', '.join(failures)}")
+        sys.exit(1)
+    if args.update_baseline:
+        return
+    if uncompared:
+        print(f"⚠ Not compared: {', '.join(uncompared)}")
+    if not compared:
+        print("✗ No benchmark was compared against a baseline")
+        sys.exit(1)
+    print(f"✓ {len(compared)} benchmark(s) within tolerance")
+
+
+if __name__ == "__main__":
+    main()
@@ -27,7 +27,41 @@ LOGS_DIR = os.path.join(BASE_DIR, 'logs')
 INPUT_FILE = os.path.join(DATA_DIR, 'input.csv')
 CANONICAL_SMILES_FILE = os.path.join(DATA_DIR, 'canonical_smiles.csv')
 CYTOTOXICITY_SUMMARY_FILE = os.path.join(RESULTS_DIR, 'cytotoxicity_summary.csv')
+SUMMARY_MANIFEST_FILE = os.path.join(RESULTS_DIR, '.summary_manifest.json')  # Files already in the summary
 PROCESSING_LOG_FILE = os.path.join(LOGS_DIR, 'processing_log.txt')
+PREDICTION_STORE_FILE = os.path.join(RESULTS_DIR, 'prediction_store.npz')  # Columnar store of all predictions
+QUERY_INDEX_FILE = os.path.join(RESULTS_DIR, 'query_index.npz')  # Secondary indexes for query_predictions.py
+SIMILARITY_INDEX_FILE = os.path.join(RESULTS_DIR, 'similarity_index.npz')  # Built by similarity_index.py
+DURATION_HISTORY_FILE = os.path.join(LOGS_DIR, 'prediction_durations.csv')  # Per-compound prediction times
+SHARDS_DIR = os.path.join(DATA_DIR, 'shards')  # Worker input files written by cost_model.py plan
+
+# Structure standardization (convert_smiles.py)
+# When enabled, salts/solvents are stripped, charges neutralized and tautomers
+# canonicalized before submission. Compounds with the same standardized
+# InChIKey are submitted once; the others are listed in DUPLICATES_FILE and
+# receive a copy of the representative's result.
+STANDARDIZE_STRUCTURES = False
+CONVERT_WORKERS = os.cpu_count() or 1  # Processes used for conversion
+DUPLICATES_FILE = os.path.join(DATA_DIR, 'duplicate_compounds.csv')
+RESULT_INDEX_FILE = os.path.join(RESULTS_DIR, 'inchikey_index.csv')  # InChIKey -> PubChem_ID of stored results
+
+# Pre-screen settings (prescreen.py, convert_smiles.py)
+# Compounds breaking these rules are written to REJECTED_COMPOUNDS_FILE with a
+# reason and never submitted to the ProTox-3 server.
+PRESCREEN_ENABLED = True
+PRESCREEN_ALLOWED_ELEMENTS = ['H', 'B', 'C', 'N', 'O', 'F', 'Si', 'P', 'S', 'Cl', 'Se', 'Br', 'I']
+PRESCREEN_MIN_HEAVY_ATOMS = 2
+PRESCREEN_MAX_HEAVY_ATOMS = 150
+PRESCREEN_MAX_AMIDE_BONDS = 15  # Rejects large peptides
+PRESCREEN_REQUIRE_CARBON = True  # Rejects inorganic compounds
+REJECTED_COMPOUNDS_FILE = os.path.join(DATA_DIR, 'rejected_compounds.csv')
+
+# Raw results-page archive (results_archive.py)
+# Every results page is stored gzip-compressed and content-addressed so any
+# field can be re-extracted later without re-running the prediction.
+ARCHIVE_RESULTS_PAGES = True
+RESULTS_ARCHIVE_DIR = os.path.join(RESULTS_DIR, 'archive')
+RESULTS_ARCHIVE_INDEX_FILE = os.path.join(RESULTS_ARCHIVE_DIR, 'index.csv')
 
 # ProTox-3 website configuration
 PROTOX_BASE_URL = 'http://tox.charite.de/protox3'
@@ -44,10 +78,89 @@ RETRY_TIMES = 3      # Number of retry attempts on failure
                      #   - 3rd attempt fails → mark as failed
                      # Increase for unstable connections, decrease for stable ones
 
+RESULT_POLL_INTERVAL = 30  # Seconds between checks of the results page
+
+# Early-failure detection
+# While waiting for results, the visible page text (not the HTML source) is
+# checked for these signatures (case-insensitive substrings). A match aborts
+# the wait immediately and the failure is logged with the matching reason
+# instead of waiting MAX_WAIT_TIME. Keep signatures specific: generic phrases
+# can appear in ordinary page text and abort predictions that would succeed.
+FAILURE_SIGNATURES = {
+    'invalid_smiles': ['invalid smiles', 'not a valid smiles', 'smiles could not be'],
+    'server_error': ['internal server error', 'bad gateway', 'service unavailable'],
+    'maintenance': ['under maintenance', 'maintenance mode'],
+    'empty_result': ['no results found', 'no prediction available'],
+}
+# Failure reasons that retrying cannot fix (the compound is not retried)
+NON_RETRYABLE_FAILURES = ['invalid_smiles', 'empty_result']
+
+# Adaptive timeout settings
+# When enabled, the wait ceiling for each compound is a high quantile of past
+# completion times for molecules of similar size, instead of MAX_WAIT_TIME.
+# MAX_WAIT_TIME is still used until enough history has been recorded.
+ADAPTIVE_TIMEOUT = True
+ADAPTIVE_TIMEOUT_QUANTILE = 0.95    # Quantile of similar-size completion times
+ADAPTIVE_TIMEOUT_MARGIN = 1.5       # Multiplier applied to the quantile
+ADAPTIVE_TIMEOUT_FLOOR = 300        # Never wait less than this (seconds)
+ADAPTIVE_TIMEOUT_CAP = 1800         # Never wait more than this (seconds)
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = 20   # Successful runs needed before adapting
+
+# ProTox-3 API quota settings (protox3_api.py, api_scheduler.py)
+API_MAX_QUERIES_PER_DAY = 250  # Daily query limit enforced by the ProTox-3 API
+API_QUOTA_LEDGER_FILE = os.path.join(LOGS_DIR, 'api_quota_ledger.json')  # Shared by all processes on this host
+API_SCHEDULER_QUEUE_FILE = os.path.join(DATA_DIR, 'api_job_queue.csv')  # Persistent job queue for api_scheduler.py
+API_SCHEDULER_RESULTS_FILE = os.path.join(RESULTS_DIR, 'api_scheduler_results.csv')
+
+# Streaming pipeline settings (pipeline.py)
+PIPELINE_WORKERS = 1      # Prediction workers, each with its own browser
+PIPELINE_QUEUE_SIZE = 4   # Compounds buffered between stages (backpressure)
+
+# Live run status (run_status.py)
+# Running jobs publish progress, throughput and ETA to RUN_STATUS_FILE and to
+# http://127.0.0.1:RUN_STATUS_PORT/status
+RUN_STATUS_FILE = os.path.join(LOGS_DIR, 'run_status.json')
+RUN_STATUS_PORT = 8765          # Set to 0 to disable the HTTP endpoint
+RUN_STATUS_RATE_WINDOW = 3600   # Window for the rolling compounds/hour rate (seconds)
+
+# Background report writing (result_writer.py)
+# Results pages are parsed and CID_*.csv reports written by a thread pool so
+# the browser can submit the next compound immediately
+RESULT_WRITER_WORKERS = 2
+
+# In-flight jobs (inflight_jobs.py)
+# The results URL and cookies of every submitted job are kept here until its
+# wait ends, so a restarted worker can reattach instead of resubmitting
+INFLIGHT_JOBS_FILE = os.path.join(LOGS_DIR, 'inflight_jobs.json')
+
+# Prediction daemon (prediction_daemon.py)
+# Warm browsers serving ad hoc jobs at http://127.0.0.1:DAEMON_PORT/jobs
+DAEMON_WORKERS = 2
+DAEMON_PORT = 8766
+DAEMON_JOB_TTL = 24 * 3600  # Finished jobs are forgotten after this many seconds
+
+# Offline name resolution (name_cache.py)
+# Compound names found here are submitted to the ProTox-3 API as SMILES
+NAME_CACHE_ENABLED = True
+NAME_CACHE_FILE = os.path.join(DATA_DIR, 'name_cache.sqlite')
+# A batch mixing cached and uncached names costs two API requests; split it
+# only when at least this fraction of its names is cached
+NAME_CACHE_MIN_SPLIT_FRACTION = 0.5
+
 # Browser settings
 HEADLESS_MODE = True  # Set to False to see browser window
 BROWSER_TIMEOUT = 30  # Browser operation timeout (seconds)
 
+# Persistent browser profiles (protox_full_automation.py, pipeline.py)
+# When enabled, each worker keeps its own Chrome user-data directory with an
+# HTTP disk cache, so the input page's scripts, styles and images are fetched
+# once instead of on every browser start. A warm-up navigation runs right
+# after the browser starts.
+BROWSER_PROFILE_ENABLED = False
+BROWSER_PROFILE_DIR = os.path.join(BASE_DIR, 'browser_profiles')  # One worker_<N> directory per worker
+BROWSER_DISK_CACHE_SIZE = 512 * 1024 * 1024  # Disk cache limit per profile (bytes)
+BROWSER_WARMUP = True  # Load the input page once when a profiled browser starts
+
 # Debug settings
 DEBUG_MODE = False  # Set to True to enable debug screenshots and verbose logging
 DEBUG_SCREENSHOT_DIR = os.path.join(RESULTS_DIR, 'debug_screenshots')  # Directory for debug screenshots
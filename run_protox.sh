@@ -3,9 +3,9 @@
 # ProTox-3 Complete Automation Script
 # This script handles the entire workflow:
 # 1. Check/prepare input data
-# 2. Convert SMILES to Canonical format
-# 3. Run toxicity predictions
-# 4. Extract and aggregate results
+# 2. Run the streaming pipeline (src/pipeline.py): SMILES conversion,
+#    toxicity predictions and result aggregation run concurrently, so the
+#    summary file grows while predictions are still running
 #
 # Usage: bash run_protox.sh [start] [end]
 # Example: bash run_protox.sh 0 10
@@ -42,11 +42,12 @@ LOGS_DIR=$(get_config "LOGS_DIR")
 INPUT_CSV=$(get_config "INPUT_FILE")
 CANONICAL_CSV=$(get_config "CANONICAL_SMILES_FILE")
 SUMMARY_CSV=$(get_config "CYTOTOXICITY_SUMMARY_FILE")
+STATUS_PORT=$(get_config "RUN_STATUS_PORT")
 
 # Script paths
-CONVERT_SCRIPT="$SCRIPT_DIR/src/convert_smiles.py"
-PROTOX_SCRIPT="$SCRIPT_DIR/src/protox_full_automation.py"
-EXTRACT_SCRIPT="$SCRIPT_DIR/src/extract_cytotoxicity.py"
+PIPELINE_SCRIPT="$SCRIPT_DIR/src/pipeline.py"
+STATUS_SCRIPT="$SCRIPT_DIR/src/run_status.py"
+STATS_SCRIPT="$SCRIPT_DIR/src/prediction_stats.py"
 
 # Functions: Print colored messages
 print_info() {
@@ -154,102 +155,49 @@ check_input_data() {
     echo ""
 }
 
-# Convert SMILES to Canonical format
-convert_smiles() {
-    print_step "Step 3: Converting SMILES to Canonical format"
-    
-    print_info "Output file: $CANONICAL_CSV"
-    
-    if [ -f "$CANONICAL_CSV" ]; then
-        print_info "Canonical SMILES file already exists, using it"
-        print_info "To regenerate, delete $CANONICAL_CSV and run again"
-        echo ""
-        return
-    fi
-    
-    print_info "Running SMILES conversion..."
-    python3 "$CONVERT_SCRIPT" "$INPUT_CSV" "$CANONICAL_CSV"
-    
-    if [ -f "$CANONICAL_CSV" ]; then
-        print_success "SMILES conversion completed"
-        CONVERTED_COMPOUNDS=$(($(wc -l < "$CANONICAL_CSV") - 1))
-        print_info "Successfully converted: $CONVERTED_COMPOUNDS compounds"
-    else
-        print_error "SMILES conversion failed"
-        exit 1
-    fi
-    echo ""
-}
-
-# Run toxicity predictions
-run_predictions() {
+# Run the streaming pipeline: convert -> predict -> aggregate
+run_pipeline() {
     local START_IDX=$1
     local END_IDX=$2
     
-    print_step "Step 4: Running toxicity predictions"
+    print_step "Step 3: Running streaming pipeline (convert → predict → aggregate)"
     
+    print_info "Canonical SMILES: $CANONICAL_CSV"
     print_info "Results will be saved to: $RESULTS_DIR"
+    print_info "Summary (updated live): $SUMMARY_CSV"
     print_info "Processing log: $LOGS_DIR/processing_log.txt"
     
     # Determine processing range
     if [ -z "$END_IDX" ]; then
-        TOTAL_TO_PROCESS=$((CONVERTED_COMPOUNDS - START_IDX))
-        print_info "Processing range: From compound $START_IDX to end (total: $TOTAL_TO_PROCESS compounds)"
+        TOTAL_TO_PROCESS=$((TOTAL_COMPOUNDS - START_IDX))
+        print_info "Processing range: From compound $START_IDX to end (up to $TOTAL_TO_PROCESS compounds)"
     else
         TOTAL_TO_PROCESS=$((END_IDX - START_IDX))
         print_info "Processing range: From compound $START_IDX to $END_IDX (total: $TOTAL_TO_PROCESS compounds)"
     fi
     
-    # Estimate time
-    MIN_TIME=$(( TOTAL_TO_PROCESS * 5 / 60 ))
-    MAX_TIME=$(( TOTAL_TO_PROCESS * 10 / 60 ))
-    
+    # Estimate time from measured durations (static guess until some exist)
     echo ""
-    print_info "Estimated processing time: $MIN_TIME - $MAX_TIME hours"
-    print_info "Each compound takes approximately 5-10 minutes"
-    echo ""
-    print_info "Starting toxicity predictions..."
-    print_info "You can monitor progress in: $LOGS_DIR/processing_log.txt"
-    echo ""
-    
-    # Run prediction script
-    if [ -z "$END_IDX" ]; then
-        python3 "$PROTOX_SCRIPT" "$START_IDX"
+    if ESTIMATE=$(python3 "$STATUS_SCRIPT" estimate "$TOTAL_TO_PROCESS" 2>/dev/null) && [[ "$ESTIMATE" == *hours* ]]; then
+        print_info "Estimated processing time: $ESTIMATE"
     else
-        python3 "$PROTOX_SCRIPT" "$START_IDX" "$END_IDX"
+        MIN_TIME=$(( TOTAL_TO_PROCESS * 5 / 60 ))
+        MAX_TIME=$(( TOTAL_TO_PROCESS * 10 / 60 ))
+        print_info "Estimated processing time: $MIN_TIME - $MAX_TIME hours (single worker)"
+        print_info "Each compound takes approximately 5-10 minutes"
     fi
-    
-    print_success "Toxicity predictions completed"
+    print_info "Live status: http://127.0.0.1:$STATUS_PORT/status (or: python3 src/run_status.py --watch 60)"
+    print_info "Compounds that already have results are skipped, so the run can be resumed"
+    print_info "Press Ctrl+C once to stop after the compounds in progress"
     echo ""
-}
-
-# Extract and aggregate results
-extract_results() {
-    print_step "Step 5: Extracting and aggregating results"
-    
-    # Check if there are any result files
-    RESULT_COUNT=$(ls "$RESULTS_DIR"/CID_*.csv 2>/dev/null | wc -l)
-    
-    if [ "$RESULT_COUNT" -eq 0 ]; then
-        print_warning "No result files found in $RESULTS_DIR"
-        print_info "Skipping result extraction"
-        echo ""
-        return
-    fi
-    
-    print_info "Found $RESULT_COUNT result files"
-    print_info "Extracting Cytotoxicity data..."
-    
-    python3 "$EXTRACT_SCRIPT"
     
-    if [ -f "$SUMMARY_CSV" ]; then
-        print_success "Results extracted and aggregated"
-        SUMMARY_COUNT=$(($(wc -l < "$SUMMARY_CSV") - 1))
-        print_info "Total compounds in summary: $SUMMARY_COUNT"
-        print_info "Summary file: $SUMMARY_CSV"
+    if [ -z "$END_IDX" ]; then
+        python3 "$PIPELINE_SCRIPT" "$START_IDX"
     else
-        print_warning "Summary file not created"
+        python3 "$PIPELINE_SCRIPT" "$START_IDX" "$END_IDX"
     fi
+    
+    print_success "Pipeline completed"
     echo ""
 }
 
@@ -273,17 +221,21 @@ display_results() {
         echo ""
         
         # Display cytotoxicity statistics
-        if command -v awk &> /dev/null; then
+        print_info "Cytotoxicity Statistics:"
+        if ! python3 "$STATS_SCRIPT" summary "$SUMMARY_CSV" 2>/dev/null; then
+            # NumPy not available: count with awk
             ACTIVE_COUNT=$(awk -F',' 'NR>1 && $5=="Active" {count++} END {print count+0}' "$SUMMARY_CSV")
             INACTIVE_COUNT=$(awk -F',' 'NR>1 && $5=="Inactive" {count++} END {print count+0}' "$SUMMARY_CSV")
             TOTAL_COUNT=$(($(wc -l < "$SUMMARY_CSV") - 1))
-            
-            print_info "Cytotoxicity Statistics:"
             echo "  Total compounds: $TOTAL_COUNT"
             echo "  Active (cytotoxic): $ACTIVE_COUNT"
             echo "  Inactive (non-cytotoxic): $INACTIVE_COUNT"
-            echo ""
         fi
+        echo ""
+        
+        print_info "Per-model active rates (all endpoints):"
+        echo "  python3 $STATS_SCRIPT rates"
+        echo ""
         
         print_info "View results:"
         echo "  cat $SUMMARY_CSV"
@@ -316,14 +268,8 @@ main() {
     # Step 2: Check input data
     check_input_data
     
-    # Step 3: Convert SMILES
-    convert_smiles
-    
-    # Step 4: Run predictions
-    run_predictions "$START_IDX" "$END_IDX"
-    
-    # Step 5: Extract results
-    extract_results
+    # Step 3: Convert, predict and aggregate (streaming)
+    run_pipeline "$START_IDX" "$END_IDX"
     
     # Display final results
     display_results
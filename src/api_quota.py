@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+ProTox-3 API Quota Ledger
+Function: Track daily API usage in a file shared by every process on this host
+
+The ProTox-3 API allows a fixed number of queries per day. The ledger records
+how many queries were made on each day and hands out quota under an exclusive
+file lock, so parallel or repeated runs can never overrun the limit together.
+
+Usage:
+    python3 api_quota.py          # Show today's usage
+"""
+
+import os
+import sys
+import json
+import time
+import fcntl
+from contextlib import contextmanager
+from pathlib import Path
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+
+# Number of days of history kept in the ledger file
+LEDGER_HISTORY_DAYS = 30
+
+
+def today():
+    """Return the ledger key for the current day"""
+    return time.strftime('%Y-%m-%d')
+
+
+def seconds_until_reset():
+    """Return the number of seconds until the next local midnight"""
+    now = time.localtime()
+    elapsed = now.tm_hour * 3600 + now.tm_min * 60 + now.tm_sec
+    return 86400 - elapsed
+
+
+class QuotaLedger:
+    """Persistent daily query counter protected by an exclusive file lock"""
+
+    def __init__(self, ledger_file=None, daily_limit=None):
+        self.ledger_file = ledger_file or config.API_QUOTA_LEDGER_FILE
+        self.daily_limit = config.API_MAX_QUERIES_PER_DAY if daily_limit is None else daily_limit
+        self.lock_file = self.ledger_file + '.lock'
+        os.makedirs(os.path.dirname(os.path.abspath(self.ledger_file)), exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the host-wide ledger lock"""
+        with open(self.lock_file, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self):
+        """Read the ledger (caller must hold the lock)"""
+        if not os.path.exists(self.ledger_file):
+            return {}
+        try:
+            with open(self.ledger_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return {}
+
+    def _write(self, usage):
+        """Atomically write the ledger (caller must hold the lock)"""
+        # Drop old days so the file stays small
+        keep = sorted(usage)[-LEDGER_HISTORY_DAYS:]
+        usage = {day: usage[day] for day in keep}
+
+        temp_file = self.ledger_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(usage, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.ledger_file)
+
+    def used_today(self):
+        """Return the number of queries used today"""
+        with self._locked():
+            return self._read().get(today(), 0)
+
+    def remaining(self):
+        """Return the number of queries still available today"""
+        return max(0, self.daily_limit - self.used_today())
+
+    def acquire(self, count=1):
+        """
+        Reserve up to count queries from today's quota
+
+        Args:
+            count: Number of queries wanted
+
+        Returns:
+            int: Number of queries granted (0 when the quota is exhausted)
+        """
+        with self._locked():
+            usage = self._read()
+            day = today()
+            used = usage.get(day, 0)
+            granted = max(0, min(count, self.daily_limit - used))
+            if granted:
+                usage[day] = used + granted
+                self._write(usage)
+            return granted
+
+
+def main():
+    """Main function"""
+    ledger = QuotaLedger()
+    used = ledger.used_today()
+
+    print("=" * 60)
+    print("ProTox-3 API Quota")
+    print("=" * 60)
+    print(f"Ledger file: {ledger.ledger_file}")
+    print(f"Date: {today()}")
+    print(f"Daily limit: {ledger.daily_limit}")
+    print(f"Used today: {used}")
+    print(f"Remaining today: {max(0, ledger.daily_limit - used)}")
+    print(f"Quota resets in: {seconds_until_reset() // 3600}h {seconds_until_reset() % 3600 // 60}m")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
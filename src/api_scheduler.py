@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+ProTox-3 API Multi-Day Scheduler
+Function: Drain an arbitrarily large job through the ProTox-3 API at the maximum
+rate the daily quota allows, resuming automatically across days and restarts
+
+Jobs are kept in a persistent queue file. Each compound has a priority class
+(high, normal, low); higher classes are always sent first. The queue file is
+rewritten after every request, so the scheduler can be stopped and restarted
+at any time without losing or repeating work.
+
+Usage:
+    python3 api_scheduler.py add <input_csv> [--column COL] [--type smiles|name] [--priority high|normal|low]
+    python3 api_scheduler.py run [--batch-size N] [--once]
+    python3 api_scheduler.py status
+
+Examples:
+    python3 api_scheduler.py add data/canonical_smiles.csv --type smiles
+    python3 api_scheduler.py add data/urgent.csv --priority high
+    python3 api_scheduler.py run -b 20      # Runs until the queue is empty
+"""
+
+import os
+import sys
+import csv
+import math
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+from api_quota import QuotaLedger, seconds_until_reset
+from protox3_api import (
+    DEFAULT_MODELS, ALL_MODELS, MAX_BATCH_SIZE, REQUEST_DELAY,
+    query_with_fallback, split_batches,
+)
+from prediction_table import FIELDS as RESULT_FIELDS
+from name_cache import NameResolver
+
+PRIORITY_CLASSES = ['high', 'normal', 'low']
+QUEUE_FIELDS = ['Compound', 'Type', 'Priority', 'Status', 'Attempts']
+
+
+def load_queue(queue_file):
+    """Load the job queue (list of dicts) from disk"""
+    if not os.path.exists(queue_file):
+        return []
+    with open(queue_file, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def save_queue(queue, queue_file):
+    """Atomically write the job queue to disk"""
+    temp_file = queue_file + '.tmp'
+    with open(temp_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=QUEUE_FIELDS)
+        writer.writeheader()
+        writer.writerows(queue)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, queue_file)
+
+
+def pending_jobs(queue):
+    """Return pending jobs ordered by priority class, then queue order"""
+    rank = {priority: i for i, priority in enumerate(PRIORITY_CLASSES)}
+    pending = [job for job in queue if job['Status'] == 'pending']
+    return sorted(pending, key=lambda job: rank.get(job['Priority'], len(rank)))
+
+
+def append_results(results, output_file):
+    """Append parsed predictions (PredictionTable) to the scheduler results file"""
+    write_header = not os.path.exists(output_file) or os.path.getsize(output_file) == 0
+    with open(output_file, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(RESULT_FIELDS)
+        results.write_csv(writer)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def add_jobs(args):
+    """Add compounds from a CSV file to the job queue"""
+    if not os.path.exists(args.input):
+        print(f"✗ Input file not found: {args.input}")
+        return
+
+    queue = load_queue(args.queue)
+    queued = {(job['Compound'], job['Type']) for job in queue}
+
+    added = 0
+    skipped = 0
+    with open(args.input, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        column = args.column
+        if column is None:
+            column = 'Canonical_SMILES' if 'Canonical_SMILES' in reader.fieldnames else reader.fieldnames[0]
+        if column not in reader.fieldnames:
+            print(f"✗ Column not found in input file: {column}")
+            return
+
+        for row in reader:
+            compound = row[column].strip()
+            if not compound or (compound, args.type) in queued:
+                skipped += 1
+                continue
+            queue.append({
+                'Compound': compound,
+                'Type': args.type,
+                'Priority': args.priority,
+                'Status': 'pending',
+                'Attempts': 0,
+            })
+            queued.add((compound, args.type))
+            added += 1
+
+    save_queue(queue, args.queue)
+    print(f"✓ Added {added} compounds with priority '{args.priority}' to {args.queue}")
+    if skipped:
+        print(f"  Skipped {skipped} empty or already queued compounds")
+
+
+def show_status(args):
+    """Print queue counts and the projected number of days to finish"""
+    queue = load_queue(args.queue)
+    ledger = QuotaLedger()
+
+    print("=" * 60)
+    print("ProTox-3 API Scheduler Status")
+    print("=" * 60)
+    print(f"Queue file: {args.queue}")
+    print(f"Total jobs: {len(queue)}")
+    for status in ['pending', 'done', 'failed']:
+        print(f"  {status.capitalize()}: {sum(1 for job in queue if job['Status'] == status)}")
+    print()
+    print("Pending by priority:")
+    for priority in PRIORITY_CLASSES:
+        count = sum(1 for job in queue if job['Status'] == 'pending' and job['Priority'] == priority)
+        print(f"  {priority}: {count}")
+    print()
+
+    pending = len(pending_jobs(queue))
+    requests_needed = math.ceil(pending / max(1, min(args.batch_size, MAX_BATCH_SIZE)))
+    remaining_today = ledger.remaining()
+    print(f"Quota remaining today: {remaining_today}/{ledger.daily_limit}")
+    print(f"Requests needed (batch size {args.batch_size}): {requests_needed}")
+    if requests_needed <= remaining_today:
+        print("Projected finish: today")
+    elif ledger.daily_limit <= 0:
+        print("Projected finish: never (daily quota is 0, no completion date can be projected)")
+    else:
+        extra_days = math.ceil((requests_needed - remaining_today) / ledger.daily_limit)
+        print(f"Projected finish: in {extra_days} more day(s)")
+    print("=" * 60)
+
+
+def run_jobs(args):
+    """Drain the job queue, sleeping through quota resets until it is empty"""
+    ledger = QuotaLedger()
+    resolver = NameResolver() if config.NAME_CACHE_ENABLED else None
+    models = ALL_MODELS if args.models == "ALL_MODELS" else args.models.split()
+
+    print("=" * 60)
+    print("ProTox-3 API Scheduler")
+    print("=" * 60)
+    print(f"Queue file: {args.queue}")
+    print(f"Results file: {args.output}")
+    print(f"Batch size: {args.batch_size}")
+    print("=" * 60)
+
+    while True:
+        queue = load_queue(args.queue)
+        pending = pending_jobs(queue)
+        if not pending:
+            print("✓ Job queue is empty")
+            return
+
+        if ledger.remaining() == 0:
+            if args.once:
+                print(f"Daily quota exhausted, {len(pending)} jobs left for later runs")
+                return
+            wait = seconds_until_reset() + 60
+            print(f"Daily quota exhausted, {len(pending)} jobs pending. "
+                  f"Sleeping {wait // 3600}h {wait % 3600 // 60}m until quota reset...")
+            time.sleep(wait)
+            continue
+
+        # Batches must share an input type; take the next run of same-type jobs
+        input_type = pending[0]['Type']
+        batch_jobs = [job for job in pending if job['Type'] == input_type]
+        batch_jobs = split_batches(batch_jobs, args.batch_size)[0]
+        batch = [job['Compound'] for job in batch_jobs]
+
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Querying {len(batch)} compounds "
+              f"(priority: {batch_jobs[0]['Priority']}, pending: {len(pending)})")
+        batch_results, used, _ = query_with_fallback(batch, input_type, models, quiet=True, ledger=ledger,
+                                                     resolver=resolver)
+
+        for job in batch_jobs:
+            if job['Compound'] not in batch_results:
+                continue  # Not queried, quota ran out mid-batch
+            results = batch_results[job['Compound']]
+            job['Attempts'] = int(job['Attempts']) + 1
+            if results:
+                append_results(results, args.output)
+                job['Status'] = 'done'
+            elif job['Attempts'] >= config.RETRY_TIMES:
+                job['Status'] = 'failed'
+                print(f"  ✗ {job['Compound']} failed after {job['Attempts']} attempts")
+
+        save_queue(queue, args.queue)
+        done = sum(1 for job in batch_jobs if job['Status'] == 'done')
+        print(f"  ✓ {done}/{len(batch)} compounds completed using {used} requests")
+        time.sleep(REQUEST_DELAY)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='ProTox-3 API Multi-Day Scheduler')
+    parser.add_argument('--queue', default=config.API_SCHEDULER_QUEUE_FILE,
+                        help='Job queue file (default: from config.py)')
+    batch_parser = argparse.ArgumentParser(add_help=False)
+    batch_parser.add_argument('-b', '--batch-size', type=int, default=1,
+                              help=f'Compounds per request (default: 1, max: {MAX_BATCH_SIZE})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    add_parser = subparsers.add_parser('add', help='Add compounds from a CSV file to the queue')
+    add_parser.add_argument('input', help='Input CSV file')
+    add_parser.add_argument('--column', default=None,
+                            help='Column holding the compound (default: Canonical_SMILES or first column)')
+    add_parser.add_argument('-t', '--type', choices=['name', 'smiles'], default='smiles',
+                            help='Input type of the compounds (default: smiles)')
+    add_parser.add_argument('-p', '--priority', choices=PRIORITY_CLASSES, default='normal',
+                            help='Priority class (default: normal)')
+
+    run_parser = subparsers.add_parser('run', parents=[batch_parser],
+                                       help='Process the queue until it is empty')
+    run_parser.add_argument('-m', '--models', default=' '.join(DEFAULT_MODELS),
+                            help="Space-separated model shorthands, or 'ALL_MODELS'")
+    run_parser.add_argument('-o', '--output', default=config.API_SCHEDULER_RESULTS_FILE,
+                            help='Results CSV file (default: from config.py)')
+    run_parser.add_argument('--once', action='store_true',
+                            help="Stop when today's quota is used up instead of waiting")
+
+    subparsers.add_parser('status', parents=[batch_parser],
+                          help='Show queue status and projected finish')
+
+    args = parser.parse_args()
+
+    if args.command == 'add':
+        add_jobs(args)
+    elif args.command == 'run':
+        run_jobs(args)
+    else:
+        show_status(args)
+
+
+if __name__ == "__main__":
+    # Suppress SSL warnings
+    import urllib3
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    main()
@@ -3,22 +3,32 @@
 Convert SMILES to Canonical SMILES using RDKit
 Function: Read PubChem_ID and SMILES from CSV, convert to Canonical SMILES, save to new CSV
 
+With --standardize (or STANDARDIZE_STRUCTURES in config.py), structures are
+also standardized: salts and solvents stripped, charges neutralized and
+tautomers canonicalized. An InChIKey column is added and compounds sharing a
+standardized InChIKey are submitted only once.
+
 Usage:
-    python3 convert_smiles.py [input_file] [output_file]
+    python3 convert_smiles.py [input_file] [output_file] [--standardize] [--workers N]
     
 Examples:
     python3 convert_smiles.py
     python3 convert_smiles.py data/input.csv data/canonical_smiles.csv
+    python3 convert_smiles.py --standardize --workers 8
 """
 
 import csv
 import sys
+import argparse
+from multiprocessing import Pool
 from pathlib import Path
 from rdkit import Chem
+from rdkit.Chem.MolStandardize import rdMolStandardize
 
 # Add parent directory to path to import config
 sys.path.insert(0, str(Path(__file__).parent.parent))
 import config
+from prescreen import screen_smiles, save_rejected
 
 def convert_to_canonical_smiles(smiles):
     """Convert SMILES to Canonical SMILES"""
@@ -32,21 +42,94 @@ def convert_to_canonical_smiles(smiles):
         print(f"  ✗ Error converting SMILES: {e}")
         return None
 
+def standardize_smiles(smiles):
+    """
+    Standardize a SMILES string to its neutral parent structure
+    
+    Strips salts and solvents (keeps the largest organic fragment), neutralizes
+    charges and canonicalizes the tautomer.
+    
+    Returns:
+        tuple: (standardized canonical SMILES, InChIKey), or (None, None) on failure
+    """
+    try:
+        mol = Chem.MolFromSmiles(smiles)
+        if mol is None:
+            return None, None
+        mol = rdMolStandardize.Cleanup(mol)
+        mol = rdMolStandardize.FragmentParent(mol)
+        mol = rdMolStandardize.Uncharger().uncharge(mol)
+        mol = rdMolStandardize.TautomerEnumerator().Canonicalize(mol)
+        # MolToInchiKey returns "" when no InChI can be generated
+        return Chem.MolToSmiles(mol, canonical=True), Chem.MolToInchiKey(mol) or None
+    except Exception as e:
+        print(f"  ✗ Error standardizing SMILES: {e}")
+        return None, None
+
+def convert_compound(task):
+    """
+    Pre-screen and convert one compound (runs in a worker process)
+    
+    Args:
+        task: Tuple of (input row dict, standardize flag)
+        
+    Returns:
+        dict: Conversion outcome with 'status' of converted, empty, rejected or failed
+    """
+    compound, standardize = task
+    smiles = compound.get('SMILES', '')
+    outcome = {'PubChem_ID': compound.get('PubChem_ID', ''), 'SMILES': smiles}
+    
+    if not smiles:
+        outcome['status'] = 'empty'
+        return outcome
+    
+    # Standardize first so the pre-screen sees the parent structure
+    # (a salt's counter-ion must not reject the compound)
+    screened = smiles
+    if standardize:
+        canonical_smiles, inchikey = standardize_smiles(smiles)
+        outcome['InChIKey'] = inchikey
+        screened = canonical_smiles or smiles
+    
+    # Pre-screen: never submit structures the server cannot process
+    if config.PRESCREEN_ENABLED:
+        reason = screen_smiles(screened)
+        if reason:
+            outcome['status'] = 'rejected'
+            outcome['reason'] = reason
+            return outcome
+    
+    if not standardize:
+        canonical_smiles = convert_to_canonical_smiles(smiles)
+    
+    outcome['Canonical_SMILES'] = canonical_smiles
+    outcome['status'] = 'converted' if canonical_smiles else 'failed'
+    return outcome
+
 def main():
     """Main function"""
-    # Get input and output file paths from command line or use defaults
-    if len(sys.argv) >= 3:
-        input_file = sys.argv[1]
-        output_file = sys.argv[2]
-    else:
-        input_file = config.INPUT_FILE
-        output_file = config.CANONICAL_SMILES_FILE
+    parser = argparse.ArgumentParser(description='Convert SMILES to Canonical SMILES')
+    parser.add_argument('input_file', nargs='?', default=config.INPUT_FILE,
+                        help='Input CSV file (default: from config.py)')
+    parser.add_argument('output_file', nargs='?', default=config.CANONICAL_SMILES_FILE,
+                        help='Output CSV file (default: from config.py)')
+    parser.add_argument('--standardize', action='store_true', default=config.STANDARDIZE_STRUCTURES,
+                        help='Standardize structures and deduplicate by InChIKey')
+    parser.add_argument('--workers', type=int, default=config.CONVERT_WORKERS,
+                        help='Number of worker processes (default: from config.py)')
+    args = parser.parse_args()
+    
+    input_file = args.input_file
+    output_file = args.output_file
     
     print("=" * 60)
     print("Converting SMILES to Canonical SMILES")
     print("=" * 60)
     print(f"Input file: {input_file}")
     print(f"Output file: {output_file}")
+    print(f"Standardize structures: {'yes' if args.standardize else 'no'}")
+    print(f"Workers: {args.workers}")
     print("")
     
     # Check if input file exists
@@ -69,44 +152,94 @@ def main():
     
     # Convert SMILES to Canonical SMILES
     results = []
+    rejected = []
+    duplicates = []
+    representatives = {}  # InChIKey -> PubChem_ID submitted for it
     success_count = 0
     fail_count = 0
     
-    for idx, compound in enumerate(compounds, 1):
-        pubchem_id = compound.get('PubChem_ID', '')
-        smiles = compound.get('SMILES', '')
-        
-        print(f"[{idx}/{len(compounds)}] Processing PubChem_ID: {pubchem_id}")
-        
-        if not smiles:
-            print(f"  ✗ SMILES is empty")
-            fail_count += 1
-            continue
-        
-        canonical_smiles = convert_to_canonical_smiles(smiles)
-        
-        if canonical_smiles:
-            results.append({
-                'PubChem_ID': pubchem_id,
-                'Original_SMILES': smiles,
-                'Canonical_SMILES': canonical_smiles
-            })
-            print(f"  ✓ Converted successfully")
-            success_count += 1
-        else:
-            print(f"  ✗ Conversion failed")
-            fail_count += 1
+    tasks = [(compound, args.standardize) for compound in compounds]
+    if args.workers > 1:
+        pool = Pool(args.workers)
+        outcomes = pool.imap(convert_compound, tasks, chunksize=64)
+    else:
+        pool = None
+        outcomes = map(convert_compound, tasks)
+    
+    try:
+        for idx, outcome in enumerate(outcomes, 1):
+            pubchem_id = outcome['PubChem_ID']
+            smiles = outcome['SMILES']
+            
+            print(f"[{idx}/{len(compounds)}] Processing PubChem_ID: {pubchem_id}")
+            
+            if outcome['status'] == 'empty':
+                print(f"  ✗ SMILES is empty")
+                fail_count += 1
+            elif outcome['status'] == 'rejected':
+                print(f"  ✗ Rejected by pre-screen: {outcome['reason']}")
+                rejected.append({'PubChem_ID': pubchem_id, 'SMILES': smiles, 'Reason': outcome['reason']})
+            elif outcome['status'] == 'failed':
+                print(f"  ✗ Conversion failed")
+                fail_count += 1
+            elif args.standardize and outcome['InChIKey'] and outcome['InChIKey'] in representatives:
+                # Same parent compound already queued: reuse its result
+                representative = representatives[outcome['InChIKey']]
+                duplicates.append({
+                    'PubChem_ID': pubchem_id,
+                    'InChIKey': outcome['InChIKey'],
+                    'Representative_PubChem_ID': representative,
+                })
+                print(f"  ✓ Duplicate of PubChem_ID {representative}, will reuse its result")
+                success_count += 1
+            else:
+                row = {
+                    'PubChem_ID': pubchem_id,
+                    'Original_SMILES': smiles,
+                    'Canonical_SMILES': outcome['Canonical_SMILES']
+                }
+                if args.standardize:
+                    row['InChIKey'] = outcome['InChIKey'] or ''
+                    if outcome['InChIKey']:
+                        representatives[outcome['InChIKey']] = pubchem_id
+                results.append(row)
+                print(f"  ✓ Converted successfully")
+                success_count += 1
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
     
     print("")
     print(f"Conversion complete:")
     print(f"  Successful: {success_count}")
     print(f"  Failed: {fail_count}")
+    if config.PRESCREEN_ENABLED:
+        print(f"  Rejected by pre-screen: {len(rejected)}")
+    if args.standardize:
+        print(f"  Unique parent structures: {len(results)}")
+        print(f"  Duplicates (result reused): {len(duplicates)}")
     print("")
     
+    if rejected:
+        save_rejected(rejected, config.REJECTED_COMPOUNDS_FILE)
+        print("")
+    
+    if args.standardize:
+        with open(config.DUPLICATES_FILE, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['PubChem_ID', 'InChIKey', 'Representative_PubChem_ID'])
+            writer.writeheader()
+            writer.writerows(duplicates)
+        print(f"✓ Duplicate list saved to: {config.DUPLICATES_FILE}")
+        print("")
+    
     # Save results to output CSV
     if results:
+        fieldnames = ['PubChem_ID', 'Original_SMILES', 'Canonical_SMILES']
+        if args.standardize:
+            fieldnames.append('InChIKey')
         with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['PubChem_ID', 'Original_SMILES', 'Canonical_SMILES'])
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
             writer.writerows(results)
         
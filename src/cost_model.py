@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Cost-Aware Scheduling from Historical Prediction Durations
+Function: Learn per-compound prediction time from past runs and split work across
+workers longest-expected-first to minimize the time until the last worker finishes.
+The same history drives the adaptive per-compound timeout used while waiting.
+
+protox_full_automation.py records how long every prediction took in the
+duration history file. This script fits a linear model of prediction time on
+simple RDKit descriptors (heavy-atom count and ring count), then assigns
+compounds to workers with the longest-processing-time-first rule.
+
+Usage:
+    python3 cost_model.py plan [--workers N] [--input FILE]
+    python3 cost_model.py report
+    python3 cost_model.py fit
+    python3 cost_model.py timeout <SMILES>
+
+Examples:
+    python3 cost_model.py plan -w 4        # Write data/shards/shard_0.csv ... shard_3.csv
+    python3 protox_full_automation.py --input data/shards/shard_0.csv   # one per worker
+    python3 cost_model.py report           # Predicted vs actual completion time
+"""
+
+import os
+import sys
+import csv
+import time
+import fcntl
+import heapq
+import argparse
+from contextlib import contextmanager
+from pathlib import Path
+from rdkit import Chem
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+
+HISTORY_FIELDS = ['Timestamp', 'PubChem_ID', 'Canonical_SMILES', 'Seconds', 'Outcome', 'Timeout']
+
+# Minimum number of successful runs before the fitted model is trusted
+MIN_FIT_SAMPLES = 10
+
+# Timeout model shared by every process_compound call in this process
+_shared_timeout_model = None
+
+
+@contextmanager
+def _locked(history_file):
+    """Hold the history file lock (several workers append to the same file)"""
+    with open(history_file + '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def migrate_history(history_file):
+    """
+    Rewrite a history file written before a column was added with the current header
+
+    Rows appended after the old header carry the new columns as extra values;
+    they are kept. Caller holds the lock.
+    """
+    with open(history_file, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is None or reader.fieldnames == HISTORY_FIELDS:
+            return False
+        old_fields = reader.fieldnames
+        rows = []
+        for row in reader:
+            extra = row.pop(None, [])
+            for field in HISTORY_FIELDS[len(old_fields):]:
+                row[field] = extra.pop(0) if extra else ''
+            rows.append(row)
+
+    temp_file = f"{history_file}.{os.getpid()}.tmp"
+    with open(temp_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=HISTORY_FIELDS, extrasaction='ignore', restval='')
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(temp_file, history_file)
+    return True
+
+
+def record_duration(pubchem_id, canonical_smiles, seconds, outcome, timeout=None, history_file=None):
+    """Append one prediction duration to the history file"""
+    if _shared_timeout_model is not None:
+        _shared_timeout_model.observe(canonical_smiles, seconds, outcome)
+
+    history_file = history_file or config.DURATION_HISTORY_FILE
+    with _locked(history_file):
+        write_header = not os.path.exists(history_file) or os.path.getsize(history_file) == 0
+        if not write_header:
+            migrate_history(history_file)
+        with open(history_file, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=HISTORY_FIELDS)
+            if write_header:
+                writer.writeheader()
+            writer.writerow({
+                'Timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'PubChem_ID': pubchem_id,
+                'Canonical_SMILES': canonical_smiles,
+                'Seconds': f"{seconds:.1f}",
+                'Outcome': outcome,
+                'Timeout': timeout if timeout is not None else '',
+            })
+
+
+def load_history(history_file=None):
+    """Load all recorded prediction durations"""
+    history_file = history_file or config.DURATION_HISTORY_FILE
+    if not os.path.exists(history_file):
+        return []
+    with open(history_file, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def molecule_descriptors(smiles):
+    """Return (heavy_atom_count, ring_count) for a SMILES, or None if invalid"""
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        return None
+    return mol.GetNumHeavyAtoms(), mol.GetRingInfo().NumRings()
+
+
+def _solve(matrix, vector):
+    """Solve a small linear system by Gaussian elimination (None if singular)"""
+    n = len(vector)
+    a = [row[:] + [vector[i]] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        if abs(a[pivot][col]) < 1e-9:
+            return None
+        a[col], a[pivot] = a[pivot], a[col]
+        for r in range(n):
+            if r != col:
+                factor = a[r][col] / a[col][col]
+                a[r] = [x - factor * y for x, y in zip(a[r], a[col])]
+    return [a[i][n] / a[i][i] for i in range(n)]
+
+
+class DurationModel:
+    """Linear model: seconds = b0 + b1 * heavy_atoms + b2 * rings"""
+
+    def __init__(self):
+        self.coefficients = None
+        self.mean_seconds = config.MAX_WAIT_TIME / 2
+        self.samples = 0
+
+    def fit(self, history):
+        """Fit the model on successful runs from the duration history"""
+        points = []
+        for row in history:
+            if row['Outcome'] != 'success':
+                continue
+            descriptors = molecule_descriptors(row['Canonical_SMILES'])
+            if descriptors:
+                points.append((descriptors, float(row['Seconds'])))
+
+        self.samples = len(points)
+        if not points:
+            return self
+
+        self.mean_seconds = sum(seconds for _, seconds in points) / len(points)
+        if len(points) < MIN_FIT_SAMPLES:
+            return self
+
+        # Normal equations X'X b = X'y
+        xtx = [[0.0] * 3 for _ in range(3)]
+        xty = [0.0] * 3
+        for (heavy_atoms, rings), seconds in points:
+            x = (1.0, heavy_atoms, rings)
+            for i in range(3):
+                xty[i] += x[i] * seconds
+                for j in range(3):
+                    xtx[i][j] += x[i] * x[j]
+        self.coefficients = _solve(xtx, xty)
+        return self
+
+    def predict(self, smiles):
+        """Predict the prediction time (seconds) for a SMILES"""
+        descriptors = molecule_descriptors(smiles)
+        if self.coefficients is None or descriptors is None:
+            return self.mean_seconds
+        b0, b1, b2 = self.coefficients
+        # Never predict less than a poll interval
+        return max(30.0, b0 + b1 * descriptors[0] + b2 * descriptors[1])
+
+
+def censored_quantile(samples, quantile):
+    """
+    Quantile of durations where some runs were cut off (Kaplan-Meier estimate)
+
+    Args:
+        samples: (seconds, censored) pairs; censored runs only tell that the
+                 duration was longer than seconds (the run timed out)
+        quantile: Quantile between 0 and 1
+
+    Returns:
+        float: The duration, or None if too many runs timed out to place it
+    """
+    at_risk = len(samples)
+    survival = 1.0
+    # Completions at a time come before timeouts at the same time
+    for seconds, censored in sorted(samples):
+        if censored:
+            at_risk -= 1
+            continue
+        survival *= 1 - 1 / at_risk
+        at_risk -= 1
+        if 1 - survival > quantile + 1e-9:
+            return seconds
+    return None
+
+
+class TimeoutModel:
+    """
+    Per-compound wait ceiling from completion times of similar-size molecules
+
+    Successful runs give completion times; timed-out runs are kept as lower
+    bounds (censored observations), so compounds that often time out get a
+    longer ceiling instead of being judged only by the ones that finished.
+    """
+
+    def __init__(self, history=()):
+        self.observations = []  # (heavy_atoms, seconds, timed_out) of finished or timed-out runs
+        for row in history:
+            self.observe(row['Canonical_SMILES'], float(row['Seconds']), row['Outcome'])
+
+    def observe(self, smiles, seconds, outcome):
+        """Add one recorded outcome to the model (other failures say nothing about duration)"""
+        if outcome not in ('success', 'timeout'):
+            return
+        descriptors = molecule_descriptors(smiles)
+        if descriptors:
+            self.observations.append((descriptors[0], seconds, outcome == 'timeout'))
+
+    def timeout_for(self, smiles):
+        """
+        Return the wait ceiling (seconds) for a compound
+
+        Uses the configured quantile of completion times of molecules whose
+        heavy-atom count is within 20% of this one, falling back to all
+        molecules and then to MAX_WAIT_TIME when there is too little history.
+        """
+        min_samples = config.ADAPTIVE_TIMEOUT_MIN_SAMPLES
+        if completed_runs(self.observations) < min_samples:
+            return config.MAX_WAIT_TIME
+
+        observations = self.observations
+        descriptors = molecule_descriptors(smiles)
+        if descriptors:
+            heavy_atoms = descriptors[0]
+            window = max(5, heavy_atoms * 0.2)
+            similar = [o for o in self.observations if abs(o[0] - heavy_atoms) <= window]
+            if completed_runs(similar) >= min_samples:
+                observations = similar
+
+        duration = censored_quantile([(seconds, timed_out) for _, seconds, timed_out in observations],
+                                     config.ADAPTIVE_TIMEOUT_QUANTILE)
+        if duration is None:
+            # So many similar runs timed out that the quantile lies beyond them
+            return config.ADAPTIVE_TIMEOUT_CAP
+        timeout = duration * config.ADAPTIVE_TIMEOUT_MARGIN
+        return int(min(config.ADAPTIVE_TIMEOUT_CAP, max(config.ADAPTIVE_TIMEOUT_FLOOR, timeout)))
+
+
+def completed_runs(observations):
+    """Number of observations that are completion times (not timeouts)"""
+    return sum(1 for _, _, timed_out in observations if not timed_out)
+
+
+def shared_timeout_model():
+    """Return the process-wide timeout model, loading the history on first use"""
+    global _shared_timeout_model
+    if _shared_timeout_model is None:
+        _shared_timeout_model = TimeoutModel(load_history())
+    return _shared_timeout_model
+
+
+def choose_timeout(canonical_smiles):
+    """Return the wait ceiling for a compound (MAX_WAIT_TIME if adaptive timeouts are off)"""
+    if not config.ADAPTIVE_TIMEOUT:
+        return config.MAX_WAIT_TIME
+    return shared_timeout_model().timeout_for(canonical_smiles)
+
+
+def assign_workers(compounds, workers):
+    """
+    Assign compounds to workers, longest expected time first
+
+    Args:
+        compounds: List of dicts with a 'Predicted_Seconds' key
+        workers: Number of workers
+
+    Returns:
+        list: One list of compounds per worker, each ordered longest first
+    """
+    shards = [[] for _ in range(workers)]
+    loads = [(0.0, worker) for worker in range(workers)]
+    heapq.heapify(loads)
+
+    for compound in sorted(compounds, key=lambda c: c['Predicted_Seconds'], reverse=True):
+        load, worker = heapq.heappop(loads)
+        shards[worker].append(compound)
+        heapq.heappush(loads, (load + compound['Predicted_Seconds'], worker))
+
+    return shards
+
+
+def format_hours(seconds):
+    """Format seconds as hours with one decimal"""
+    return f"{seconds / 3600:.1f} h"
+
+
+def fit_model():
+    """Fit the duration model and print its coefficients"""
+    model = DurationModel().fit(load_history())
+    print(f"Successful runs in history: {model.samples}")
+    print(f"Mean prediction time: {model.mean_seconds:.0f} s")
+    if model.coefficients:
+        b0, b1, b2 = model.coefficients
+        print(f"Model: seconds = {b0:.1f} + {b1:.2f} * heavy_atoms + {b2:.2f} * rings")
+    else:
+        print(f"Not enough data to fit (need {MIN_FIT_SAMPLES} successful runs), using the mean")
+    return model
+
+
+def plan(args):
+    """Write per-worker shard files ordered by predicted cost"""
+    if not os.path.exists(args.input):
+        print(f"✗ Input file not found: {args.input}")
+        return
+
+    print("=" * 60)
+    print("Cost-Aware Work Plan")
+    print("=" * 60)
+    model = fit_model()
+    print("")
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fieldnames = [name for name in reader.fieldnames if name != 'Predicted_Seconds']
+        compounds = []
+        for row in reader:
+            row['Predicted_Seconds'] = round(model.predict(row['Canonical_SMILES']), 1)
+            compounds.append(row)
+
+    shards = assign_workers(compounds, args.workers)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for worker, shard in enumerate(shards):
+        shard_file = os.path.join(args.output_dir, f"shard_{worker}.csv")
+        with open(shard_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames + ['Predicted_Seconds'])
+            writer.writeheader()
+            writer.writerows(shard)
+        load = sum(c['Predicted_Seconds'] for c in shard)
+        print(f"  Worker {worker}: {len(shard)} compounds, predicted {format_hours(load)} -> {shard_file}")
+
+    makespan = max(sum(c['Predicted_Seconds'] for c in shard) for shard in shards)
+    print("")
+    print(f"Predicted completion time: {format_hours(makespan)}")
+    print(f"Run one worker per shard: python3 protox_full_automation.py --input {args.output_dir}/shard_<N>.csv")
+    print("=" * 60)
+
+
+def report(args):
+    """Compare predicted and actual completion time for the planned run"""
+    shard_files = sorted(
+        os.path.join(args.output_dir, name) for name in os.listdir(args.output_dir)
+        if name.startswith('shard_') and name.endswith('.csv')
+    ) if os.path.exists(args.output_dir) else []
+    if not shard_files:
+        print(f"✗ No shard files found in {args.output_dir}")
+        return
+
+    # Total prediction time per compound since the plan was written (retries add up)
+    planned_at = time.strftime('%Y-%m-%d %H:%M:%S',
+                               time.localtime(min(os.path.getmtime(p) for p in shard_files)))
+    actual_seconds = {}
+    for row in load_history():
+        if row['Timestamp'] < planned_at:
+            continue
+        actual_seconds[row['PubChem_ID']] = actual_seconds.get(row['PubChem_ID'], 0.0) + float(row['Seconds'])
+
+    print("=" * 60)
+    print("Predicted vs Actual Completion Time")
+    print("=" * 60)
+    predicted_makespan = 0.0
+    actual_makespan = 0.0
+    errors = []
+    for shard_file in shard_files:
+        with open(shard_file, 'r', encoding='utf-8') as f:
+            shard = list(csv.DictReader(f))
+        predicted = sum(float(c['Predicted_Seconds']) for c in shard)
+        done = [c for c in shard if c['PubChem_ID'] in actual_seconds]
+        actual = sum(actual_seconds[c['PubChem_ID']] for c in done)
+        errors.extend(abs(actual_seconds[c['PubChem_ID']] - float(c['Predicted_Seconds'])) for c in done)
+        predicted_makespan = max(predicted_makespan, predicted)
+        actual_makespan = max(actual_makespan, actual)
+        print(f"  {os.path.basename(shard_file)}: {len(done)}/{len(shard)} done, "
+              f"predicted {format_hours(predicted)}, actual {format_hours(actual)}")
+
+    print("")
+    print(f"Predicted completion time: {format_hours(predicted_makespan)}")
+    print(f"Actual completion time (so far): {format_hours(actual_makespan)}")
+    if errors:
+        print(f"Mean absolute error per compound: {sum(errors) / len(errors):.0f} s")
+    print("=" * 60)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Cost-Aware Scheduling from Historical Prediction Durations')
+    parser.add_argument('--output-dir', default=config.SHARDS_DIR,
+                        help='Directory for shard files (default: from config.py)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    plan_parser = subparsers.add_parser('plan', help='Split the input into per-worker shards')
+    plan_parser.add_argument('-w', '--workers', type=int, default=1,
+                             help='Number of workers (default: 1)')
+    plan_parser.add_argument('--input', default=config.CANONICAL_SMILES_FILE,
+                             help='Canonical SMILES file (default: from config.py)')
+
+    subparsers.add_parser('report', help='Compare predicted and actual completion time')
+    subparsers.add_parser('fit', help='Fit the duration model and show its coefficients')
+
+    timeout_parser = subparsers.add_parser('timeout', help='Show the adaptive timeout for a SMILES')
+    timeout_parser.add_argument('smiles', help='Canonical SMILES')
+
+    args = parser.parse_args()
+
+    if args.command == 'plan':
+        plan(args)
+    elif args.command == 'report':
+        report(args)
+    elif args.command == 'timeout':
+        print(f"Timeout: {choose_timeout(args.smiles)} s")
+    else:
+        fit_model()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,25 +3,95 @@
 Extract Cytotoxicity Data from ProTox-3 Results
 Function: Extract Cytotoxicity rows from all CID_*.csv files and aggregate into a summary file
 
+With --incremental, only CID files that are new or changed since the last run
+(tracked by name, size and modification time in a manifest) are parsed and
+merged into the existing summary.
+
 Usage:
-    python3 extract_cytotoxicity.py
+    python3 extract_cytotoxicity.py [--incremental]
 """
 
 import csv
 import os
 import sys
+import json
+import argparse
 from pathlib import Path
 
 # Add parent directory to path to import config
 sys.path.insert(0, str(Path(__file__).parent.parent))
 import config
 
+# Vectorized counting when NumPy is available
+try:
+    from prediction_stats import count_predictions
+except ImportError:
+    count_predictions = None
+
 # Configuration from config.py
 RESULT_DIR = config.RESULTS_DIR
 OUTPUT_FILE = config.CYTOTOXICITY_SUMMARY_FILE
+MANIFEST_FILE = config.SUMMARY_MANIFEST_FILE
+SUMMARY_HEADER = ['PubChem_ID', 'Classification', 'Target', 'Shorthand', 'Prediction', 'Probability']
 
-def extract_cytotoxicity():
-    """Extract Cytotoxicity data from all CID_*.csv files"""
+def find_cytotoxicity_row(filepath):
+    """
+    Return the Cytotoxicity row of a CID_*.csv report, or None if absent
+    
+    Row layout: Classification, Target, Shorthand, Prediction, Probability
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if len(row) > 0 and 'Cytotoxicity' in ' '.join(row):
+                return row
+    return None
+
+def load_manifest():
+    """Load the manifest of files already in the summary ({filename: [size, mtime_ns]})"""
+    if not os.path.exists(MANIFEST_FILE):
+        return None
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except ValueError:
+        return None
+
+def save_manifest(manifest):
+    """Atomically save the manifest"""
+    temp_file = MANIFEST_FILE + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(temp_file, MANIFEST_FILE)
+
+def load_summary():
+    """Load the existing summary as {PubChem_ID: row}"""
+    rows = {}
+    if os.path.exists(OUTPUT_FILE):
+        with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # Skip header
+            for row in reader:
+                if row:
+                    rows[row[0]] = row
+    return rows
+
+def write_summary(rows):
+    """Atomically write the summary file"""
+    temp_file = OUTPUT_FILE + '.tmp'
+    with open(temp_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        
+        # Write header
+        writer.writerow(SUMMARY_HEADER)
+        
+        # Write data
+        for row in rows:
+            writer.writerow(row)
+    os.replace(temp_file, OUTPUT_FILE)
+
+def extract_cytotoxicity(incremental=False):
+    """Extract Cytotoxicity data from all CID_*.csv files (or only new/changed ones)"""
     
     print("=" * 60)
     print("Extracting Cytotoxicity Data")
@@ -35,65 +105,89 @@ def extract_cytotoxicity():
         print(f"✗ Results directory not found: {RESULT_DIR}")
         return
     
-    # Find all CID_*.csv files
-    cid_files = []
-    for filename in os.listdir(RESULT_DIR):
-        if filename.startswith('CID_') and filename.endswith('.csv'):
-            cid_files.append(filename)
+    # Find all CID_*.csv files with their size and modification time
+    cid_files = {}
+    with os.scandir(RESULT_DIR) as entries:
+        for entry in entries:
+            if entry.name.startswith('CID_') and entry.name.endswith('.csv'):
+                stat = entry.stat()
+                cid_files[entry.name] = [stat.st_size, stat.st_mtime_ns]
     
     if not cid_files:
         print("✗ No CID_*.csv files found in results directory")
         return
     
     print(f"Found {len(cid_files)} CID files")
+    
+    # Incremental mode: start from the existing summary and manifest
+    manifest = load_manifest() if incremental else None
+    if manifest is not None and os.path.exists(OUTPUT_FILE):
+        summary = load_summary()
+        to_parse = [name for name, state in cid_files.items() if manifest.get(name) != state]
+        removed = [name for name in manifest if name not in cid_files]
+        for name in removed:
+            summary.pop(name[4:-4], None)
+        print(f"Incremental mode: {len(to_parse)} new or changed, {len(removed)} removed")
+    else:
+        if incremental:
+            print("Incremental mode: no manifest yet, doing a full extraction")
+        summary = {}
+        to_parse = list(cid_files)
+        removed = []
     print("")
     
     # Extract Cytotoxicity data
-    cytotoxicity_data = []
+    new_rows = []
     
-    for filename in sorted(cid_files):
+    for filename in sorted(to_parse):
         filepath = os.path.join(RESULT_DIR, filename)
         pubchem_id = filename.replace('CID_', '').replace('.csv', '')
         
         print(f"Processing: {filename}")
         
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    # Check if this row contains Cytotoxicity data
-                    if len(row) > 0 and 'Cytotoxicity' in ' '.join(row):
-                        # Insert PubChem_ID as the first column
-                        row_with_id = [pubchem_id] + row
-                        cytotoxicity_data.append(row_with_id)
-                        print(f"  ✓ Found Cytotoxicity data: {row}")
-                        break
+            row = find_cytotoxicity_row(filepath)
+            if row:
+                # Insert PubChem_ID as the first column
+                new_rows.append([pubchem_id] + row)
+                print(f"  ✓ Found Cytotoxicity data: {row}")
+            else:
+                summary.pop(pubchem_id, None)
         except Exception as e:
             print(f"  ✗ Error reading file: {e}")
+            cid_files.pop(filename)  # Retry on the next run
     
     print("")
-    print(f"Total Cytotoxicity records extracted: {len(cytotoxicity_data)}")
+    print(f"Cytotoxicity records extracted this run: {len(new_rows)}")
     print("")
     
+    # Only new compounds: append to the summary instead of rewriting it
+    only_additions = (manifest is not None and bool(summary) and not removed and
+                      all(name not in manifest for name in to_parse) and
+                      all(row[0] not in summary for row in new_rows))
+    for row in new_rows:
+        summary[row[0]] = row
+    cytotoxicity_data = list(summary.values())
+    
     # Save to summary file
     if cytotoxicity_data:
-        with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            
-            # Write header
-            header = ['PubChem_ID', 'Classification', 'Target', 'Shorthand', 'Prediction', 'Probability']
-            writer.writerow(header)
-            
-            # Write data
-            for row in cytotoxicity_data:
-                writer.writerow(row)
+        if only_additions:
+            with open(OUTPUT_FILE, 'a', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows(new_rows)
+        else:
+            write_summary(sorted(cytotoxicity_data, key=lambda row: f"CID_{row[0]}.csv"))
+        save_manifest(cid_files)
         
         print(f"✓ Summary file saved: {OUTPUT_FILE}")
         print("")
         
         # Display statistics
-        active_count = sum(1 for row in cytotoxicity_data if 'Active' in row)
-        inactive_count = sum(1 for row in cytotoxicity_data if 'Inactive' in row)
+        if count_predictions is not None:
+            counts = count_predictions([row[4] for row in cytotoxicity_data])
+            active_count, inactive_count = counts['active'], counts['inactive']
+        else:
+            active_count = sum(1 for row in cytotoxicity_data if 'Active' in row)
+            inactive_count = sum(1 for row in cytotoxicity_data if 'Inactive' in row)
         
         print("Statistics:")
         print(f"  Total compounds: {len(cytotoxicity_data)}")
@@ -107,5 +201,14 @@ def extract_cytotoxicity():
     print("Extraction Complete")
     print("=" * 60)
 
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Extract Cytotoxicity Data from ProTox-3 Results')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only parse CID files that are new or changed since the last run')
+    args = parser.parse_args()
+    
+    extract_cytotoxicity(incremental=args.incremental)
+
 if __name__ == "__main__":
-    extract_cytotoxicity()
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+In-Flight Prediction Jobs
+Function: Remember every submitted prediction (results URL and session cookies) so
+it can be picked up again after a browser crash or worker restart
+
+process_compound records a job as soon as the browser has left the input page
+for a results or job page of the server, and removes it once the wait ends.
+If the worker dies in between, the next attempt for the compound reattaches
+to the stored URL with a new driver instead of resubmitting. Jobs whose wait
+ceiling has passed are still checked once (the results may be waiting) before
+they are dropped. The resume command finishes all stored jobs, with a browser
+or with a plain HTTP poller (no browser needed).
+
+Usage:
+    python3 inflight_jobs.py list
+    python3 inflight_jobs.py resume [--http]
+
+Examples:
+    python3 inflight_jobs.py resume           # Reattach a new browser to every stored job
+    python3 inflight_jobs.py resume --http    # Poll the stored URLs with requests
+"""
+
+import os
+import sys
+import json
+import time
+import fcntl
+import argparse
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+
+RESULTS_MARKER = "Toxicity Model Report"
+INPUT_SITE = parse_qs(urlsplit(config.PROTOX_INPUT_URL).query).get('site', [''])[0]
+
+
+def is_job_url(url):
+    """
+    True if a URL is a ProTox results or job page that can be reopened later
+
+    The input page (whichever scheme the server redirected it to) and pages
+    of other hosts, such as about:blank or error pages, are not job pages.
+    """
+    base = urlsplit(config.PROTOX_BASE_URL)
+    parts = urlsplit(url or '')
+    if parts.scheme not in ('http', 'https') or parts.hostname != base.hostname:
+        return False
+    if not parts.path.startswith(base.path):
+        return False
+    site = parse_qs(parts.query).get('site', [''])[0]
+    if site == INPUT_SITE or (not site and parts.path.rstrip('/') in (base.path, base.path + '/index.php')):
+        return False
+    return True
+
+
+@contextmanager
+def _locked():
+    """Hold the host-wide job file lock"""
+    with open(config.INFLIGHT_JOBS_FILE + '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read():
+    """Read all jobs (caller must hold the lock)"""
+    if not os.path.exists(config.INFLIGHT_JOBS_FILE):
+        return {}
+    try:
+        with open(config.INFLIGHT_JOBS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        return {}
+
+
+def _write(jobs):
+    """Atomically write all jobs (caller must hold the lock)"""
+    temp_file = config.INFLIGHT_JOBS_FILE + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(jobs, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, config.INFLIGHT_JOBS_FILE)
+
+
+def save_job(pubchem_id, canonical_smiles, url, cookies, submitted_at, max_wait):
+    """Record a job the server has accepted"""
+    with _locked():
+        jobs = _read()
+        jobs[str(pubchem_id)] = {
+            'pubchem_id': str(pubchem_id),
+            'canonical_smiles': canonical_smiles,
+            'url': url,
+            'cookies': cookies,
+            'submitted_at': submitted_at,
+            'max_wait': max_wait,
+        }
+        _write(jobs)
+
+
+def remove_job(pubchem_id):
+    """Forget a job whose wait has ended"""
+    with _locked():
+        jobs = _read()
+        if jobs.pop(str(pubchem_id), None) is not None:
+            _write(jobs)
+
+
+def expired(job):
+    """True if the job's wait ceiling has passed"""
+    return time.time() > job['submitted_at'] + job['max_wait']
+
+
+def get_job(pubchem_id):
+    """
+    Return the stored job of a compound, or None
+
+    Expired jobs are returned too: the caller checks their page once and
+    removes them (wait_for_results / resume_jobs).
+    """
+    with _locked():
+        return _read().get(str(pubchem_id))
+
+
+def load_jobs():
+    """Return all stored jobs"""
+    with _locked():
+        return _read()
+
+
+def poll_job_http(job, log=print):
+    """
+    Wait for a stored job with plain HTTP requests (no browser)
+
+    Returns:
+        str: Results page HTML, or None if the job failed or timed out
+    """
+    import requests
+    from protox_full_automation import detect_failure, visible_text
+
+    session = requests.Session()
+    session.verify = False  # Same certificate handling as the browser
+    for cookie in job['cookies']:
+        session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+
+    # An expired job is still polled once before it is given up
+    while True:
+        try:
+            response = session.get(job['url'], timeout=config.BROWSER_TIMEOUT)
+            page_source = response.text
+            if RESULTS_MARKER in page_source:
+                return page_source
+            failure_reason = detect_failure(visible_text(page_source))
+            if failure_reason:
+                log(f"  ✗ Server reported failure: {failure_reason}")
+                return None
+        except requests.exceptions.RequestException as e:
+            log(f"  ⚠ Poll failed: {e}")
+        if expired(job):
+            break
+        remaining = job['submitted_at'] + job['max_wait'] - time.time()
+        log(f"  Waiting... ({max(int(remaining), 0)}s left)")
+        time.sleep(min(config.RESULT_POLL_INTERVAL, max(remaining, 0)))
+    log(f"  ✗ Timeout waiting for results (>{job['max_wait']}s)")
+    return None
+
+
+def list_jobs():
+    """Print every stored job"""
+    jobs = load_jobs()
+    print(f"In-flight jobs: {len(jobs)}")
+    for job in jobs.values():
+        age = time.time() - job['submitted_at']
+        state = 'expired' if expired(job) else f"{int(job['max_wait'] - age)}s left"
+        print(f"  PubChem_ID {job['pubchem_id']}: submitted {int(age)}s ago ({state}) {job['url']}")
+
+
+def resume_jobs(use_http):
+    """Finish every stored job without resubmitting it"""
+    from protox_full_automation import (
+        log_message, log_success, create_driver, reattach_compound, get_result_writer, PredictionRejected,
+    )
+    jobs = list(load_jobs().values())
+    log_message(f"Resuming {len(jobs)} in-flight job(s) {'over HTTP' if use_http else 'with a new browser'}")
+    if not jobs:
+        return
+
+    driver = None if use_http else create_driver()
+    if not use_http and not driver:
+        log_message("✗ Failed to create WebDriver, exiting...")
+        return
+
+    try:
+        for job in jobs:
+            pubchem_id = job['pubchem_id']
+            log_message(f"Reattaching to compound {pubchem_id}")
+            if use_http:
+                html = poll_job_http(job, log_message)
+                success = html is not None
+                if success:
+                    get_result_writer().submit(pubchem_id, html)  # The writer decides the outcome
+                remove_job(pubchem_id)
+            else:
+                try:
+                    success = reattach_compound(driver, job)
+                except PredictionRejected as e:
+                    log_message(f"✗ Compound {pubchem_id} processing failed: {e} (not retried)")
+                    remove_job(pubchem_id)
+                    continue
+            if success:
+                log_success(pubchem_id)
+            else:
+                log_message(f"✗ Compound {pubchem_id} processing failed (reattached job)")
+    finally:
+        if driver:
+            driver.quit()
+        get_result_writer().shutdown()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Inspect and resume in-flight prediction jobs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='Show stored jobs')
+    resume_parser = subparsers.add_parser('resume', help='Reattach to stored jobs and extract their results')
+    resume_parser.add_argument('--http', action='store_true',
+                               help='Poll with plain HTTP requests instead of a browser')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        list_jobs()
+    else:
+        resume_jobs(args.http)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Merge Results From Several Machines
+Function: Combine the results directories and processing logs of hosts that each
+processed part of a library into one result set, without silent overwrites
+
+Each source is a copy of a host's project directory (with results/ and
+logs/) or a bare results directory (processing_log.txt, if any, inside it).
+CID_*.csv reports of all sources are k-way merged in PubChem_ID order; only
+the reports of one compound are in memory at a time. When several sources
+have a report for the same compound, the most complete one wins (most
+predictions), then the newest (file modification time); --prefer newest
+swaps the two. Compounds whose reports disagree on any prediction are written
+to merge_conflicts.csv. Processing logs are merged by timestamp, so
+retry_failed.py works on the merged log.
+
+Output (OUTPUT_DIR):
+    results/CID_*.csv                  Chosen report of every compound
+    results/cytotoxicity_summary.csv   Summary in the format of extract_cytotoxicity.py
+    results/prediction_store.npz       Columnar store (when NumPy is available)
+    logs/processing_log.txt            Merged processing log
+    merge_conflicts.csv                Disagreeing predictions, one row per model
+
+Usage:
+    python3 merge_results.py SOURCE [SOURCE ...] -o OUTPUT_DIR [--prefer complete|newest]
+
+Examples:
+    python3 merge_results.py hostA/ hostB/ hostC/ -o merged/
+    python3 merge_results.py hostA/results hostB/results -o merged/ --prefer newest
+"""
+
+import os
+import re
+import csv
+import sys
+import heapq
+import shutil
+import argparse
+import itertools
+from array import array
+from pathlib import Path
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+from extract_cytotoxicity import SUMMARY_HEADER
+
+LOG_TIMESTAMP = re.compile(r'^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\]')
+PREDICTION_LABELS = ('Active', 'Inactive')
+CONFLICT_HEADER = ['PubChem_ID', 'Shorthand', 'Chosen_Source', 'Chosen_Prediction', 'Other_Predictions']
+
+
+def source_paths(source):
+    """Return (results_dir, processing_log) of a source directory"""
+    if os.path.isdir(os.path.join(source, 'results')):
+        return os.path.join(source, 'results'), os.path.join(source, 'logs', 'processing_log.txt')
+    return source, os.path.join(source, 'processing_log.txt')
+
+
+def source_labels(sources):
+    """
+    Unique display labels for the sources
+
+    A bare results directory is named after its parent (hostA/results ->
+    hostA); labels that still collide get the source number appended (#1, #2).
+    """
+    labels = []
+    for source in sources:
+        path = os.path.abspath(source)
+        label = os.path.basename(path)
+        if label == 'results':
+            label = os.path.basename(os.path.dirname(path)) or label
+        labels.append(label or source)
+    counts = {}
+    for label in labels:
+        counts[label] = counts.get(label, 0) + 1
+    return [f"{label}#{i + 1}" if counts[label] > 1 else label for i, label in enumerate(labels)]
+
+
+def iter_report_ids(results_dir, source_index):
+    """Yield (pubchem_id, source_index) for every report of a source, in ID order"""
+    ids = array('q')
+    with os.scandir(results_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith('CID_') and name.endswith('.csv'):
+                pubchem_id = name[4:-4]
+                if pubchem_id.isdigit() and str(int(pubchem_id)) == pubchem_id:
+                    ids.append(int(pubchem_id))
+    for pubchem_id in sorted(ids):
+        yield pubchem_id, source_index
+
+
+def read_candidate(path):
+    """
+    Read one report
+
+    Returns:
+        dict: 'rows' (all non-empty rows), 'predictions' ({shorthand: prediction}),
+              'mtime' (modification time)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = [row for row in csv.reader(f) if row]
+    predictions = {row[2]: row[3] for row in rows if len(row) >= 5 and row[3] in PREDICTION_LABELS}
+    return {'path': path, 'rows': rows, 'predictions': predictions, 'mtime': os.stat(path).st_mtime}
+
+
+def choose(candidates, prefer):
+    """Pick the winning candidate: most complete then newest, or the reverse"""
+    if prefer == 'newest':
+        return max(candidates, key=lambda c: (c['mtime'], len(c['predictions'])))
+    return max(candidates, key=lambda c: (len(c['predictions']), c['mtime']))
+
+
+def find_conflicts(pubchem_id, candidates, winner):
+    """Conflict rows for every model the candidates disagree on (candidates are keyed by source index)"""
+    conflicts = []
+    shorthands = sorted(set().union(*(c['predictions'] for c in candidates)))
+    for shorthand in shorthands:
+        values = {c['source']: (c['label'], c['predictions'][shorthand])
+                  for c in candidates if shorthand in c['predictions']}
+        if len({value for _, value in values.values()}) > 1:
+            others = '; '.join(f"{label}={value}" for source, (label, value) in values.items()
+                               if source != winner['source'])
+            conflicts.append([pubchem_id, shorthand, winner['label'],
+                              winner['predictions'].get(shorthand, ''), others])
+    return conflicts
+
+
+def iter_log_entries(log_file):
+    """Yield (timestamp, lines) entries; lines without a timestamp belong to the entry before them"""
+    stamp, lines = '', []
+    with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = LOG_TIMESTAMP.match(line)
+            if match:
+                if lines:
+                    yield stamp, lines
+                stamp, lines = match.group(1), []
+            lines.append(line)
+    if lines:
+        yield stamp, lines
+
+
+def merge_logs(log_files, output_file):
+    """Merge processing logs by timestamp (each log is already in time order)"""
+    count = 0
+    with open(output_file, 'w', encoding='utf-8') as out:
+        for _, lines in heapq.merge(*(iter_log_entries(log) for log in log_files), key=lambda entry: entry[0]):
+            out.writelines(lines)
+            count += 1
+    return count
+
+
+def merge_results(sources, output_dir, prefer='complete'):
+    """Merge the result sets of several sources into output_dir"""
+    print("=" * 60)
+    print("Merging Result Sets")
+    print("=" * 60)
+
+    output_dir = os.path.abspath(output_dir)
+    results_out = os.path.join(output_dir, 'results')
+    logs_out = os.path.join(output_dir, 'logs')
+    labels = source_labels(sources)
+    results_dirs, log_files = [], []
+    for label, source in zip(labels, sources):
+        results_dir, log_file = source_paths(source)
+        if not os.path.isdir(results_dir):
+            print(f"✗ Results directory not found: {results_dir}")
+            return False
+        if os.path.abspath(results_dir) == results_out:
+            print(f"✗ Output directory must differ from every source: {source}")
+            return False
+        results_dirs.append(results_dir)
+        if os.path.exists(log_file):
+            log_files.append(log_file)
+        print(f"Source {label}: {results_dir}" + ("" if os.path.exists(log_file) else " (no processing log)"))
+    print(f"Output directory: {output_dir}")
+    print(f"Preference: {'most complete, then newest' if prefer == 'complete' else 'newest, then most complete'}")
+    print("")
+
+    os.makedirs(results_out, exist_ok=True)
+    os.makedirs(logs_out, exist_ok=True)
+
+    counts = {'compounds': 0, 'duplicated': 0, 'conflicted': 0, 'conflict_rows': 0, 'summarized': 0}
+    reports_per_source = [0] * len(sources)
+    summary_file = os.path.join(results_out, os.path.basename(config.CYTOTOXICITY_SUMMARY_FILE))
+    conflicts_file = os.path.join(output_dir, 'merge_conflicts.csv')
+
+    merged = heapq.merge(*(iter_report_ids(results_dir, i) for i, results_dir in enumerate(results_dirs)))
+    with open(summary_file, 'w', newline='', encoding='utf-8') as summary_f, \
+            open(conflicts_file, 'w', newline='', encoding='utf-8') as conflicts_f:
+        summary = csv.writer(summary_f)
+        summary.writerow(SUMMARY_HEADER)
+        conflicts_out = csv.writer(conflicts_f)
+        conflicts_out.writerow(CONFLICT_HEADER)
+
+        for pubchem_id, group in itertools.groupby(merged, key=lambda item: item[0]):
+            candidates = []
+            for _, source_index in group:
+                reports_per_source[source_index] += 1
+                path = os.path.join(results_dirs[source_index], f"CID_{pubchem_id}.csv")
+                try:
+                    candidate = read_candidate(path)
+                except (OSError, UnicodeDecodeError) as e:
+                    print(f"  ✗ Cannot read {path}: {e}")
+                    continue
+                candidate['source'] = source_index
+                candidate['label'] = labels[source_index]
+                candidates.append(candidate)
+            if not candidates:
+                continue
+
+            counts['compounds'] += 1
+            winner = choose(candidates, prefer)
+            if len(candidates) > 1:
+                counts['duplicated'] += 1
+                conflicts = find_conflicts(pubchem_id, candidates, winner)
+                if conflicts:
+                    counts['conflicted'] += 1
+                    counts['conflict_rows'] += len(conflicts)
+                    conflicts_out.writerows(conflicts)
+                    print(f"  ⚠ CID {pubchem_id}: {len(conflicts)} conflicting prediction(s), "
+                          f"kept {winner['label']}")
+
+            shutil.copy2(winner['path'], os.path.join(results_out, f"CID_{pubchem_id}.csv"))
+            for row in winner['rows']:
+                if 'Cytotoxicity' in ' '.join(row):
+                    summary.writerow([pubchem_id] + row)
+                    counts['summarized'] += 1
+                    break
+
+    for label, count in zip(labels, reports_per_source):
+        print(f"  {label}: {count} reports")
+    print(f"✓ Merged reports: {counts['compounds']} compounds")
+    print(f"  Present in several sources: {counts['duplicated']}")
+    print(f"  With conflicting predictions: {counts['conflicted']} ({counts['conflict_rows']} model rows)")
+    print(f"✓ Summary file saved: {summary_file} ({counts['summarized']} rows)")
+    if counts['conflict_rows']:
+        print(f"⚠ Conflicts written to: {conflicts_file}")
+
+    if log_files:
+        entries = merge_logs(log_files, os.path.join(logs_out, os.path.basename(config.PROCESSING_LOG_FILE)))
+        print(f"✓ Merged {len(log_files)} processing logs ({entries} entries)")
+
+    # Columnar store for prediction_stats.py / query_predictions.py
+    try:
+        from prediction_stats import load_store
+    except ImportError:
+        print("⚠ NumPy not installed, prediction store not built")
+    else:
+        store = load_store(results_out, os.path.join(results_out, os.path.basename(config.PREDICTION_STORE_FILE)))
+        print(f"✓ Prediction store built: {len(store)} predictions")
+
+    print("=" * 60)
+    print("Merge Complete")
+    print("=" * 60)
+    return True
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Merge result sets produced on several machines')
+    parser.add_argument('sources', nargs='+', help='Project or results directories to merge')
+    parser.add_argument('-o', '--output', required=True, help='Output directory')
+    parser.add_argument('--prefer', choices=['complete', 'newest'], default='complete',
+                        help='Which duplicate report wins (default: complete)')
+    args = parser.parse_args()
+
+    if not merge_results(args.sources, args.output, args.prefer):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Offline Compound-Name Resolution Cache
+Function: Resolve compound names to SMILES locally so protox3_api.py can submit
+SMILES instead of asking the server for a PubChem name lookup
+
+Names are stored case-insensitively in a SQLite database (NAME_CACHE_FILE).
+The cache is bulk-loaded from CSV files or SDF dumps (e.g. a PubChem
+download).
+
+Usage:
+    python3 name_cache.py load-csv <file> [--name-column NAME] [--smiles-column SMILES]
+    python3 name_cache.py load-sdf <file> [--name-field FIELD ...] [--smiles-field FIELD]
+    python3 name_cache.py lookup <name> [<name> ...]
+    python3 name_cache.py stats
+
+Examples:
+    python3 name_cache.py load-csv data/compound_names.csv --name-column Name --smiles-column SMILES
+    python3 name_cache.py load-sdf pubchem_dump.sdf --name-field PUBCHEM_IUPAC_NAME
+    python3 name_cache.py lookup aspirin
+"""
+
+import os
+import csv
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+
+INSERT_BATCH = 10000  # Rows per executemany call when bulk loading
+SDF_SMILES_FIELDS = ('PUBCHEM_OPENEYE_CAN_SMILES', 'PUBCHEM_SMILES', 'SMILES')
+SDF_NAME_FIELDS = ('PUBCHEM_IUPAC_NAME', 'NAME', 'Name')
+
+
+def normalize_name(name):
+    """Key under which a name is stored (case and surrounding space ignored)"""
+    return ' '.join(name.split()).lower()
+
+
+class NameResolver:
+    """Persistent name -> SMILES mapping backed by SQLite (safe to share between threads)"""
+
+    def __init__(self, db_file=None):
+        self.db_file = db_file or config.NAME_CACHE_FILE
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS names ("
+            " name TEXT PRIMARY KEY,"
+            " smiles TEXT NOT NULL,"
+            " source TEXT,"
+            " updated_at TEXT)"
+        )
+        self.conn.commit()
+
+    def lookup(self, name):
+        """Return the SMILES of a name, or None if it is not cached"""
+        with self.lock:
+            row = self.conn.execute("SELECT smiles FROM names WHERE name = ?", (normalize_name(name),)).fetchone()
+        return row[0] if row else None
+
+    def add(self, name, smiles, source='manual'):
+        """Store one name"""
+        self.add_many([(name, smiles)], source)
+
+    def add_many(self, pairs, source):
+        """
+        Store (name, smiles) pairs in one transaction per INSERT_BATCH rows
+
+        Returns:
+            int: Number of pairs stored
+        """
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        count = 0
+        batch = []
+        for name, smiles in pairs:
+            if not name or not smiles:
+                continue
+            batch.append((normalize_name(name), smiles.strip(), source, timestamp))
+            if len(batch) >= INSERT_BATCH:
+                count += self._insert(batch)
+                batch = []
+        if batch:
+            count += self._insert(batch)
+        return count
+
+    def _insert(self, batch):
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO names VALUES (?, ?, ?, ?)", batch)
+        return len(batch)
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM names").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def iter_csv_pairs(csv_file, name_column, smiles_column):
+    """Yield (name, smiles) pairs from a CSV file"""
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield row.get(name_column, ''), row.get(smiles_column, '')
+
+
+def iter_sdf_records(sdf_file):
+    """Yield (mol_block, {field: [lines]}) for every record of an SDF file"""
+    mol_lines, fields, field = [], {}, None
+    in_data = False
+    with open(sdf_file, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if line == '$$$$':
+                yield '\n'.join(mol_lines), fields
+                mol_lines, fields, field, in_data = [], {}, None, False
+            elif line.startswith('>') and '<' in line:
+                in_data = True
+                field = line[line.index('<') + 1:line.index('>', line.index('<'))]
+                fields[field] = []
+            elif in_data:
+                if line.strip() and field is not None:
+                    fields[field].append(line.strip())
+            else:
+                mol_lines.append(line)
+
+
+def iter_sdf_pairs(sdf_file, name_fields, smiles_field):
+    """
+    Yield (name, smiles) pairs from an SDF dump
+
+    Every line of every name field is a name (synonym lists work). The SMILES
+    comes from a data field, or is computed from the structure when RDKit is
+    available.
+    """
+    try:
+        from rdkit import Chem
+    except ImportError:
+        Chem = None
+
+    smiles_fields = [smiles_field] if smiles_field else SDF_SMILES_FIELDS
+    for mol_block, fields in iter_sdf_records(sdf_file):
+        smiles = next((fields[key][0] for key in smiles_fields if fields.get(key)), None)
+        if smiles is None and Chem is not None:
+            mol = Chem.MolFromMolBlock(mol_block)
+            smiles = Chem.MolToSmiles(mol) if mol is not None else None
+        if not smiles:
+            continue
+        for key in name_fields:
+            for name in fields.get(key, []):
+                yield name, smiles
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Offline compound-name to SMILES cache')
+    parser.add_argument('--db', default=config.NAME_CACHE_FILE, help='Cache database (default: from config.py)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    csv_parser = subparsers.add_parser('load-csv', help='Bulk-load names from a CSV file')
+    csv_parser.add_argument('file', help='CSV file')
+    csv_parser.add_argument('--name-column', default='Name', help='Name column (default: Name)')
+    csv_parser.add_argument('--smiles-column', default='SMILES', help='SMILES column (default: SMILES)')
+
+    sdf_parser = subparsers.add_parser('load-sdf', help='Bulk-load names from an SDF dump')
+    sdf_parser.add_argument('file', help='SDF file')
+    sdf_parser.add_argument('--name-field', nargs='+', default=list(SDF_NAME_FIELDS),
+                            help='Data field(s) holding names or synonyms')
+    sdf_parser.add_argument('--smiles-field', default=None,
+                            help='Data field holding the SMILES (default: PubChem SMILES fields, '
+                                 'else computed with RDKit)')
+
+    lookup_parser = subparsers.add_parser('lookup', help='Resolve names from the cache')
+    lookup_parser.add_argument('names', nargs='+', help='Compound names')
+
+    subparsers.add_parser('stats', help='Show cache size')
+
+    args = parser.parse_args()
+    resolver = NameResolver(args.db)
+
+    try:
+        if args.command in ('load-csv', 'load-sdf'):
+            if not os.path.exists(args.file):
+                print(f"✗ File not found: {args.file}")
+                return
+            started = time.time()
+            if args.command == 'load-csv':
+                pairs = iter_csv_pairs(args.file, args.name_column, args.smiles_column)
+            else:
+                pairs = iter_sdf_pairs(args.file, args.name_field, args.smiles_field)
+            count = resolver.add_many(pairs, os.path.basename(args.file))
+            print(f"✓ Loaded {count} names in {time.time() - started:.1f}s ({len(resolver)} cached)")
+        elif args.command == 'lookup':
+            for name in args.names:
+                smiles = resolver.lookup(name)
+                print(f"{name}: {smiles if smiles else '(not cached)'}")
+        else:
+            print(f"Cache file: {args.db}")
+            print(f"Cached names: {len(resolver)}")
+    finally:
+        resolver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+ProTox-3 Streaming Pipeline
+Function: Run conversion, prediction and aggregation as concurrent stages connected
+by bounded queues, so the summary grows while the run is in progress
+
+    input.csv --> [convert] --queue--> [predict x N] --queue--> [aggregate] --> summary
+
+The convert stage canonicalizes (and pre-screens) rows as they are read. Each
+prediction worker owns a browser. The aggregator appends each new
+Cytotoxicity row to the summary file as soon as a compound finishes. Bounded
+queues provide backpressure: conversion never runs far ahead of prediction.
+
+Progress, per-worker state, throughput and ETA are published live through
+run_status.py (RUN_STATUS_FILE and a local HTTP endpoint).
+
+Ctrl+C stops handing out new compounds and lets workers finish the compound
+in progress; a second Ctrl+C exits immediately. Re-running skips every
+compound that already has a CID_*.csv result (adding its summary row if it
+is missing, e.g. for results written by another runner), so runs can be
+resumed.
+
+Usage:
+    python3 pipeline.py [start_index] [end_index] [--workers N]
+
+Examples:
+    python3 pipeline.py                 # Process all compounds
+    python3 pipeline.py 0 100 -w 3      # Compounds 0-100 with three browsers
+"""
+
+import os
+import csv
+import sys
+import queue
+import time
+import signal
+import argparse
+import threading
+from pathlib import Path
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+from convert_smiles import convert_compound
+from extract_cytotoxicity import find_cytotoxicity_row, SUMMARY_HEADER
+from prescreen import REJECTED_FIELDS
+from run_status import RunStatus
+from row_index import RowIndex
+from protox_full_automation import (
+    log_message, create_driver, page_load_summary, process_with_retries, when_reported,
+    load_result_index, reuse_result, share_result,
+    get_result_writer, wait_for_result,
+)
+
+CANONICAL_FIELDS = ['PubChem_ID', 'Original_SMILES', 'Canonical_SMILES']
+
+# Stage end marker
+DONE = None
+
+
+class Pipeline:
+    """Bounded-queue pipeline: convert -> predict (N workers) -> aggregate"""
+
+    def __init__(self, start_idx, end_idx, workers, standardize):
+        self.start_idx = start_idx
+        self.end_idx = end_idx
+        self.workers = workers
+        self.standardize = standardize
+
+        self.compound_queue = queue.Queue(maxsize=config.PIPELINE_QUEUE_SIZE)
+        self.result_queue = queue.Queue(maxsize=config.PIPELINE_QUEUE_SIZE)
+        self.stop_event = threading.Event()
+
+        self.result_index = load_result_index()
+        self.duplicates = {}  # representative PubChem_ID -> duplicate IDs found so far
+        self.index_lock = threading.Lock()
+
+        self.counts = {'queued': 0, 'skipped': 0, 'rejected': 0, 'success': 0, 'failed': 0, 'summarized': 0}
+        self.counts_lock = threading.Lock()
+
+        # Total grows as compounds are read, so the ETA covers the input seen so far
+        self.status = RunStatus(total=0, workers=workers)
+        self.status.set_stat('input_complete', False)
+
+    def count(self, key, n=1):
+        with self.counts_lock:
+            self.counts[key] += n
+
+    def count_outcome(self, pubchem_id, success, seconds):
+        """Count a predicted compound once the report writer has decided its outcome"""
+        self.count('success' if success else 'failed')
+        self.status.finish_compound(None, pubchem_id, success, seconds if success else None)
+
+    def put(self, target_queue, item):
+        """Put an item on a queue, giving up if the pipeline is stopping"""
+        while not self.stop_event.is_set():
+            try:
+                target_queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # ------------------------------------------------------------------
+    # Stage 1: read and convert
+    # ------------------------------------------------------------------
+
+    def iter_input(self):
+        """
+        Yield (PubChem_ID, Canonical_SMILES, InChIKey) rows in the selected range
+
+        Uses the canonical SMILES file if it is complete (reading only the
+        selected range through its row index), otherwise converts INPUT_FILE on
+        the fly and writes the canonical file as it goes.
+        """
+        if os.path.exists(config.CANONICAL_SMILES_FILE):
+            log_message(f"Using existing canonical SMILES file: {config.CANONICAL_SMILES_FILE}")
+            with RowIndex.open(config.CANONICAL_SMILES_FILE) as index:
+                for row in index.iter_rows(self.start_idx, self.end_idx):
+                    yield row['PubChem_ID'], row['Canonical_SMILES'], row.get('InChIKey')
+            return
+
+        log_message(f"Converting {config.INPUT_FILE} while predicting")
+        partial_file = config.CANONICAL_SMILES_FILE + '.partial'
+        fieldnames = CANONICAL_FIELDS + (['InChIKey'] if self.standardize else [])
+        completed = False
+        idx = 0  # Index into the canonical file, as used by protox_full_automation.py
+        with open(config.INPUT_FILE, 'r', encoding='utf-8') as f, \
+                open(partial_file, 'w', newline='', encoding='utf-8') as out:
+            writer = csv.DictWriter(out, fieldnames=fieldnames)
+            writer.writeheader()
+            for row in csv.DictReader(f):
+                outcome = convert_compound((row, self.standardize))
+                if outcome['status'] == 'rejected':
+                    self.save_rejected(outcome)
+                if outcome['status'] != 'converted':
+                    continue
+
+                canonical = {
+                    'PubChem_ID': outcome['PubChem_ID'],
+                    'Original_SMILES': outcome['SMILES'],
+                    'Canonical_SMILES': outcome['Canonical_SMILES'],
+                }
+                if self.standardize:
+                    canonical['InChIKey'] = outcome['InChIKey'] or ''
+                writer.writerow(canonical)
+                out.flush()
+
+                if idx >= self.start_idx and (self.end_idx is None or idx < self.end_idx):
+                    yield outcome['PubChem_ID'], outcome['Canonical_SMILES'], outcome.get('InChIKey')
+                idx += 1
+                if self.stop_event.is_set():
+                    break
+            else:
+                completed = True
+
+        # Only a fully converted file replaces the canonical SMILES file
+        if completed:
+            os.replace(partial_file, config.CANONICAL_SMILES_FILE)
+
+    def save_rejected(self, outcome):
+        """Append a compound rejected by the pre-screen to the rejected file"""
+        self.count('rejected')
+        write_header = not os.path.exists(config.REJECTED_COMPOUNDS_FILE)
+        with open(config.REJECTED_COMPOUNDS_FILE, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=REJECTED_FIELDS)
+            if write_header:
+                writer.writeheader()
+            writer.writerow({'PubChem_ID': outcome['PubChem_ID'], 'SMILES': outcome['SMILES'],
+                             'Reason': outcome['reason']})
+
+    def convert_stage(self):
+        """Stream compounds that still need a prediction into the compound queue"""
+        seen_keys = {}
+        try:
+            for pubchem_id, canonical_smiles, inchikey in self.iter_input():
+                if self.stop_event.is_set():
+                    break
+
+                # Resume: compounds with a stored result are done. The result may
+                # come from another runner, so the aggregator still checks that
+                # it is in the summary (it skips IDs already summarized)
+                if os.path.exists(os.path.join(config.RESULTS_DIR, f"CID_{pubchem_id}.csv")):
+                    self.count('skipped')
+                    self.put(self.result_queue, pubchem_id)
+                    continue
+
+                if inchikey:
+                    with self.index_lock:
+                        if reuse_result(pubchem_id, inchikey, self.result_index):
+                            self.status.add_total()
+                            self.status.skip()
+                            self.put(self.result_queue, pubchem_id)
+                            continue
+                        if inchikey in seen_keys:
+                            # Same parent structure already queued: wait for its result
+                            self.duplicates.setdefault(seen_keys[inchikey], []).append(pubchem_id)
+                            continue
+                        seen_keys[inchikey] = pubchem_id
+
+                if not self.put(self.compound_queue, (pubchem_id, canonical_smiles, inchikey)):
+                    break
+                self.count('queued')
+                self.status.add_total()
+            else:
+                self.status.set_stat('input_complete', True)
+        except Exception as e:
+            log_message(f"✗ Convert stage failed: {e}")
+            self.stop_event.set()
+        finally:
+            for _ in range(self.workers):
+                self.compound_queue.put(DONE)
+
+    # ------------------------------------------------------------------
+    # Stage 2: predict
+    # ------------------------------------------------------------------
+
+    def predict_stage(self, worker_id):
+        """Take compounds from the queue and run predictions with one browser"""
+        self.status.worker_state(worker_id, 'starting')
+        driver = create_driver(worker_id)
+        if not driver:
+            log_message(f"✗ Worker {worker_id}: failed to create WebDriver")
+            self.status.worker_state(worker_id, 'stopped')
+            self.drain_compounds()
+            return
+
+        try:
+            while True:
+                self.status.worker_state(worker_id, 'idle')
+                item = self.compound_queue.get()
+                if item is DONE:
+                    break
+                if self.stop_event.is_set():
+                    continue  # Drain without starting new predictions
+
+                pubchem_id, canonical_smiles, inchikey = item
+                log_message(f"\n[Worker {worker_id}] Processing compound {pubchem_id}")
+                self.status.set_stat('compound_queue_depth', self.compound_queue.qsize())
+                self.status.start_compound(worker_id, pubchem_id)
+                started = time.time()
+                captured = process_with_retries(driver, pubchem_id, canonical_smiles)
+                seconds = time.time() - started
+                self.status.worker_state(worker_id, 'idle')
+                when_reported(pubchem_id, captured,
+                              lambda success, pubchem_id=pubchem_id, seconds=seconds:
+                              self.count_outcome(pubchem_id, success, seconds))
+                if captured:
+                    with self.index_lock:
+                        copies = share_result(pubchem_id, inchikey, self.result_index, self.duplicates)
+                    for completed_id in [pubchem_id] + copies:
+                        self.put(self.result_queue, completed_id)
+                else:
+                    # Duplicates waiting for this result fail with it (retry_failed.py picks them up)
+                    with self.index_lock:
+                        copies = self.duplicates.pop(pubchem_id, [])
+                    for duplicate_id in copies:
+                        self.count('failed')
+                        log_message(f"✗ Compound {duplicate_id} processing failed (same structure as CID {pubchem_id})")
+                self.status.set_stat('writer_queue_depth', get_result_writer().queue_depth())
+        finally:
+            driver.quit()
+            log_message(f"[Worker {worker_id}] WebDriver closed")
+            self.status.worker_state(worker_id, 'stopped')
+
+    def drain_compounds(self):
+        """Consume the compound queue until the end marker (used by failed workers)"""
+        while self.compound_queue.get() is not DONE:
+            pass
+
+    # ------------------------------------------------------------------
+    # Stage 3: aggregate
+    # ------------------------------------------------------------------
+
+    def aggregate_stage(self):
+        """Append the Cytotoxicity row of every completed compound to the summary"""
+        summarized = set()
+        if os.path.exists(config.CYTOTOXICITY_SUMMARY_FILE):
+            with open(config.CYTOTOXICITY_SUMMARY_FILE, 'r', encoding='utf-8') as f:
+                summarized = {row[0] for row in csv.reader(f) if row}
+
+        write_header = not summarized
+        with open(config.CYTOTOXICITY_SUMMARY_FILE, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(SUMMARY_HEADER)
+                f.flush()
+
+            while True:
+                pubchem_id = self.result_queue.get()
+                if pubchem_id is DONE:
+                    break
+                if pubchem_id in summarized:
+                    continue
+                wait_for_result(pubchem_id)
+                report_file = os.path.join(config.RESULTS_DIR, f"CID_{pubchem_id}.csv")
+                row = find_cytotoxicity_row(report_file) if os.path.exists(report_file) else None
+                if row:
+                    writer.writerow([pubchem_id] + row)
+                    f.flush()
+                    summarized.add(pubchem_id)
+                    self.count('summarized')
+
+    # ------------------------------------------------------------------
+
+    def run(self):
+        """Run all stages until the input is exhausted or the run is stopped"""
+        converter = threading.Thread(target=self.convert_stage, name='convert', daemon=True)
+        predictors = [threading.Thread(target=self.predict_stage, args=(i,), name=f'predict-{i}', daemon=True)
+                      for i in range(self.workers)]
+        aggregator = threading.Thread(target=self.aggregate_stage, name='aggregate', daemon=True)
+
+        aggregator.start()
+        converter.start()
+        for predictor in predictors:
+            predictor.start()
+
+        # Join with timeouts so Ctrl+C is delivered to the main thread
+        for thread in [converter] + predictors:
+            while thread.is_alive():
+                thread.join(timeout=1)
+
+        self.result_queue.put(DONE)
+        while aggregator.is_alive():
+            aggregator.join(timeout=1)
+        get_result_writer().shutdown()
+        self.status.close()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='ProTox-3 Streaming Pipeline')
+    parser.add_argument('start', type=int, nargs='?', default=0,
+                        help='Start index (default: 0)')
+    parser.add_argument('end', type=int, nargs='?', default=None,
+                        help='End index (default: all)')
+    parser.add_argument('-w', '--workers', type=int, default=config.PIPELINE_WORKERS,
+                        help='Number of prediction workers (default: from config.py)')
+    parser.add_argument('--standardize', action='store_true', default=config.STANDARDIZE_STRUCTURES,
+                        help='Standardize structures when converting (see convert_smiles.py)')
+    args = parser.parse_args()
+
+    pipeline = Pipeline(args.start, args.end, args.workers, args.standardize)
+
+    def handle_interrupt(signum, frame):
+        if pipeline.stop_event.is_set():
+            log_message("✗ Second interrupt, exiting immediately")
+            os._exit(1)
+        log_message("⚠ Interrupt received: finishing compounds in progress, press Ctrl+C again to abort")
+        pipeline.stop_event.set()
+
+    signal.signal(signal.SIGINT, handle_interrupt)
+    signal.signal(signal.SIGTERM, handle_interrupt)
+
+    log_message("=" * 60)
+    log_message("ProTox-3 Streaming Pipeline Started")
+    log_message("=" * 60)
+    log_message(f"  Start index: {args.start}")
+    log_message(f"  End index: {args.end if args.end is not None else 'all'}")
+    log_message(f"  Prediction workers: {args.workers}")
+    log_message(f"  Summary file: {config.CYTOTOXICITY_SUMMARY_FILE}")
+    status_url = pipeline.status.serve()
+    if status_url:
+        log_message(f"  Live status: {status_url}")
+    log_message(f"  Status file: {pipeline.status.status_file}")
+    log_message("")
+
+    pipeline.run()
+
+    counts = pipeline.counts
+    log_message("=" * 60)
+    log_message("Pipeline Complete" if not pipeline.stop_event.is_set() else "Pipeline Stopped (resume by re-running)")
+    log_message("=" * 60)
+    log_message(f"Already done (skipped): {counts['skipped']}")
+    log_message(f"Rejected by pre-screen: {counts['rejected']}")
+    log_message(f"Submitted: {counts['queued']}")
+    log_message(f"Successful: {counts['success']}")
+    log_message(f"Failed: {counts['failed']}")
+    log_message(f"New summary rows: {counts['summarized']}")
+    log_message(f"Input page loads: {page_load_summary()}")
+    log_message("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
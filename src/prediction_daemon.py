@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+ProTox-3 Prediction Daemon
+Function: Keep warm browsers running and accept prediction jobs over a local HTTP API
+
+Every browser is started once (with its persistent profile and warm-up when
+BROWSER_PROFILE_ENABLED is set) and then serves all jobs, so a query for a
+few compounds costs only the prediction time. Compounds go through
+process_with_retries and the background report writer, exactly like batch
+runs, and land in the same RESULTS_DIR and processing log. Compounds that
+already have a report are answered from it unless the job asks to force a
+new prediction. A compound that is already queued or running for another
+job is not predicted twice: both jobs receive the one result.
+
+API (127.0.0.1:DAEMON_PORT):
+    POST   /jobs               {"compounds": [{"pubchem_id": "2244", "smiles": "..."}], "force": false}
+                               -> 202 {"job_id": ..., "status_url": ..., "results_url": ...}
+    GET    /jobs               Summaries of all known jobs
+    GET    /jobs/<id>          Job summary
+    GET    /jobs/<id>/results  Results as JSON Lines, streamed as compounds complete
+    DELETE /jobs/<id>          Cancel the compounds of a job that have not started
+    GET    /status             Live run status (see run_status.py)
+
+Usage:
+    python3 prediction_daemon.py [-w WORKERS] [--port PORT]
+
+Examples:
+    python3 prediction_daemon.py -w 2
+    curl -s -X POST localhost:8766/jobs -d '{"compounds": [{"pubchem_id": "2244", "smiles": "CC(=O)OC1=CC=CC=C1C(=O)O"}]}'
+    curl -sN localhost:8766/jobs/<job_id>/results
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import uuid
+import queue
+import signal
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+from run_status import RunStatus
+from protox_full_automation import (
+    log_message, create_driver, process_with_retries, when_reported,
+    get_result_writer, wait_for_result,
+)
+
+# Submitted SMILES are canonicalized like convert_smiles.py when RDKit is available
+try:
+    from convert_smiles import convert_to_canonical_smiles
+except ImportError:
+    convert_to_canonical_smiles = None
+
+STOP = object()  # Worker shutdown marker
+
+
+def report_path(pubchem_id):
+    return os.path.join(config.RESULTS_DIR, f"CID_{pubchem_id}.csv")
+
+
+def read_report(pubchem_id):
+    """Return the prediction rows of a stored report as dicts, or None if there is none"""
+    wait_for_result(pubchem_id)
+    path = report_path(pubchem_id)
+    if not os.path.exists(path):
+        return None
+    predictions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) >= 5 and row[0] != 'Classification':
+                predictions.append({
+                    'classification': row[0],
+                    'target': row[1],
+                    'shorthand': row[2],
+                    'prediction': row[3],
+                    'probability': row[4],
+                })
+    return predictions
+
+
+def make_record(compound, status, seconds=None, cached=False, error=None):
+    """Result record of one compound, as returned by the API"""
+    predictions = read_report(compound['pubchem_id']) if status == 'done' else None
+    if status == 'done' and predictions is None:
+        status, error = 'failed', 'no report written'
+    return {
+        'pubchem_id': compound['pubchem_id'],
+        'smiles': compound['smiles'],
+        'status': status,
+        'cached': cached,
+        'seconds': round(seconds, 1) if seconds is not None else None,
+        'report': report_path(compound['pubchem_id']) if predictions is not None else None,
+        'predictions': predictions,
+        'error': error,
+    }
+
+
+class Job:
+    """A set of compounds submitted together, with results in completion order"""
+
+    def __init__(self, compounds):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.created_at = time.time()
+        self.finished_at = None
+        self.compounds = compounds
+        self.results = []
+        self.cancelled = False
+        self.condition = threading.Condition()
+
+    def add_result(self, record):
+        with self.condition:
+            self.results.append(record)
+            if len(self.results) == len(self.compounds):
+                self.finished_at = time.time()
+            self.condition.notify_all()
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def summary(self):
+        with self.condition:
+            counts = {}
+            for record in self.results:
+                counts[record['status']] = counts.get(record['status'], 0) + 1
+            return {
+                'job_id': self.job_id,
+                'state': 'finished' if self.finished else ('cancelling' if self.cancelled else 'running'),
+                'created_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.created_at)),
+                'total': len(self.compounds),
+                'completed': len(self.results),
+                'done': counts.get('done', 0),
+                'failed': counts.get('failed', 0),
+                'cancelled': counts.get('cancelled', 0),
+            }
+
+    def iter_results(self, poll=1.0):
+        """Yield result records as they are added, until the job has finished"""
+        sent = 0
+        while True:
+            with self.condition:
+                while sent == len(self.results) and not self.finished:
+                    self.condition.wait(poll)
+                ready = self.results[sent:]
+                finished = self.finished
+            for record in ready:
+                yield record
+            sent += len(ready)
+            if finished and sent == len(self.results):
+                return
+
+
+class PredictionService:
+    """Pool of warm browsers working through the compounds of submitted jobs"""
+
+    def __init__(self, workers=None, status=None):
+        self.workers = workers or config.DAEMON_WORKERS
+        self.queue = queue.Queue()
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()
+        # PubChem_ID -> [(job, compound)] waiting for the queued or running prediction
+        self.inflight = {}
+        self.inflight_lock = threading.Lock()
+        self.status = status or RunStatus(total=0, workers=self.workers)
+        self.threads = []
+
+    def start(self):
+        """Start the workers (each creates and warms up its browser)"""
+        for worker_id in range(self.workers):
+            thread = threading.Thread(target=self._worker, args=(worker_id,),
+                                      name=f'daemon-worker-{worker_id}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    def submit(self, compounds, force=False):
+        """
+        Queue a job
+
+        Args:
+            compounds: List of {'pubchem_id', 'smiles'} dicts
+            force: Predict again even when a report already exists
+
+        Returns:
+            Job: The queued job (results arrive asynchronously)
+        """
+        job = Job([{'pubchem_id': str(c['pubchem_id']).strip(), 'smiles': str(c.get('smiles', '')).strip()}
+                   for c in compounds])
+        with self.jobs_lock:
+            self._prune_jobs()
+            self.jobs[job.job_id] = job
+        log_message(f"Job {job.job_id}: {len(job.compounds)} compound(s) submitted")
+
+        for compound in job.compounds:
+            if not force and os.path.exists(report_path(compound['pubchem_id'])):
+                job.add_result(make_record(compound, 'done', cached=True))
+                continue
+            if convert_to_canonical_smiles is not None and compound['smiles']:
+                canonical_smiles = convert_to_canonical_smiles(compound['smiles'])
+                if canonical_smiles is None:
+                    job.add_result(make_record(compound, 'failed', error='invalid SMILES'))
+                    continue
+                compound['smiles'] = canonical_smiles
+            with self.inflight_lock:
+                waiting = self.inflight.get(compound['pubchem_id'])
+                if waiting is not None:
+                    # Already queued or running for another job: share its result
+                    waiting.append((job, compound))
+                    continue
+                self.inflight[compound['pubchem_id']] = [(job, compound)]
+            self.status.add_total()
+            self.queue.put(compound['pubchem_id'])
+        return job
+
+    def get(self, job_id):
+        with self.jobs_lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self.jobs_lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id):
+        """Mark a job cancelled; its compounds not yet started are skipped"""
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.cancelled = True
+            log_message(f"Job {job_id}: cancelled")
+        return job
+
+    def _prune_jobs(self):
+        """Forget finished jobs older than DAEMON_JOB_TTL (caller holds jobs_lock)"""
+        cutoff = time.time() - config.DAEMON_JOB_TTL
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.finished and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _worker(self, worker_id):
+        self.status.worker_state(worker_id, 'starting')
+        driver = create_driver(worker_id)
+        try:
+            while True:
+                self.status.worker_state(worker_id, 'idle')
+                pubchem_id = self.queue.get()
+                if pubchem_id is STOP:
+                    break
+                with self.inflight_lock:
+                    active = [(job, compound) for job, compound in self.inflight[pubchem_id]
+                              if not job.cancelled]
+                    cancelled = [] if active else self.inflight.pop(pubchem_id)
+                if not active:
+                    self.status.skip()
+                    for job, compound in cancelled:
+                        job.add_result(make_record(compound, 'cancelled'))
+                    continue
+
+                if driver is None or not driver_alive(driver):
+                    if driver is not None:
+                        log_message(f"[Worker {worker_id}] Browser is gone, starting a new one")
+                        quit_driver(driver)
+                    driver = create_driver(worker_id)
+                if driver is None:
+                    self.status.finish_compound(worker_id, pubchem_id, False)
+                    self._finish(pubchem_id, 'failed', error='browser could not be started')
+                    continue
+
+                job, compound = active[0]
+                try:
+                    self._predict(worker_id, driver, job, compound)
+                except Exception as e:
+                    # One bad compound must not take the worker (and its browser) down
+                    log_message(f"✗ Compound {pubchem_id} processing failed: {e}")
+                    self.status.finish_compound(worker_id, pubchem_id, False)
+                    self._finish(pubchem_id, 'failed', error=str(e))
+        finally:
+            if driver is not None:
+                quit_driver(driver)
+            self.status.worker_state(worker_id, 'stopped')
+
+    def _predict(self, worker_id, driver, job, compound):
+        """Predict one compound and hand the result to every job waiting for it"""
+        pubchem_id = compound['pubchem_id']
+        log_message(f"\n[Worker {worker_id}] Job {job.job_id}: processing compound {pubchem_id}")
+        self.status.start_compound(worker_id, pubchem_id)
+        started = time.time()
+        captured = process_with_retries(driver, pubchem_id, compound['smiles'])
+        seconds = time.time() - started
+        self.status.worker_state(worker_id, 'idle')
+        when_reported(pubchem_id, captured, lambda success: self.status.finish_compound(
+            None, pubchem_id, success, seconds if success else None))
+        self._finish(pubchem_id, 'done' if captured else 'failed', seconds)
+        self.status.set_stat('daemon_queue_depth', self.queue.qsize())
+
+    def _finish(self, pubchem_id, status, seconds=None, error=None):
+        """Add the result record of a compound to every job waiting for it (once)"""
+        with self.inflight_lock:
+            waiting = self.inflight.pop(pubchem_id, [])
+        for job, compound in waiting:
+            try:
+                record = make_record(compound, status, seconds, error=error)
+            except Exception as e:
+                record = make_record(compound, 'failed', seconds, error=f"report could not be read: {e}")
+            job.add_result(record)
+
+    def shutdown(self):
+        """Finish queued compounds, stop the browsers and flush the report writer"""
+        for _ in self.threads:
+            self.queue.put(STOP)
+        for thread in self.threads:
+            while thread.is_alive():
+                thread.join(timeout=1)
+        get_result_writer().shutdown()
+        self.status.close()
+
+
+def driver_alive(driver):
+    """True if the browser still answers WebDriver commands"""
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+# ----------------------------------------------------------------------
+# HTTP API
+# ----------------------------------------------------------------------
+
+def make_handler(service, base_url):
+    """Request handler class bound to a PredictionService"""
+
+    class DaemonHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Needed for chunked result streaming
+
+        def send_json(self, code, data):
+            body = json.dumps(data, indent=2).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def route(self):
+            """Split /jobs/<id>/<action> into (job, action); job is None for /jobs"""
+            parts = [part for part in self.path.split('?')[0].split('/') if part]
+            if not parts or parts[0] != 'jobs' or len(parts) > 3:
+                return False, None, None
+            if len(parts) == 1:
+                return True, None, None
+            return True, service.get(parts[1]), parts[2] if len(parts) == 3 else None
+
+        def do_GET(self):
+            if self.path.rstrip('/') == '/status':
+                self.send_json(200, service.status.snapshot())
+                return
+            ok, job, action = self.route()
+            if not ok:
+                self.send_error(404)
+            elif job is None and self.path.rstrip('/') == '/jobs':
+                self.send_json(200, [job.summary() for job in service.list_jobs()])
+            elif job is None:
+                self.send_json(404, {'error': 'unknown job'})
+            elif action is None:
+                self.send_json(200, job.summary())
+            elif action == 'results':
+                self.stream_results(job)
+            else:
+                self.send_error(404)
+
+        def stream_results(self, job):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for record in job.iter_results():
+                    line = (json.dumps(record) + '\n').encode('utf-8')
+                    self.wfile.write(f"{len(line):x}\r\n".encode('ascii') + line + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client went away; the job keeps running
+
+        def do_POST(self):
+            if self.path.rstrip('/') != '/jobs':
+                self.send_error(404)
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                compounds = request['compounds']
+                if not compounds or not all(isinstance(c, dict) and str(c.get('pubchem_id', '')).strip().isdigit()
+                                            for c in compounds):
+                    raise ValueError('every compound needs a numeric pubchem_id')
+                if not all(c.get('smiles') for c in compounds):
+                    raise ValueError('every compound needs a smiles')
+            except (ValueError, KeyError, TypeError) as e:
+                self.send_json(400, {'error': f"invalid job: {e}"})
+                return
+            job = service.submit(compounds, force=bool(request.get('force')))
+            self.send_json(202, {
+                'job_id': job.job_id,
+                'status_url': f"{base_url}/jobs/{job.job_id}",
+                'results_url': f"{base_url}/jobs/{job.job_id}/results",
+            })
+
+        def do_DELETE(self):
+            ok, job, action = self.route()
+            if not ok or action is not None:
+                self.send_error(404)
+            elif job is None:
+                self.send_json(404, {'error': 'unknown job'})
+            else:
+                service.cancel(job.job_id)
+                self.send_json(200, job.summary())
+
+        def log_message(self, format, *args):
+            pass  # Keep the console for the run log
+
+    return DaemonHandler
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='ProTox-3 prediction daemon with a local job API')
+    parser.add_argument('-w', '--workers', type=int, default=config.DAEMON_WORKERS,
+                        help='Number of browsers kept running (default: from config.py)')
+    parser.add_argument('--port', type=int, default=config.DAEMON_PORT,
+                        help='Port on 127.0.0.1 (default: from config.py)')
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    service = PredictionService(args.workers)
+    try:
+        server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(service, base_url))
+    except OSError as e:
+        log_message(f"✗ Cannot listen on port {args.port}: {e}")
+        sys.exit(1)
+    server.daemon_threads = True
+
+    log_message("=" * 60)
+    log_message("ProTox-3 Prediction Daemon Started")
+    log_message("=" * 60)
+    log_message(f"  Workers: {args.workers}")
+    log_message(f"  Job API: {base_url}/jobs")
+    log_message(f"  Results directory: {config.RESULTS_DIR}")
+    log_message("=" * 60)
+
+    def handle_signal(signum, frame):
+        log_message("⚠ Stopping: finishing queued compounds (press Ctrl+C again to abort)")
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    service.start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.shutdown()
+        log_message("Prediction daemon stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Multi-Endpoint Prediction Statistics
+Function: Load every stored prediction into columnar NumPy arrays and compute
+per-model statistics with vectorized operations
+
+All Active/Inactive rows of all CID_*.csv reports are kept in a columnar
+prediction store (PREDICTION_STORE_FILE): one row per (compound, model) with
+integer compound and model codes, an active flag and the probability. The
+store is refreshed incrementally, so only reports that are new or changed
+since the last run are parsed.
+
+Usage:
+    python3 prediction_stats.py rates
+    python3 prediction_stats.py histogram [--model SHORTHAND] [--bins 10]
+    python3 prediction_stats.py cooccurrence [--models SHORTHAND ...]
+    python3 prediction_stats.py batches (--by-date | --batch-file FILE ...)
+    python3 prediction_stats.py summary [summary_csv]
+
+Examples:
+    python3 prediction_stats.py rates                        # Active rate of every model
+    python3 prediction_stats.py cooccurrence --models cyto dili
+    python3 prediction_stats.py batches --batch-file data/shards/shard_*.csv
+"""
+
+import os
+import csv
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+
+PREDICTION_LABELS = ('Inactive', 'Active')
+
+
+def parse_report(filepath):
+    """
+    Return the Active/Inactive predictions of one CID_*.csv report
+
+    Returns:
+        list: (classification, target, shorthand, active, probability) tuples
+    """
+    predictions = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) < 5 or row[3] not in PREDICTION_LABELS:
+                continue
+            try:
+                probability = float(row[4])
+            except ValueError:
+                probability = np.nan
+            predictions.append((row[0], row[1], row[2], row[3] == 'Active', probability))
+    return predictions
+
+
+class PredictionStore:
+    """Columnar store of all stored predictions, one row per (compound, model)"""
+
+    def __init__(self, compound_ids, compound_mtimes, models, model_targets, model_classes,
+                 compound, model, active, probability):
+        self.compound_ids = compound_ids        # str array, one per compound
+        self.compound_mtimes = compound_mtimes  # int64 report mtime_ns, one per compound
+        self.models = models                    # str array of model shorthands
+        self.model_targets = model_targets      # str array of model target names
+        self.model_classes = model_classes      # str array of model classifications
+        self.compound = compound                # int32 compound code per row
+        self.model = model                      # int16 model code per row
+        self.active = active                    # bool per row
+        self.probability = probability         # float32 per row
+
+    @classmethod
+    def empty(cls):
+        return cls(np.array([], dtype=str), np.array([], dtype=np.int64),
+                   np.array([], dtype=str), np.array([], dtype=str), np.array([], dtype=str),
+                   np.array([], dtype=np.int32), np.array([], dtype=np.int16),
+                   np.array([], dtype=bool), np.array([], dtype=np.float32))
+
+    @classmethod
+    def load(cls, store_file=None):
+        """Load the store from disk (empty if it does not exist yet)"""
+        store_file = store_file or config.PREDICTION_STORE_FILE
+        if not os.path.exists(store_file):
+            return cls.empty()
+        data = np.load(store_file)
+        return cls(data['compound_ids'], data['compound_mtimes'], data['models'],
+                   data['model_targets'], data['model_classes'], data['compound'],
+                   data['model'], data['active'], data['probability'])
+
+    def save(self, store_file=None):
+        """Atomically save the store to disk"""
+        store_file = store_file or config.PREDICTION_STORE_FILE
+        temp_file = f"{store_file}.{os.getpid()}.tmp.npz"
+        np.savez(temp_file, compound_ids=self.compound_ids, compound_mtimes=self.compound_mtimes,
+                 models=self.models, model_targets=self.model_targets, model_classes=self.model_classes,
+                 compound=self.compound, model=self.model, active=self.active, probability=self.probability)
+        os.replace(temp_file, store_file)
+
+    def __len__(self):
+        return len(self.compound)
+
+    def refresh(self, results_dir=None):
+        """
+        Bring the store up to date with the CID_*.csv reports on disk
+
+        Returns:
+            tuple: (store, number of reports parsed)
+        """
+        results_dir = results_dir or config.RESULTS_DIR
+        current = {}
+        if os.path.exists(results_dir):
+            with os.scandir(results_dir) as entries:
+                for entry in entries:
+                    if entry.name.startswith('CID_') and entry.name.endswith('.csv'):
+                        current[entry.name[4:-4]] = entry.stat().st_mtime_ns
+
+        known = dict(zip(self.compound_ids.tolist(), self.compound_mtimes.tolist()))
+        changed = [cid for cid, mtime in current.items() if known.get(cid) != mtime]
+        if not changed and len(known) == len(current):
+            return self, 0
+
+        # Keep rows of compounds whose report is unchanged
+        keep_compound = np.array([current.get(cid) == mtime for cid, mtime in known.items()], dtype=bool)
+        keep_row = keep_compound[self.compound] if len(self) else np.array([], dtype=bool)
+        new_codes = np.cumsum(keep_compound, dtype=np.int64) - 1
+
+        compound_ids = self.compound_ids[keep_compound].tolist()
+        compound_mtimes = self.compound_mtimes[keep_compound].tolist()
+        models = self.models.tolist()
+        model_targets = self.model_targets.tolist()
+        model_classes = self.model_classes.tolist()
+        model_codes = {name: code for code, name in enumerate(models)}
+
+        added_compound, added_model, added_active, added_probability = [], [], [], []
+        for cid in changed:
+            try:
+                predictions = parse_report(os.path.join(results_dir, f"CID_{cid}.csv"))
+            except (OSError, UnicodeDecodeError):
+                continue
+            code = len(compound_ids)
+            compound_ids.append(cid)
+            compound_mtimes.append(current[cid])
+            for classification, target, shorthand, active, probability in predictions:
+                model_code = model_codes.get(shorthand)
+                if model_code is None:
+                    model_code = model_codes[shorthand] = len(models)
+                    models.append(shorthand)
+                    model_targets.append(target)
+                    model_classes.append(classification)
+                added_compound.append(code)
+                added_model.append(model_code)
+                added_active.append(active)
+                added_probability.append(probability)
+
+        store = PredictionStore(
+            np.array(compound_ids, dtype=str),
+            np.array(compound_mtimes, dtype=np.int64),
+            np.array(models, dtype=str),
+            np.array(model_targets, dtype=str),
+            np.array(model_classes, dtype=str),
+            np.concatenate([new_codes[self.compound[keep_row]].astype(np.int32),
+                            np.array(added_compound, dtype=np.int32)]),
+            np.concatenate([self.model[keep_row], np.array(added_model, dtype=np.int16)]),
+            np.concatenate([self.active[keep_row], np.array(added_active, dtype=bool)]),
+            np.concatenate([self.probability[keep_row], np.array(added_probability, dtype=np.float32)]),
+        )
+        return store, len(changed)
+
+    def model_code(self, shorthand):
+        """Return the code of a model shorthand, or None"""
+        matches = np.flatnonzero(self.models == shorthand)
+        return int(matches[0]) if len(matches) else None
+
+
+def load_store(results_dir=None, store_file=None, refresh=True):
+    """Load the prediction store, refreshing and saving it if reports changed"""
+    store = PredictionStore.load(store_file)
+    if refresh:
+        store, parsed = store.refresh(results_dir)
+        if parsed:
+            store.save(store_file)
+    return store
+
+
+# ----------------------------------------------------------------------
+# Vectorized statistics
+# ----------------------------------------------------------------------
+
+def active_rates(store):
+    """
+    Per-model prediction counts and active rates
+
+    Returns:
+        dict: 'total', 'active' (int arrays) and 'rate' (float array), indexed by model code
+    """
+    n_models = len(store.models)
+    total = np.bincount(store.model, minlength=n_models)
+    active = np.bincount(store.model, weights=store.active, minlength=n_models).astype(np.int64)
+    rate = np.divide(active, total, out=np.zeros(n_models), where=total > 0)
+    return {'total': total, 'active': active, 'rate': rate}
+
+
+def probability_histograms(store, bins=10):
+    """
+    Probability histograms per model and prediction
+
+    Returns:
+        ndarray: Counts of shape (n_models, 2, bins); axis 1 is Inactive/Active
+    """
+    n_models = len(store.models)
+    valid = ~np.isnan(store.probability)
+    bin_index = np.clip((store.probability[valid] * bins).astype(np.int64), 0, bins - 1)
+    key = (store.model[valid].astype(np.int64) * 2 + store.active[valid]) * bins + bin_index
+    return np.bincount(key, minlength=n_models * 2 * bins).reshape(n_models, 2, bins)
+
+
+def activity_matrix(store, model_codes=None):
+    """Boolean compound x model matrix of Active predictions"""
+    model_codes = np.arange(len(store.models)) if model_codes is None else np.asarray(model_codes)
+    lookup = np.full(len(store.models), -1, dtype=np.int64)
+    lookup[model_codes] = np.arange(len(model_codes))
+    column = lookup[store.model]
+    rows = (column >= 0) & store.active
+    matrix = np.zeros((len(store.compound_ids), len(model_codes)), dtype=bool)
+    matrix[store.compound[rows], column[rows]] = True
+    return matrix
+
+
+def co_occurrence(store, model_codes=None):
+    """
+    Cross-endpoint co-occurrence of Active predictions
+
+    Returns:
+        ndarray: counts[i, j] = compounds Active for both model i and model j
+    """
+    matrix = activity_matrix(store, model_codes).astype(np.int32)
+    return matrix.T @ matrix
+
+
+def batch_comparison(store, batch_of_compound, n_batches):
+    """
+    Per-batch, per-model prediction counts and active rates
+
+    Args:
+        batch_of_compound: int array giving the batch code of every compound (-1 = none)
+        n_batches: Number of batch codes
+
+    Returns:
+        dict: 'total', 'active', 'rate' arrays of shape (n_batches, n_models)
+    """
+    n_models = len(store.models)
+    batch = batch_of_compound[store.compound]
+    in_batch = batch >= 0
+    key = batch[in_batch] * n_models + store.model[in_batch]
+    size = n_batches * n_models
+    total = np.bincount(key, minlength=size).reshape(n_batches, n_models)
+    active = np.bincount(key, weights=store.active[in_batch], minlength=size).astype(np.int64)
+    active = active.reshape(n_batches, n_models)
+    rate = np.divide(active, total, out=np.zeros(total.shape), where=total > 0)
+    return {'total': total, 'active': active, 'rate': rate}
+
+
+def count_predictions(predictions):
+    """Count Active and Inactive entries in a sequence of prediction labels"""
+    values = np.asarray(predictions, dtype=str)
+    return {
+        'total': int(values.size),
+        'active': int(np.count_nonzero(values == 'Active')),
+        'inactive': int(np.count_nonzero(values == 'Inactive')),
+    }
+
+
+# ----------------------------------------------------------------------
+# Command line
+# ----------------------------------------------------------------------
+
+def select_models(store, shorthands):
+    """Return the model codes of the given shorthands (all models if none are given)"""
+    if not shorthands:
+        return np.arange(len(store.models))
+    codes = []
+    for shorthand in shorthands:
+        code = store.model_code(shorthand)
+        if code is None:
+            print(f"  ⚠ Unknown model: {shorthand}")
+        else:
+            codes.append(code)
+    return np.array(codes, dtype=np.int64)
+
+
+def print_rates(store, args):
+    stats = active_rates(store)
+    order = np.argsort(-stats['rate'])
+    print(f"{'Model':<12} {'Target':<40} {'Total':>9} {'Active':>9} {'Rate':>7}")
+    for code in order:
+        print(f"{store.models[code]:<12} {store.model_targets[code][:40]:<40} "
+              f"{stats['total'][code]:>9} {stats['active'][code]:>9} {stats['rate'][code]:>7.1%}")
+
+
+def print_histogram(store, args):
+    histograms = probability_histograms(store, args.bins)
+    edges = np.linspace(0, 1, args.bins + 1)
+    for code in select_models(store, [args.model] if args.model else None):
+        print(f"{store.models[code]} ({store.model_targets[code]})")
+        print(f"  {'Probability':<13} {'Inactive':>9} {'Active':>9}")
+        for b in range(args.bins):
+            print(f"  {edges[b]:.2f}-{edges[b + 1]:.2f}     "
+                  f"{histograms[code, 0, b]:>9} {histograms[code, 1, b]:>9}")
+        print("")
+
+
+def print_cooccurrence(store, args):
+    codes = select_models(store, args.models)
+    counts = co_occurrence(store, codes)
+    names = [str(store.models[code]) for code in codes]
+    width = max([len(name) for name in names] + [6]) + 1
+    print("Compounds Active for both models (diagonal: Active for the model)")
+    print(" " * width + "".join(f"{name:>{width}}" for name in names))
+    for i, name in enumerate(names):
+        print(f"{name:<{width}}" + "".join(f"{counts[i, j]:>{width}}" for j in range(len(names))))
+
+
+def print_batches(store, args):
+    if args.by_date:
+        # Batch = day the report was written
+        days = np.array([time.strftime('%Y-%m-%d', time.localtime(mtime / 1e9))
+                         for mtime in store.compound_mtimes.tolist()])
+        labels, batch_of_compound = np.unique(days, return_inverse=True)
+    else:
+        labels = [os.path.basename(path) for path in args.batch_file]
+        code_of_id = {}
+        for batch_code, path in enumerate(args.batch_file):
+            with open(path, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    code_of_id.setdefault(row['PubChem_ID'], batch_code)
+        batch_of_compound = np.array([code_of_id.get(cid, -1) for cid in store.compound_ids.tolist()],
+                                     dtype=np.int64)
+
+    stats = batch_comparison(store, np.asarray(batch_of_compound, dtype=np.int64), len(labels))
+    codes = select_models(store, args.models)
+    overall = active_rates(store)['rate']
+    for code in codes:
+        print(f"{store.models[code]} ({store.model_targets[code]}), overall active rate {overall[code]:.1%}")
+        for b, label in enumerate(labels):
+            total = stats['total'][b, code]
+            if total:
+                print(f"  {label:<30} {total:>8} predictions  {stats['rate'][b, code]:>7.1%} active "
+                      f"({stats['rate'][b, code] - overall[code]:+.1%})")
+        print("")
+
+
+def print_summary(args):
+    """Cytotoxicity counts of the summary file (used by run_protox.sh)"""
+    if not os.path.exists(args.summary_csv):
+        print(f"✗ Summary file not found: {args.summary_csv}")
+        return
+    with open(args.summary_csv, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        column = header.index('Prediction') if 'Prediction' in header else 4
+        counts = count_predictions([row[column] for row in reader if len(row) > column])
+    print(f"  Total compounds: {counts['total']}")
+    print(f"  Active (cytotoxic): {counts['active']}")
+    print(f"  Inactive (non-cytotoxic): {counts['inactive']}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Vectorized statistics over all stored predictions')
+    parser.add_argument('--no-refresh', action='store_true',
+                        help='Use the prediction store as saved, without scanning for new reports')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('rates', help='Active rate of every model')
+
+    histogram_parser = subparsers.add_parser('histogram', help='Probability histograms per model')
+    histogram_parser.add_argument('--model', default=None, help='Model shorthand (default: all)')
+    histogram_parser.add_argument('--bins', type=int, default=10, help='Number of bins (default: 10)')
+
+    cooccurrence_parser = subparsers.add_parser('cooccurrence', help='Cross-endpoint co-occurrence of Active calls')
+    cooccurrence_parser.add_argument('--models', nargs='+', default=None, help='Model shorthands (default: all)')
+
+    batches_parser = subparsers.add_parser('batches', help='Compare active rates between batches')
+    group = batches_parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--by-date', action='store_true', help='One batch per day reports were written')
+    group.add_argument('--batch-file', nargs='+', help='CSV files with a PubChem_ID column, one batch each')
+    batches_parser.add_argument('--models', nargs='+', default=None, help='Model shorthands (default: all)')
+
+    summary_parser = subparsers.add_parser('summary', help='Cytotoxicity counts of the summary file')
+    summary_parser.add_argument('summary_csv', nargs='?', default=config.CYTOTOXICITY_SUMMARY_FILE,
+                                help='Summary CSV (default: from config.py)')
+
+    args = parser.parse_args()
+
+    if args.command == 'summary':
+        print_summary(args)
+        return
+
+    started = time.time()
+    store = load_store(refresh=not args.no_refresh)
+    if not len(store):
+        print("✗ No predictions found in stored reports")
+        return
+    print(f"Loaded {len(store)} predictions of {len(store.compound_ids)} compounds, "
+          f"{len(store.models)} models ({time.time() - started:.1f}s)")
+    print("")
+
+    commands = {
+        'rates': print_rates,
+        'histogram': print_histogram,
+        'cooccurrence': print_cooccurrence,
+        'batches': print_batches,
+    }
+    commands[args.command](store, args)
+
+
+if __name__ == "__main__":
+    main()
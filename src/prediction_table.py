@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Compact Prediction Table
+Function: Column-oriented storage for ProTox-3 API predictions
+
+Every API prediction has the fields input, type, target, prediction and
+probability. Instead of one dict per row, a PredictionTable stores the four
+string fields as integer codes and the probabilities in a float array. The
+type, target and prediction vocabularies (a fixed set of model names) are
+shared by all tables, so repeated model and target names are stored only
+once. Each table codes its inputs with its own vocabulary, which is freed
+with the table; long-running callers that see millions of distinct
+compounds do not accumulate them.
+
+Probabilities that are not numbers are kept as their raw string for CSV
+export (numerically they are NaN).
+
+Example:
+    table = PredictionTable()
+    table.append("aspirin", "Toxicity end points", "Cytotoxicity", "Inactive", 0.64)
+    active = table.filter(prediction="Active", min_probability=0.7)
+    active.to_csv("active.csv")
+"""
+
+import csv
+import math
+from array import array
+
+FIELDS = ("input", "type", "target", "prediction", "probability")
+CODED_FIELDS = FIELDS[:-1]
+SHARED_FIELDS = ("type", "target", "prediction")  # Bounded by the set of models
+
+
+class Vocabulary:
+    """Two-way mapping between strings and integer codes"""
+
+    def __init__(self):
+        self.strings = []
+        self.codes = {}
+
+    def code(self, value):
+        """Return the code for value, adding it if it is new"""
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            self.strings.append(value)
+            self.codes[value] = code
+        return code
+
+    def lookup(self, value):
+        """Return the code for value, or None if it has never been seen"""
+        return self.codes.get(value)
+
+    def __len__(self):
+        return len(self.strings)
+
+
+# Model vocabularies shared by all tables unless a table is given its own
+SHARED_VOCABULARIES = {field: Vocabulary() for field in SHARED_FIELDS}
+
+
+def parse_probability(value):
+    """
+    Convert an API probability to float
+
+    Returns:
+        tuple: (float, raw string or None). The float is NaN when the value is
+               missing or invalid; the raw string is kept for invalid values.
+    """
+    try:
+        return float(value), None
+    except (TypeError, ValueError):
+        return math.nan, (None if value is None or str(value) == "" else str(value))
+
+
+class PredictionTable:
+    """Column-oriented table of predictions with categorical string columns"""
+
+    def __init__(self, vocabularies=None):
+        if vocabularies is None:
+            vocabularies = dict(SHARED_VOCABULARIES, input=Vocabulary())
+        self.vocabularies = vocabularies
+        self.columns = {field: array('I') for field in CODED_FIELDS}
+        self.probabilities = array('d')
+        self.raw_probabilities = {}  # Row index -> unparseable probability string
+
+    def append(self, input, type, target, prediction, probability):
+        """Append one prediction"""
+        for field, value in zip(CODED_FIELDS, (input, type, target, prediction)):
+            self.columns[field].append(self.vocabularies[field].code(value))
+        value, raw = parse_probability(probability)
+        if raw is not None:
+            self.raw_probabilities[len(self.probabilities)] = raw
+        self.probabilities.append(value)
+
+    def extend(self, other):
+        """Append every row of another table"""
+        offset = len(self.probabilities)
+        for field in CODED_FIELDS:
+            mine, theirs = self.vocabularies[field], other.vocabularies[field]
+            if mine is theirs:
+                self.columns[field].extend(other.columns[field])
+            else:
+                strings = theirs.strings
+                self.columns[field].extend(mine.code(strings[code]) for code in other.columns[field])
+        self.probabilities.extend(other.probabilities)
+        for i, raw in other.raw_probabilities.items():
+            self.raw_probabilities[offset + i] = raw
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    def __iter__(self):
+        """Yield rows as (input, type, target, prediction, probability) tuples"""
+        decoders = [self.vocabularies[field].strings for field in CODED_FIELDS]
+        codes = [self.columns[field] for field in CODED_FIELDS]
+        for i, probability in enumerate(self.probabilities):
+            yield tuple(decoder[column[i]] for decoder, column in zip(decoders, codes)) + (probability,)
+
+    def _take(self, indices):
+        """Return a new table holding the given row indices"""
+        table = PredictionTable(self.vocabularies)
+        for field in CODED_FIELDS:
+            column = self.columns[field]
+            table.columns[field] = array('I', (column[i] for i in indices))
+        table.probabilities = array('d', (self.probabilities[i] for i in indices))
+        if self.raw_probabilities:
+            table.raw_probabilities = {new: self.raw_probabilities[old] for new, old in enumerate(indices)
+                                       if old in self.raw_probabilities}
+        return table
+
+    def filter(self, input=None, type=None, target=None, prediction=None,
+               min_probability=None, max_probability=None):
+        """
+        Return the rows matching every given condition
+
+        String conditions are compared by code, so no rows are decoded.
+        """
+        wanted = {}
+        for field, value in zip(CODED_FIELDS, (input, type, target, prediction)):
+            if value is not None:
+                code = self.vocabularies[field].lookup(value)
+                if code is None:
+                    return PredictionTable(self.vocabularies)
+                wanted[field] = code
+
+        indices = range(len(self))
+        for field, code in wanted.items():
+            column = self.columns[field]
+            indices = [i for i in indices if column[i] == code]
+        if min_probability is not None:
+            indices = [i for i in indices if self.probabilities[i] >= min_probability]
+        if max_probability is not None:
+            indices = [i for i in indices if self.probabilities[i] <= max_probability]
+        return self._take(indices)
+
+    def write_csv(self, writer):
+        """Write rows (without header) to a csv.writer"""
+        for i, row in enumerate(self):
+            probability = row[-1]
+            if math.isnan(probability):
+                probability = self.raw_probabilities.get(i, "")
+            writer.writerow(row[:-1] + (probability,))
+
+    def to_csv(self, output_file):
+        """Write the table, with header, to a CSV file"""
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            self.write_csv(writer)
+
+    def to_arrays(self):
+        """
+        Export the table as NumPy arrays (requires numpy)
+
+        Returns:
+            dict: Integer code arrays for the string fields, a float64
+                  "probability" array, and a "<field>_labels" list per
+                  string field for decoding the codes
+        """
+        import numpy as np
+
+        arrays = {}
+        for field in CODED_FIELDS:
+            arrays[field] = np.frombuffer(self.columns[field], dtype=np.uint32).copy()
+            arrays[f"{field}_labels"] = list(self.vocabularies[field].strings)
+        arrays["probability"] = np.frombuffer(self.probabilities, dtype=np.float64).copy()
+        return arrays
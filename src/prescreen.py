@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Pre-screen Compounds Before Submission
+Function: Reject structures the ProTox-3 server cannot process (invalid valences,
+empty molecules, disallowed elements, inorganics, oversized molecules, large
+peptides) so they never reach the prediction queue
+
+Rules are configured in config.py (PRESCREEN_* settings). Rejected compounds
+are written to REJECTED_COMPOUNDS_FILE together with the reason. The same
+checks run automatically inside convert_smiles.py when PRESCREEN_ENABLED is set.
+
+Usage:
+    python3 prescreen.py [input_file] [output_file]
+
+Examples:
+    python3 prescreen.py                  # Filter the canonical SMILES file in place
+    python3 prescreen.py data/canonical_smiles.csv data/screened.csv
+"""
+
+import os
+import csv
+import sys
+from pathlib import Path
+from rdkit import Chem
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+
+# Peptide bond: backbone amide between an alpha carbon and the next residue
+PEPTIDE_BOND = Chem.MolFromSmarts('[CX4][CX3](=O)[NX3][CX4]')
+
+REJECTED_FIELDS = ['PubChem_ID', 'SMILES', 'Reason']
+
+
+def has_carbon(mol):
+    """True if a molecule (fragment) contains carbon"""
+    return any(atom.GetAtomicNum() == 6 for atom in mol.GetAtoms())
+
+
+def screen_smiles(smiles):
+    """
+    Check a SMILES string against the pre-screen rules
+
+    Args:
+        smiles: SMILES string
+
+    Returns:
+        str: Rejection reason, or None if the compound passes
+    """
+    mol = Chem.MolFromSmiles(smiles, sanitize=False)
+    if mol is None:
+        return 'invalid_smiles'
+
+    problems = Chem.DetectChemistryProblems(mol)
+    if problems:
+        return f"valence_error: {problems[0].Message()}"
+
+    try:
+        Chem.SanitizeMol(mol)
+    except Exception as e:
+        return f"sanitization_failed: {e}"
+
+    if mol.GetNumHeavyAtoms() == 0:
+        return 'empty_molecule'
+
+    # All rules apply to the largest organic fragment; counter-ions such as
+    # Na+, K+ or Cl- in a salt are ignored
+    largest = max(Chem.GetMolFrags(mol, asMols=True),
+                  key=lambda frag: (has_carbon(frag), frag.GetNumHeavyAtoms()))
+
+    allowed = set(config.PRESCREEN_ALLOWED_ELEMENTS)
+    symbols = {atom.GetSymbol() for atom in largest.GetAtoms()}
+    disallowed = sorted(symbols - allowed)
+    if disallowed:
+        return f"disallowed_element: {','.join(disallowed)}"
+
+    if config.PRESCREEN_REQUIRE_CARBON and 'C' not in symbols:
+        return 'no_carbon'
+
+    heavy_atoms = largest.GetNumHeavyAtoms()
+    if heavy_atoms < config.PRESCREEN_MIN_HEAVY_ATOMS:
+        return f"too_few_heavy_atoms: {heavy_atoms}"
+    if heavy_atoms > config.PRESCREEN_MAX_HEAVY_ATOMS:
+        return f"too_many_heavy_atoms: {heavy_atoms}"
+
+    peptide_bonds = len(largest.GetSubstructMatches(PEPTIDE_BOND))
+    if peptide_bonds > config.PRESCREEN_MAX_AMIDE_BONDS:
+        return f"peptide: {peptide_bonds} peptide bonds"
+
+    return None
+
+
+def save_rejected(rejected, rejected_file):
+    """Save rejected compounds (list of dicts) with their reasons"""
+    with open(rejected_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=REJECTED_FIELDS)
+        writer.writeheader()
+        writer.writerows(rejected)
+    print(f"✓ Rejected compounds saved to: {rejected_file}")
+
+
+def main():
+    """Main function"""
+    if len(sys.argv) >= 3:
+        input_file = sys.argv[1]
+        output_file = sys.argv[2]
+    else:
+        input_file = config.CANONICAL_SMILES_FILE
+        output_file = config.CANONICAL_SMILES_FILE
+
+    print("=" * 60)
+    print("Pre-screening Compounds")
+    print("=" * 60)
+    print(f"Input file: {input_file}")
+    print(f"Output file: {output_file}")
+    print(f"Rejected file: {config.REJECTED_COMPOUNDS_FILE}")
+    print("")
+
+    if not Path(input_file).exists():
+        print(f"✗ Input file not found: {input_file}")
+        return
+
+    accepted = []
+    rejected = []
+    with open(input_file, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        smiles_column = 'Canonical_SMILES' if 'Canonical_SMILES' in fieldnames else 'SMILES'
+        for row in reader:
+            reason = screen_smiles(row[smiles_column])
+            if reason:
+                rejected.append({'PubChem_ID': row['PubChem_ID'], 'SMILES': row[smiles_column], 'Reason': reason})
+                print(f"  ✗ PubChem_ID {row['PubChem_ID']} rejected: {reason}")
+            else:
+                accepted.append(row)
+
+    # Write to a temporary file first so in-place filtering is safe
+    temp_file = output_file + '.tmp'
+    with open(temp_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(accepted)
+    os.replace(temp_file, output_file)
+
+    print("")
+    print("Pre-screen complete:")
+    print(f"  Accepted: {len(accepted)}")
+    print(f"  Rejected: {len(rejected)}")
+    print("")
+    print(f"✓ Accepted compounds saved to: {output_file}")
+    if rejected:
+        save_rejected(rejected, config.REJECTED_COMPOUNDS_FILE)
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
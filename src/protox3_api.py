@@ -19,6 +19,15 @@ Examples:
     
     # Query with specific models
     python3 protox3_api.py -t smiles -m "acute_tox cyto dili" -o results.csv "SMILES"
+    
+    # Continue an interrupted run, skipping compounds already in results.csv
+    python3 protox3_api.py --resume -o results.csv aspirin,vorinostat,caffeine
+    
+    # Pack up to 20 compounds into each request
+    python3 protox3_api.py -b 20 aspirin,vorinostat,caffeine
+    
+Names found in the local name cache (name_cache.py) are submitted as SMILES,
+skipping the server-side PubChem lookup.
 """
 
 import sys
@@ -27,13 +36,26 @@ import requests
 import json
 import time
 import csv
+import os
+import shutil
 from pathlib import Path
 
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+from api_quota import QuotaLedger
+from prediction_table import PredictionTable, FIELDS as RESULT_FIELDNAMES
+from name_cache import NameResolver
+
 # API Configuration
 API_BASE_URL = "https://tox.charite.de/protox3/api"
 API_ENDPOINT = f"{API_BASE_URL}/query.php"
-MAX_QUERIES_PER_DAY = 250
+MAX_QUERIES_PER_DAY = config.API_MAX_QUERIES_PER_DAY
 REQUEST_DELAY = 2  # seconds between requests
+MAX_BATCH_SIZE = 50  # maximum number of compounds packed into one request
+BATCH_RETRIES = 1  # extra attempts of a multi-compound request that failed outright
+BATCH_RETRY_DELAY = 30  # seconds to back off before retrying a failed request
+FSYNC_EVERY = 10  # compounds written between fsync calls of the output file
 
 # Available models (from ProTox-3 documentation)
 ALL_MODELS = [
@@ -99,7 +121,7 @@ ALL_MODELS = [
 DEFAULT_MODELS = ["acute_tox", "tox_targets"]
 
 
-def query_protox(compound, input_type="name", models=None, quiet=False):
+def query_protox(compound, input_type="name", models=None, quiet=False, resolver=None):
     """
     Query ProTox-3 API for toxicity prediction
     
@@ -108,6 +130,7 @@ def query_protox(compound, input_type="name", models=None, quiet=False):
         input_type: "name" or "smiles"
         models: List of model shorthands to query
         quiet: Suppress status messages
+        resolver: Optional NameResolver; names it knows are submitted as SMILES
         
     Returns:
         dict: API response data
@@ -115,6 +138,14 @@ def query_protox(compound, input_type="name", models=None, quiet=False):
     if models is None:
         models = DEFAULT_MODELS
     
+    # Skip the server-side name lookup when the name is cached
+    if input_type == "name" and resolver is not None:
+        smiles = resolver.lookup(compound)
+        if smiles:
+            if not quiet:
+                print(f"  ✓ {compound} resolved from local name cache")
+            compound, input_type = smiles, "smiles"
+    
     # Prepare request data
     data = {
         "compound": compound,
@@ -164,9 +195,9 @@ def parse_response(response_data, compound):
         compound: Original compound identifier
         
     Returns:
-        list: Parsed results as list of dictionaries
+        PredictionTable: Parsed results (empty if there is no response)
     """
-    results = []
+    results = PredictionTable()
     
     if not response_data:
         return results
@@ -175,40 +206,282 @@ def parse_response(response_data, compound):
     # Format: input, type, target, prediction, probability
     
     for item in response_data.get("predictions", []):
-        result = {
-            "input": compound,
-            "type": item.get("type", ""),
-            "target": item.get("target", ""),
-            "prediction": item.get("prediction", ""),
-            "probability": item.get("probability", "")
-        }
-        results.append(result)
+        results.append(
+            compound,
+            item.get("type", ""),
+            item.get("target", ""),
+            item.get("prediction", ""),
+            item.get("probability", "")
+        )
     
     return results
 
 
+def query_protox_batch(compounds, input_type="name", models=None, quiet=False):
+    """
+    Query ProTox-3 API for several compounds in a single request
+    
+    Args:
+        compounds: List of compound names or SMILES strings
+        input_type: "name" or "smiles"
+        models: List of model shorthands to query
+        quiet: Suppress status messages
+        
+    Returns:
+        dict: API response data covering all compounds in the batch
+    """
+    # The endpoint takes the same comma-separated list as the CLI
+    return query_protox(",".join(compounds), input_type, models, quiet)
+
+
+def parse_batch_response(response_data, compounds, labels=None):
+    """
+    Split a batch API response back into per-compound results
+    
+    Each prediction carries the "input" it belongs to. Predictions are
+    grouped by that field and every group is parsed with parse_response.
+    
+    Args:
+        response_data: API response dictionary for the whole batch
+        compounds: Compound identifiers sent in the batch (in order)
+        labels: Optional identifiers to report the results under, parallel
+                to compounds (e.g. the names behind cached SMILES)
+        
+    Returns:
+        dict: Mapping of compound (or label) -> PredictionTable. Compounds
+              the server returned nothing for map to an empty table.
+    """
+    if labels is None:
+        labels = compounds
+    grouped = {compound: [] for compound in compounds}
+    
+    if not response_data:
+        return {label: PredictionTable() for label in labels}
+    
+    for item in response_data.get("predictions", []):
+        compound = item.get("input", "")
+        if compound in grouped:
+            grouped[compound].append(item)
+        elif len(compounds) == 1:
+            # Single-compound batches may omit the input field
+            grouped[compounds[0]].append(item)
+    
+    return {
+        label: parse_response({"predictions": grouped[compound]}, label)
+        for compound, label in zip(compounds, labels)
+    }
+
+
+def split_batches(compounds, batch_size):
+    """
+    Split a list of compounds into batches of at most batch_size
+    
+    Args:
+        compounds: List of compound identifiers
+        batch_size: Requested batch size (capped at MAX_BATCH_SIZE)
+        
+    Returns:
+        list: List of compound lists
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    return [compounds[i:i + batch_size] for i in range(0, len(compounds), batch_size)]
+
+
+def query_with_fallback(batch, input_type="name", models=None, quiet=False, ledger=None, resolver=None):
+    """
+    Query a batch of compounds, re-querying individually any compound the
+    batch response has no predictions for
+    
+    A request that fails outright (no response at all) is retried after
+    BATCH_RETRY_DELAY seconds, up to BATCH_RETRIES times; if it still fails,
+    its compounds are reported with empty results and are not re-queried one
+    by one, which would spend a quota unit per compound on a server that is
+    not answering.
+    
+    Every request is charged against the quota ledger first. When the ledger
+    refuses, querying stops, the compounds not yet queried are left out of
+    the returned results and quota_exhausted is True. Duplicate compounds in
+    the batch are queried once.
+    
+    With a resolver, names found in the local name cache are sent as SMILES.
+    A request carries one input type, so a batch mixing cached and uncached
+    names costs two requests (and two quota units) instead of one; the batch
+    is split only when at least NAME_CACHE_MIN_SPLIT_FRACTION of its names
+    are cached, otherwise all names go in one name request. Results are
+    always keyed by the names given.
+    
+    Args:
+        batch: List of compound names or SMILES strings
+        input_type: "name" or "smiles"
+        models: List of model shorthands to query
+        quiet: Suppress status messages
+        ledger: Optional QuotaLedger to charge requests against
+        resolver: Optional NameResolver used for name queries
+        
+    Returns:
+        tuple: (dict of compound -> PredictionTable, number of requests made,
+                quota_exhausted)
+    """
+    def take_quota():
+        if ledger is None or ledger.acquire(1):
+            return True
+        if not quiet:
+            print(f"  ✗ Daily quota of {ledger.daily_limit} queries exhausted")
+        return False
+    
+    batch = list(dict.fromkeys(batch))
+    if len(batch) == 1:
+        if not take_quota():
+            return {}, 0, True
+        response = query_protox(batch[0], input_type, models, quiet, resolver)
+        return {batch[0]: parse_response(response, batch[0])}, 1, False
+    
+    # Requests as (type, compounds sent, compounds reported); a request
+    # carries a single input type, so cached names go in their own request
+    requests_to_send = [(input_type, batch, batch)]
+    if input_type == "name" and resolver is not None:
+        smiles_of = {compound: resolver.lookup(compound) for compound in batch}
+        known = [compound for compound in batch if smiles_of[compound]]
+        if known and len(known) >= config.NAME_CACHE_MIN_SPLIT_FRACTION * len(batch):
+            unknown = [compound for compound in batch if not smiles_of[compound]]
+            if not quiet:
+                print(f"  ✓ {len(known)}/{len(batch)} names resolved from local name cache")
+            requests_to_send = [("smiles", [smiles_of[compound] for compound in known], known),
+                                ("name", unknown, unknown)]
+        elif known and not quiet:
+            print(f"  ⚠ Only {len(known)}/{len(batch)} names cached, sending the batch as names")
+    
+    batch_results = {}
+    failed = set()  # Compounds of requests that got no response at all
+    request_count = 0
+    for request_type, sent, labels in requests_to_send:
+        if not sent:
+            continue
+        for attempt in range(BATCH_RETRIES + 1):
+            if request_count:
+                time.sleep(BATCH_RETRY_DELAY if attempt else REQUEST_DELAY)
+            if not take_quota():
+                return batch_results, request_count, True
+            request_count += 1
+            if len(sent) == 1:
+                response = query_protox(sent[0], request_type, models, quiet)
+            else:
+                response = query_protox_batch(list(dict.fromkeys(sent)), request_type, models, quiet)
+            if response is not None:
+                break
+            if not quiet:
+                print(f"  ⚠ Request for {len(sent)} compound(s) failed"
+                      + (f", retrying in {BATCH_RETRY_DELAY}s" if attempt < BATCH_RETRIES else ""))
+        if response is None:
+            failed.update(labels)
+        batch_results.update(parse_batch_response(response, sent, labels))
+    
+    # Partial failure: re-query compounds missing from a batch response (not
+    # the compounds of a request that failed as a whole)
+    missing = [c for c in batch if not batch_results[c] and c not in failed]
+    for compound in missing:
+        if not quiet:
+            print(f"  ⚠ No predictions for {compound} in batch, querying individually")
+        if not take_quota():
+            for remaining in missing[missing.index(compound):]:
+                del batch_results[remaining]
+            return batch_results, request_count, True
+        time.sleep(REQUEST_DELAY)
+        single = query_protox(compound, input_type, models, quiet, resolver)
+        request_count += 1
+        batch_results[compound] = parse_response(single, compound)
+    
+    return batch_results, request_count, False
+
+
 def save_to_csv(results, output_file):
     """
     Save results to CSV file
     
     Args:
-        results: List of result dictionaries
+        results: PredictionTable of results
         output_file: Output CSV file path
     """
     if not results:
         print("No results to save")
         return
     
-    fieldnames = ["input", "type", "target", "prediction", "probability"]
-    
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(results)
+    results.to_csv(output_file)
     
     print(f"✓ Results saved to: {output_file}")
 
 
+class StreamingResultWriter:
+    """
+    Crash-safe CSV writer that streams results as each compound completes
+    
+    Rows are appended to "<output_file>.partial" and flushed after every
+    compound, with an fsync every FSYNC_EVERY compounds. finalize() fsyncs and
+    atomically renames the partial file to output_file. If the run dies, the
+    partial file is kept and a later run with resume=True continues from it.
+    """
+    
+    def __init__(self, output_file, resume=False, fsync_every=FSYNC_EVERY):
+        self.output_file = output_file
+        self.partial_file = output_file + ".partial"
+        self.fsync_every = fsync_every
+        self.completed = set()
+        self.rows_written = 0
+        self._pending_sync = 0
+        
+        if resume:
+            if not os.path.exists(self.partial_file) and os.path.exists(self.output_file):
+                shutil.copyfile(self.output_file, self.partial_file)
+            if os.path.exists(self.partial_file):
+                self._recover_partial()
+        elif os.path.exists(self.partial_file):
+            os.remove(self.partial_file)
+        
+        write_header = not os.path.exists(self.partial_file) or os.path.getsize(self.partial_file) == 0
+        self._file = open(self.partial_file, 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if write_header:
+            self._writer.writerow(RESULT_FIELDNAMES)
+    
+    def _recover_partial(self):
+        """Drop a torn last line and collect the inputs already written"""
+        with open(self.partial_file, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+        
+        with open(self.partial_file, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                self.completed.add(row["input"])
+    
+    def write(self, results):
+        """Append the results (PredictionTable) of one compound"""
+        results.write_csv(self._writer)
+        self.rows_written += len(results)
+        self._file.flush()
+        self._pending_sync += 1
+        if self._pending_sync >= self.fsync_every:
+            os.fsync(self._file.fileno())
+            self._pending_sync = 0
+    
+    def close(self):
+        """Flush and close the partial file without finalizing"""
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+    
+    def finalize(self):
+        """Atomically move the completed partial file into place"""
+        self.close()
+        if self.rows_written == 0 and not self.completed:
+            os.remove(self.partial_file)
+            print("No results to save")
+            return
+        os.replace(self.partial_file, self.output_file)
+        print(f"✓ Results saved to: {self.output_file}")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="ProTox-3 API Client for toxicity prediction",
@@ -226,6 +499,9 @@ Examples:
   
   # Query all models
   %(prog)s -t smiles -m ALL_MODELS "SMILES"
+  
+  # Pack up to 20 compounds into each request
+  %(prog)s -b 20 aspirin,vorinostat,caffeine
         """
     )
     
@@ -254,6 +530,25 @@ Examples:
         help="Output CSV file (default: protox_results.csv)"
     )
     
+    parser.add_argument(
+        "-b", "--batch-size",
+        type=int,
+        default=1,
+        help=f"Number of compounds packed into each request (default: 1, max: {MAX_BATCH_SIZE})"
+    )
+    
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip compounds already present in the output file (or its .partial file)"
+    )
+    
+    parser.add_argument(
+        "--no-name-cache",
+        action="store_true",
+        help="Send names to the server even when they are in the local name cache"
+    )
+    
     parser.add_argument(
         "-q", "--quiet",
         action="store_true",
@@ -300,42 +595,86 @@ Examples:
     else:
         models = args.models.split()
     
-    # Parse compounds
+    # Parse compounds (each distinct compound is queried once)
     compounds = [c.strip() for c in args.compounds.split(",")]
+    duplicates = len(compounds) - len(set(compounds))
+    compounds = list(dict.fromkeys(compounds))
     
     if not args.quiet:
         print(f"ProTox-3 API Client")
         print(f"=" * 60)
-        print(f"Compounds to query: {len(compounds)}")
+        print(f"Compounds to query: {len(compounds)}"
+              + (f" ({duplicates} duplicates skipped)" if duplicates else ""))
         print(f"Input type: {args.type}")
         print(f"Models: {len(models)}")
+        print(f"Batch size: {max(1, min(args.batch_size, MAX_BATCH_SIZE))}")
         print(f"Output file: {args.output}")
         print(f"=" * 60)
         print()
     
-    # Query each compound
-    all_results = []
-    for i, compound in enumerate(compounds, 1):
-        if not args.quiet:
-            print(f"[{i}/{len(compounds)}] Processing: {compound}")
-        
-        response = query_protox(compound, args.type, models, args.quiet)
-        results = parse_response(response, compound)
-        all_results.extend(results)
-        
-        # Rate limiting
-        if i < len(compounds):
-            time.sleep(REQUEST_DELAY)
-        
+    # Results are streamed to disk as each compound completes
+    writer = StreamingResultWriter(args.output, resume=args.resume)
+    if writer.completed:
+        total = len(compounds)
+        compounds = [c for c in compounds if c not in writer.completed]
         if not args.quiet:
+            print(f"Resuming: {total - len(compounds)} compounds already in output, {len(compounds)} remaining")
             print()
     
+    # Query compounds in batches (batch size 1 = one request per compound)
+    ledger = QuotaLedger(daily_limit=MAX_QUERIES_PER_DAY)
+    resolver = None
+    if args.type == "name" and config.NAME_CACHE_ENABLED and not args.no_name_cache:
+        resolver = NameResolver()
+    batches = split_batches(compounds, args.batch_size)
+    request_count = 0
+    processed_count = 0
+    try:
+        for i, batch in enumerate(batches, 1):
+            if not args.quiet:
+                if len(batch) == 1:
+                    print(f"[{i}/{len(batches)}] Processing: {batch[0]}")
+                else:
+                    print(f"[{i}/{len(batches)}] Processing batch of {len(batch)} compounds")
+            
+            batch_results, used, quota_exhausted = query_with_fallback(
+                batch, args.type, models, args.quiet, ledger, resolver)
+            request_count += used
+            
+            for compound in batch:
+                if compound in batch_results:
+                    writer.write(batch_results[compound])
+                    processed_count += 1
+            
+            if quota_exhausted:
+                print(f"✗ Daily query limit reached ({MAX_QUERIES_PER_DAY}/day), "
+                      f"{len(compounds) - processed_count} compounds not queried")
+                print("  Re-run with --resume tomorrow, or use api_scheduler.py for large jobs")
+                break
+            
+            # Rate limiting
+            if i < len(batches):
+                time.sleep(REQUEST_DELAY)
+            
+            if not args.quiet:
+                print()
+    except BaseException:
+        if resolver is not None:
+            resolver.close()
+        writer.close()
+        print(f"✗ Run interrupted, partial results kept in: {writer.partial_file}")
+        print("  Re-run with --resume to continue")
+        raise
+    
     # Save results
-    save_to_csv(all_results, args.output)
+    writer.finalize()
+    if resolver is not None:
+        resolver.close()
     
     if not args.quiet:
-        print(f"\n✓ Processed {len(compounds)} compounds")
-        print(f"✓ Total predictions: {len(all_results)}")
+        print(f"\n✓ Processed {processed_count} compounds")
+        print(f"✓ Total predictions: {writer.rows_written}")
+        print(f"✓ API requests used: {request_count}")
 
 
 if __name__ == "__main__":
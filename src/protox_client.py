@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+ProTox-3 Streaming Client
+Function: Importable client that runs predictions for an unbounded stream of
+compounds through the ProTox-3 API and yields typed records as they complete
+
+predict_many keeps at most max_concurrency requests in flight and pulls the
+next compound from the input only when one finishes, and every result
+table codes its inputs with its own vocabulary (see prediction_table.py), so
+memory does not grow with the length of the input. Request starts are spaced by
+REQUEST_DELAY, every request is charged to the shared quota ledger, and
+names found in the local name cache are sent as SMILES (see protox3_api.py).
+
+Example:
+    from protox_client import ProToxClient
+
+    client = ProToxClient(models=["cyto", "dili"], max_concurrency=4)
+    for result in client.predict_many(smiles_iterator):
+        if result.ok:
+            print(result.key, result.get("Cytotoxicity").prediction)
+        if enough:
+            break  # Leaving the loop cancels everything not yet started
+
+Items are SMILES strings (or names with input_type="name"), or
+(key, compound) pairs such as (pubchem_id, smiles); the key comes back on the
+record. Results arrive in completion order.
+
+Usage:
+    python3 protox_client.py [-t name|smiles] [-m "MODELS"] [-c N] [-d DELIM] [input_file]
+    (one compound per line, or "key<DELIM>compound" with -d; JSON Lines on stdout)
+
+Examples:
+    python3 protox_client.py -t name names.txt                 # "2,4-dinitrophenol" stays whole
+    python3 protox_client.py -d $'\t' ids_and_smiles.tsv       # "2244<TAB>CC(=O)OC1=..."
+"""
+
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+from api_quota import QuotaLedger
+from name_cache import NameResolver
+from protox3_api import DEFAULT_MODELS, REQUEST_DELAY, query_with_fallback
+
+
+class QuotaExhausted(Exception):
+    """The daily API quota ran out before the input was finished"""
+
+
+@dataclass(frozen=True)
+class Prediction:
+    """One model prediction"""
+    type: str
+    target: str
+    prediction: str
+    probability: float
+
+    @property
+    def active(self) -> bool:
+        return self.prediction == 'Active'
+
+
+@dataclass(frozen=True)
+class CompoundResult:
+    """All predictions for one input compound"""
+    key: str
+    compound: str
+    predictions: Tuple[Prediction, ...]
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def get(self, target) -> Optional[Prediction]:
+        """Prediction of a target (e.g. "Cytotoxicity"), or None"""
+        for prediction in self.predictions:
+            if prediction.target == target:
+                return prediction
+        return None
+
+    def to_dict(self):
+        return {
+            'key': self.key,
+            'compound': self.compound,
+            'error': self.error,
+            'predictions': [
+                {'type': p.type, 'target': p.target, 'prediction': p.prediction,
+                 'probability': None if math.isnan(p.probability) else p.probability}
+                for p in self.predictions
+            ],
+        }
+
+
+class ProToxClient:
+    """Streaming ProTox-3 API client with bounded concurrency"""
+
+    def __init__(self, input_type="smiles", models=None, max_concurrency=4, ledger=None,
+                 use_name_cache=None):
+        """
+        Args:
+            input_type: "smiles" or "name"
+            models: List of model shorthands (default: DEFAULT_MODELS)
+            max_concurrency: Maximum number of requests in flight
+            ledger: QuotaLedger to charge (default: the host-wide ledger)
+            use_name_cache: Resolve names locally (default: NAME_CACHE_ENABLED)
+        """
+        self.input_type = input_type
+        self.models = models or DEFAULT_MODELS
+        self.max_concurrency = max(1, max_concurrency)
+        self.ledger = ledger or QuotaLedger()
+        if use_name_cache is None:
+            use_name_cache = config.NAME_CACHE_ENABLED
+        self.resolver = NameResolver() if input_type == "name" and use_name_cache else None
+        self.cancel_event = None  # Event of the running predict_many
+        self.throttle_lock = threading.Lock()
+        self.next_request_at = 0.0
+
+    def _throttle(self):
+        """Space request starts by REQUEST_DELAY across all threads"""
+        with self.throttle_lock:
+            now = time.time()
+            delay = self.next_request_at - now
+            self.next_request_at = max(now, self.next_request_at) + REQUEST_DELAY
+        if delay > 0:
+            time.sleep(delay)
+
+    def _query(self, compound, cancel_event=None):
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        self._throttle()
+        results, _, quota_exhausted = query_with_fallback([compound], self.input_type, self.models, quiet=True,
+                                                          ledger=self.ledger, resolver=self.resolver)
+        if quota_exhausted:
+            raise QuotaExhausted(f"Daily quota of {self.ledger.daily_limit} queries exhausted")
+        return results[compound]
+
+    def predict(self, compound, key=None):
+        """Predict a single compound"""
+        return self._make_result(key or compound, compound, self._query(compound))
+
+    def predict_many(self, items):
+        """
+        Predict a stream of compounds, yielding CompoundResults as they complete
+
+        Closing the generator (e.g. leaving a for loop) or calling cancel()
+        stops pulling new items; requests already sent are awaited.
+
+        Raises:
+            QuotaExhausted: The daily quota ran out (in-flight results are yielded first)
+        """
+        cancel_event = self.cancel_event = threading.Event()
+        iterator = iter(items)
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='protox-client')
+        pending = {}  # Future -> (key, compound)
+        exhausted = False
+        quota_error = None
+        try:
+            while True:
+                while (not exhausted and quota_error is None and not cancel_event.is_set()
+                       and len(pending) < self.max_concurrency):
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    key, compound = split_item(item)
+                    pending[executor.submit(self._query, compound, cancel_event)] = (key, compound)
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, compound = pending.pop(future)
+                    try:
+                        table = future.result()
+                    except QuotaExhausted as e:
+                        quota_error = e
+                        continue
+                    if table is not None:  # None: skipped after cancel()
+                        yield self._make_result(key, compound, table)
+            if quota_error is not None:
+                raise quota_error
+        finally:
+            cancel_event.set()  # Queued requests return without querying
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def cancel(self):
+        """Stop a running predict_many after the requests in flight (safe from any thread)"""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+
+    @staticmethod
+    def _make_result(key, compound, table):
+        predictions = tuple(Prediction(type, target, prediction, probability)
+                            for _, type, target, prediction, probability in table)
+        return CompoundResult(str(key), compound, predictions,
+                              None if predictions else 'no predictions returned')
+
+    def close(self):
+        if self.resolver is not None:
+            self.resolver.close()
+
+
+def split_item(item):
+    """Return (key, compound) for a compound string or a (key, compound) pair"""
+    if isinstance(item, (tuple, list)):
+        key, compound = item
+        return str(key), str(compound).strip()
+    return str(item).strip(), str(item).strip()
+
+
+def iter_input_lines(f, key_delimiter=None):
+    """
+    Yield compounds from lines of text
+
+    Without key_delimiter every line is one compound (names may contain
+    commas). With key_delimiter, lines are split on its first occurrence into
+    a (key, compound) pair; lines without it are yielded as plain compounds.
+    """
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if key_delimiter and key_delimiter in line:
+            key, compound = line.split(key_delimiter, 1)
+            yield key.strip(), compound.strip()
+        else:
+            yield line
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Stream compounds through the ProTox-3 API')
+    parser.add_argument('input_file', nargs='?', default=None,
+                        help='One compound per line (default: stdin)')
+    parser.add_argument('-t', '--type', choices=['name', 'smiles'], default='smiles',
+                        help='Input type (default: smiles)')
+    parser.add_argument('-m', '--models', default=' '.join(DEFAULT_MODELS),
+                        help='Space-separated model shorthands')
+    parser.add_argument('-c', '--concurrency', type=int, default=4,
+                        help='Maximum requests in flight (default: 4)')
+    parser.add_argument('-d', '--key-delimiter', default=None,
+                        help='Lines are "key<DELIM>compound", split on the first DELIM (e.g. "," or a tab)')
+    args = parser.parse_args()
+
+    client = ProToxClient(args.type, args.models.split(), args.concurrency)
+    source = open(args.input_file, 'r', encoding='utf-8') if args.input_file else sys.stdin
+    count = 0
+    try:
+        for result in client.predict_many(iter_input_lines(source, args.key_delimiter)):
+            print(json.dumps(result.to_dict()), flush=True)
+            count += 1
+    except QuotaExhausted as e:
+        print(f"✗ {e}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("⚠ Interrupted", file=sys.stderr)
+    finally:
+        client.close()
+        if args.input_file:
+            source.close()
+    print(f"{count} compounds predicted", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    # Suppress SSL warnings
+    import urllib3
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    main()
@@ -10,13 +10,21 @@ Examples:
     python3 protox_full_automation.py          # Process all compounds
     python3 protox_full_automation.py 0 10    # Process compounds 0-10
     python3 protox_full_automation.py 10 20   # Process compounds 10-20
+    python3 protox_full_automation.py --start-id 2244 --count 100
+
+Rows are selected through a byte-offset index stored next to the input file
+(see row_index.py), so only the requested range is read.
 """
 
+import re
 import csv
+import html
 import time
 import os
 import sys
 import argparse
+import shutil
+import threading
 from pathlib import Path
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -28,6 +36,10 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 # Add parent directory to path to import config
 sys.path.insert(0, str(Path(__file__).parent.parent))
 import config
+from result_writer import ResultWriterPool
+from run_status import RunStatus, status_file_for
+from row_index import RowIndex
+from inflight_jobs import save_job, remove_job, get_job, is_job_url
 
 # Configuration from config.py
 PROTOX_URL = config.PROTOX_INPUT_URL
@@ -35,6 +47,30 @@ CANONICAL_SMILES_FILE = config.CANONICAL_SMILES_FILE
 OUTPUT_DIR = config.RESULTS_DIR
 LOG_FILE = config.PROCESSING_LOG_FILE
 MAX_WAIT_TIME = config.MAX_WAIT_TIME
+MAX_POLL_ERRORS = 3  # Consecutive failed page reads before the browser is given up
+
+# Background pool that parses results pages and writes reports (see get_result_writer)
+_result_writer = None
+_result_writer_lock = threading.Lock()
+
+# Input page load times, split by whether most assets came from the browser cache;
+# warm-up loads (made before any compound) are kept apart
+_page_loads = {'cold': [], 'warm': [], 'warm-up': []}
+_page_loads_lock = threading.Lock()
+
+# Failure signatures are matched against the text a user would see, not the markup
+VISIBLE_TEXT_SCRIPT = "return document.body ? document.body.innerText : '';"
+HIDDEN_MARKUP = re.compile(r'<!--.*?-->|<(script|style|noscript|template)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+TAG = re.compile(r'<[^>]+>')
+
+PAGE_CACHE_SCRIPT = """
+const resources = performance.getEntriesByType('resource');
+const cached = resources.filter(r => r.transferSize === 0 && r.decodedBodySize > 0).length;
+return [cached, resources.length];
+"""
+
+class PredictionRejected(Exception):
+    """The server reported a failure that retrying will not fix"""
 
 def log_message(message):
     """Log message to log file and console"""
@@ -45,8 +81,74 @@ def log_message(message):
     with open(LOG_FILE, 'a', encoding='utf-8') as f:
         f.write(log_entry + '\n')
 
-def create_driver():
-    """Create Chrome WebDriver with SSL certificate handling"""
+def get_result_writer():
+    """Return the shared background parser/writer pool, starting it on first use"""
+    global _result_writer
+    with _result_writer_lock:
+        if _result_writer is None:
+            _result_writer = ResultWriterPool(config.RESULT_WRITER_WORKERS, OUTPUT_DIR, log_message)
+        return _result_writer
+
+def log_success(pubchem_id):
+    """
+    Log the success line of a compound once its report has been written
+    
+    The report is written in the background; retry_failed.py trusts the
+    success line, so a page without Cytotoxicity data or a report that could
+    not be written is logged as a failure.
+    """
+    def report(written):
+        if written:
+            log_message(f"✓ Compound {pubchem_id} processed successfully")
+        else:
+            log_message(f"✗ Compound {pubchem_id} processing failed (no report written)")
+    get_result_writer().when_written(pubchem_id, report)
+
+def when_reported(pubchem_id, captured, callback):
+    """
+    Call callback(success) once the outcome of a predicted compound is known
+    
+    A captured results page is only a success once the writer pool has found
+    its Cytotoxicity data and written the report.
+    """
+    if captured:
+        get_result_writer().when_written(pubchem_id, callback)
+    else:
+        callback(False)
+
+def choose_timeout(canonical_smiles):
+    """Wait ceiling for a compound (cost_model.py, which needs RDKit, is only imported when adaptive)"""
+    if not config.ADAPTIVE_TIMEOUT:
+        return MAX_WAIT_TIME
+    try:
+        import cost_model
+    except ImportError:
+        return MAX_WAIT_TIME
+    return cost_model.choose_timeout(canonical_smiles)
+
+def record_duration(pubchem_id, canonical_smiles, seconds, outcome, timeout=None):
+    """Append a prediction duration to the history of cost_model.py (skipped without RDKit)"""
+    try:
+        import cost_model
+    except ImportError:
+        return
+    cost_model.record_duration(pubchem_id, canonical_smiles, seconds, outcome, timeout)
+
+def wait_for_result(pubchem_id):
+    """Block until the report of a just-predicted compound has been written"""
+    if _result_writer is not None:
+        _result_writer.wait(pubchem_id)
+
+def create_driver(worker_id=0, use_profile=None):
+    """
+    Create Chrome WebDriver with SSL certificate handling
+    
+    With BROWSER_PROFILE_ENABLED, the browser uses the persistent profile of
+    its worker (disk cache included) and loads the input page once to warm
+    up. If the profile is held by another browser, a temporary profile is used.
+    """
+    if use_profile is None:
+        use_profile = config.BROWSER_PROFILE_ENABLED
     chrome_options = Options()
     
     if config.HEADLESS_MODE:
@@ -77,48 +179,94 @@ def create_driver():
     # Set page load strategy
     chrome_options.page_load_strategy = 'normal'
     
+    # Persistent per-worker profile with an HTTP disk cache
+    profile_dir = None
+    if use_profile:
+        profile_dir = os.path.join(config.BROWSER_PROFILE_DIR, f"worker_{worker_id}")
+        os.makedirs(profile_dir, exist_ok=True)
+        chrome_options.add_argument(f'--user-data-dir={profile_dir}')
+        chrome_options.add_argument(f'--disk-cache-dir={os.path.join(profile_dir, "cache")}')
+        chrome_options.add_argument(f'--disk-cache-size={config.BROWSER_DISK_CACHE_SIZE}')
+    
     try:
         driver = webdriver.Chrome(options=chrome_options)
         log_message("✓ WebDriver created successfully")
+        if profile_dir:
+            log_message(f"  Browser profile: {profile_dir}")
+            if config.BROWSER_WARMUP:
+                warm_up(driver)
         return driver
     except Exception as e:
+        if profile_dir:
+            log_message(f"⚠ Could not start with browser profile {profile_dir} (in use?): {e}")
+            log_message("  Falling back to a temporary profile")
+            return create_driver(worker_id, use_profile=False)
         log_message(f"✗ Failed to create WebDriver: {e}")
         import traceback
         traceback.print_exc()
         return None
 
-def extract_cytotoxicity_data(driver):
-    """Extract Cytotoxicity data from the page"""
+def load_input_page(driver, warm_up_load=False):
+    """
+    Navigate to the input page and record its load time
+    
+    A load is warm when at least half of the page's assets were served from
+    the browser cache. Warm-up loads are recorded separately so they do not
+    skew the cold/warm figures of loads made for compounds.
+    
+    Returns:
+        tuple: (seconds, 'cold' or 'warm', cached assets, total assets)
+    """
+    started = time.time()
+    driver.get(PROTOX_URL)
+    seconds = time.time() - started
     try:
-        script = """
-        const tables = document.querySelectorAll('table');
-        let cytotoxicityData = null;
-        
-        tables.forEach(table => {
-            const rows = table.querySelectorAll('tr');
-            rows.forEach(row => {
-                const text = row.textContent;
-                if (text.includes('Cytotoxicity')) {
-                    const cells = row.querySelectorAll('td');
-                    if (cells.length > 0) {
-                        const rowData = [];
-                        cells.forEach(cell => {
-                            rowData.push(cell.textContent.trim());
-                        });
-                        cytotoxicityData = rowData;
-                    }
-                }
-            });
-        });
-        
-        return cytotoxicityData;
-        """
-        
-        result = driver.execute_script(script)
-        return result
+        cached, total = driver.execute_script(PAGE_CACHE_SCRIPT)
+    except Exception:
+        cached, total = 0, 0
+    kind = 'warm' if total and cached * 2 >= total else 'cold'
+    with _page_loads_lock:
+        _page_loads['warm-up' if warm_up_load else kind].append(seconds)
+    return seconds, kind, cached, total
+
+def warm_up(driver):
+    """Load the input page once so later loads are served from cache"""
+    try:
+        seconds, kind, cached, total = load_input_page(driver, warm_up_load=True)
+        log_message(f"✓ Warm-up navigation: {seconds:.1f}s ({kind}, {cached}/{total} assets from cache)")
     except Exception as e:
-        log_message(f"✗ Failed to extract Cytotoxicity data: {e}")
-        return None
+        log_message(f"⚠ Warm-up navigation failed: {e}")
+
+def page_load_summary():
+    """Describe cold and warm input page loads so far"""
+    with _page_loads_lock:
+        parts = [f"{kind} {len(times)} (avg {sum(times) / len(times):.1f}s)"
+                 for kind, times in _page_loads.items() if times]
+    return ', '.join(parts) if parts else 'none'
+
+def visible_text(page_source):
+    """Approximate document.body.innerText for a page fetched without a browser"""
+    return html.unescape(TAG.sub(' ', HIDDEN_MARKUP.sub(' ', page_source)))
+
+def detect_failure(page_text):
+    """Return the failure reason whose signature appears in the visible page text, or None"""
+    page_text = ' '.join(page_text.split()).lower()
+    for reason, signatures in config.FAILURE_SIGNATURES.items():
+        for signature in signatures:
+            if signature.lower() in page_text:
+                return reason
+    return None
+
+def check_results_page(driver):
+    """
+    Look at the current page once
+    
+    Returns:
+        tuple: (results_ready, failure_reason or None)
+    """
+    if "Toxicity Model Report" in driver.page_source:
+        return True, None
+    return False, detect_failure(driver.execute_script(VISIBLE_TEXT_SCRIPT) or '')
 
 def process_compound(driver, pubchem_id, canonical_smiles):
     """Process a single compound"""
@@ -128,7 +276,8 @@ def process_compound(driver, pubchem_id, canonical_smiles):
         # Navigate to ProTox-3 input page
         log_message(f"  Navigating to {PROTOX_URL}")
         try:
-            driver.get(PROTOX_URL)
+            seconds, kind, cached, total = load_input_page(driver)
+            log_message(f"  Page loaded in {seconds:.1f}s ({kind}, {cached}/{total} assets from cache)")
             time.sleep(5)  # Increased wait time for SSL certificate handling
         except Exception as e:
             log_message(f"  ✗ Navigation failed: {e}")
@@ -191,81 +340,234 @@ def process_compound(driver, pubchem_id, canonical_smiles):
         log_message("  Clicking Start Tox-Prediction button...")
         start_button = driver.find_element(By.ID, "start_pred")
         start_button.click()
+        submitted_at = time.time()
         log_message("  ✓ Start button clicked, waiting for results...")
         
-        # Wait for results page (up to MAX_WAIT_TIME seconds)
-        wait_time = 0
-        max_wait = MAX_WAIT_TIME
-        while wait_time < max_wait:
-            time.sleep(30)
-            wait_time += 30
-            log_message(f"  Waiting... ({wait_time}/{max_wait} seconds)")
-            
-            # Check if results are ready
-            try:
-                if "Toxicity Model Report" in driver.page_source:
-                    log_message("  ✓ Results page loaded")
-                    break
-            except:
-                pass
-        
-        if wait_time >= max_wait:
-            log_message(f"  ✗ Timeout waiting for results (>{max_wait}s)")
-            return False
-        
-        # Extract Cytotoxicity data
-        log_message("  Extracting Cytotoxicity data...")
-        cyto_data = extract_cytotoxicity_data(driver)
+        # Wait ceiling adapted to this compound when enabled
+        max_wait = choose_timeout(canonical_smiles)
+        log_message(f"  Timeout for this compound: {max_wait}s")
         
-        if cyto_data and len(cyto_data) >= 5:
-            log_message(f"  ✓ Cytotoxicity data extracted: {cyto_data}")
-            
-            # Save individual compound report
-            output_file = os.path.join(OUTPUT_DIR, f"CID_{pubchem_id}.csv")
-            
-            # Extract all toxicity data from the page
-            script = """
-            const tables = document.querySelectorAll('table');
-            const allData = [];
-            
-            tables.forEach(table => {
-                const rows = table.querySelectorAll('tr');
-                rows.forEach((row, index) => {
-                    const cells = row.querySelectorAll('td, th');
-                    if (cells.length > 0) {
-                        const rowData = [];
-                        cells.forEach(cell => {
-                            rowData.push(cell.textContent.trim());
-                        });
-                        allData.push(rowData);
-                    }
-                });
-            });
-            
-            return allData;
-            """
-            
-            all_data = driver.execute_script(script)
-            
-            # Save to CSV
-            with open(output_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                for row in all_data:
-                    if row:  # Skip empty rows
-                        writer.writerow(row)
-            
-            log_message(f"  ✓ Saved report to: {output_file}")
-            return True
+        # Remember the job so a new driver can reattach if this one dies
+        try:
+            WebDriverWait(driver, 15).until(lambda d: is_job_url(d.current_url))
+        except TimeoutException:
+            pass
+        if is_job_url(driver.current_url):
+            save_job(pubchem_id, canonical_smiles, driver.current_url, driver.get_cookies(), submitted_at, max_wait)
+            log_message(f"  ✓ Job accepted: {driver.current_url}")
         else:
-            log_message("  ✗ Failed to extract Cytotoxicity data")
-            return False
+            log_message(f"  ⚠ No job page after submitting ({driver.current_url}), reattach will not be possible")
+        
+        return wait_for_results(driver, pubchem_id, canonical_smiles, submitted_at, max_wait)
             
+    except PredictionRejected:
+        raise
     except Exception as e:
         log_message(f"  ✗ Error processing compound {pubchem_id}: {e}")
         import traceback
         traceback.print_exc()
         return False
 
+def wait_for_results(driver, pubchem_id, canonical_smiles, submitted_at, max_wait):
+    """
+    Wait for the results page of a submitted job and hand it to the report writer
+    
+    The page source is captured once; the writer pool extracts the
+    Cytotoxicity data in the background and decides the outcome, which
+    log_success reports once the report is written.
+    
+    Returns:
+        bool: True if a results page was captured
+    """
+    # Wait for results page
+    wait_time = int(time.time() - submitted_at)
+    results_ready = False
+    failure_reason = None
+    poll_errors = 0
+    if wait_time >= max_wait:
+        # Reattached after the ceiling passed: the results may still be there
+        log_message("  Wait ceiling already passed, checking the page once")
+        try:
+            results_ready, failure_reason = check_results_page(driver)
+        except Exception as e:
+            log_message(f"  ✗ Page check failed: {e}")
+    while wait_time < max_wait:
+        time.sleep(config.RESULT_POLL_INTERVAL)
+        wait_time += config.RESULT_POLL_INTERVAL
+        log_message(f"  Waiting... ({wait_time}/{max_wait} seconds)")
+        
+        # Check if results are ready, or the server reported a failure
+        try:
+            results_ready, failure_reason = check_results_page(driver)
+            if results_ready or failure_reason:
+                break
+            poll_errors = 0
+        except Exception:
+            # A browser that keeps failing is gone; keep the job for reattaching
+            poll_errors += 1
+            if poll_errors >= MAX_POLL_ERRORS:
+                raise
+    if results_ready:
+        log_message("  ✓ Results page loaded")
+    
+    # The wait is over either way: the job can no longer be reattached
+    remove_job(pubchem_id)
+    
+    if failure_reason:
+        log_message(f"  ✗ Server reported failure after {wait_time}s: {failure_reason}")
+        record_duration(pubchem_id, canonical_smiles, time.time() - submitted_at, failure_reason, max_wait)
+        if failure_reason in config.NON_RETRYABLE_FAILURES:
+            raise PredictionRejected(failure_reason)
+        return False
+    
+    if not results_ready:
+        log_message(f"  ✗ Timeout waiting for results (>{max_wait}s)")
+        record_duration(pubchem_id, canonical_smiles, time.time() - submitted_at, 'timeout', max_wait)
+        return False
+    
+    # Capture the page once; the Cytotoxicity data is extracted, and the
+    # report written and archived, in the background while the browser
+    # moves on to the next compound
+    seconds = time.time() - submitted_at
+    writer = get_result_writer()
+    writer.submit(pubchem_id, driver.page_source)
+    writer.when_written(pubchem_id, lambda written: record_duration(
+        pubchem_id, canonical_smiles, seconds, 'success' if written else 'extract_failed', max_wait))
+    return True
+
+def reattach_compound(driver, job):
+    """
+    Reattach a driver to a stored in-flight job and finish it without resubmitting
+    
+    Returns:
+        bool: True if a results page was captured
+    """
+    pubchem_id = job['pubchem_id']
+    try:
+        log_message(f"  Reattaching to submitted job: {job['url']}")
+        # Cookies can only be set for the domain currently loaded
+        driver.get(PROTOX_URL)
+        for cookie in job['cookies']:
+            try:
+                driver.add_cookie({key: value for key, value in cookie.items() if key != 'sameSite'})
+            except Exception:
+                pass
+        driver.get(job['url'])
+        return wait_for_results(driver, pubchem_id, job['canonical_smiles'], job['submitted_at'], job['max_wait'])
+    except PredictionRejected:
+        raise
+    except Exception as e:
+        log_message(f"  ✗ Error reattaching to compound {pubchem_id}: {e}")
+        return False
+
+def load_result_index():
+    """Load the InChIKey -> PubChem_ID index of stored results"""
+    index = {}
+    if os.path.exists(config.RESULT_INDEX_FILE):
+        with open(config.RESULT_INDEX_FILE, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                index[row['InChIKey']] = row['PubChem_ID']
+    return index
+
+def load_duplicates():
+    """Load the representative PubChem_ID -> duplicate PubChem_IDs map"""
+    duplicates = {}
+    if os.path.exists(config.DUPLICATES_FILE):
+        with open(config.DUPLICATES_FILE, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                duplicates.setdefault(row['Representative_PubChem_ID'], []).append(row['PubChem_ID'])
+    return duplicates
+
+def reuse_result(pubchem_id, inchikey, result_index):
+    """
+    Copy a stored result for the same standardized structure, if there is one
+    
+    Returns:
+        bool: True if a result was reused and no prediction is needed
+    """
+    source_id = result_index.get(inchikey) if inchikey else None
+    if not source_id:
+        return False
+    source_file = os.path.join(OUTPUT_DIR, f"CID_{source_id}.csv")
+    wait_for_result(source_id)
+    if not os.path.exists(source_file):
+        return False
+    if source_id != pubchem_id:
+        shutil.copyfile(source_file, os.path.join(OUTPUT_DIR, f"CID_{pubchem_id}.csv"))
+    log_message(f"✓ Compound {pubchem_id} processed successfully (reused result of CID {source_id})")
+    return True
+
+def share_result(pubchem_id, inchikey, result_index, duplicates):
+    """
+    Record a new result in the InChIKey index and copy it to known duplicates
+    
+    Returns:
+        list: PubChem IDs the result was copied to
+    """
+    source_file = os.path.join(OUTPUT_DIR, f"CID_{pubchem_id}.csv")
+    
+    if inchikey and inchikey not in result_index:
+        write_header = not os.path.exists(config.RESULT_INDEX_FILE)
+        with open(config.RESULT_INDEX_FILE, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(['InChIKey', 'PubChem_ID'])
+            writer.writerow([inchikey, pubchem_id])
+        result_index[inchikey] = pubchem_id
+    
+    if duplicates.get(pubchem_id):
+        wait_for_result(pubchem_id)
+        if not os.path.exists(source_file):
+            for duplicate_id in duplicates[pubchem_id]:
+                log_message(f"✗ Compound {duplicate_id} processing failed (no report of CID {pubchem_id} to reuse)")
+            return []
+    for duplicate_id in duplicates.get(pubchem_id, []):
+        shutil.copyfile(source_file, os.path.join(OUTPUT_DIR, f"CID_{duplicate_id}.csv"))
+        log_message(f"✓ Compound {duplicate_id} processed successfully (reused result of CID {pubchem_id})")
+    
+    return duplicates.get(pubchem_id, [])
+
+def process_with_retries(driver, pubchem_id, canonical_smiles):
+    """
+    Process a compound, retrying up to RETRY_TIMES attempts
+    
+    Submission, timeout and browser failures are retried here. Whether the
+    captured page holds Cytotoxicity data is decided later by the writer pool
+    (see when_reported); such failures are left to retry_failed.py.
+    
+    Returns:
+        bool: True if a results page was captured
+    """
+    for attempt in range(config.RETRY_TIMES):
+        if attempt > 0:
+            log_message(f"  Retry attempt {attempt}/{config.RETRY_TIMES - 1}")
+        
+        try:
+            # A job submitted by an earlier (crashed) driver is picked up, not resubmitted
+            job = get_job(pubchem_id)
+            if job:
+                success = reattach_compound(driver, job)
+            else:
+                success = process_compound(driver, pubchem_id, canonical_smiles)
+        except PredictionRejected as e:
+            log_message(f"✗ Compound {pubchem_id} processing failed: {e} (not retried)")
+            return False
+        
+        if success:
+            log_success(pubchem_id)
+            return True
+        elif attempt < config.RETRY_TIMES - 1:
+            log_message(f"  ⚠ Attempt {attempt + 1} failed, retrying...")
+            time.sleep(10)  # Wait before retry
+    
+    log_message(f"✗ Compound {pubchem_id} processing failed after {config.RETRY_TIMES} attempts")
+    return False
+
+def shard_index(input_file):
+    """Index N of a shard file written by cost_model.py plan (shard_<N>.csv), or None"""
+    match = re.fullmatch(r'shard_(\d+)\.csv', os.path.basename(input_file))
+    return int(match.group(1)) if match else None
+
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(description='ProTox-3 Automation Script')
@@ -275,6 +577,10 @@ def main():
                        help='End index (default: all)')
     parser.add_argument('--input', type=str, default=None,
                        help='Custom input file path (default: from config.py)')
+    parser.add_argument('--start-id', type=str, default=None,
+                       help='Start at the row of this PubChem ID (overrides start index)')
+    parser.add_argument('--count', type=int, default=None,
+                       help='Number of compounds to process from the start (overrides end index)')
     args = parser.parse_args()
     
     start_idx = args.start
@@ -300,67 +606,108 @@ def main():
         log_message("Please run convert_smiles.py first to generate canonical SMILES")
         return
     
-    # Read compounds from CSV
-    compounds = []
-    with open(input_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            compounds.append(row)
-    
+    # Open the row index of the input (built once, reused by every worker)
+    compounds = RowIndex.open(input_file)
     total_compounds = len(compounds)
     log_message(f"Total compounds in file: {total_compounds}")
     
+    if args.start_id is not None:
+        start_idx = compounds.find(args.start_id)
+        if start_idx is None:
+            log_message(f"✗ PubChem_ID {args.start_id} not found in {input_file}")
+            compounds.close()
+            return
+        log_message(f"PubChem_ID {args.start_id} is at index {start_idx}")
+    
     # Determine processing range
-    if end_idx is None:
+    if args.count is not None:
+        end_idx = start_idx + args.count
+    if end_idx is None or end_idx > total_compounds:
         end_idx = total_compounds
+    start_idx = min(start_idx, end_idx)
     
-    compounds_to_process = compounds[start_idx:end_idx]
-    log_message(f"Processing compounds {start_idx} to {end_idx} ({len(compounds_to_process)} compounds)")
+    process_count = end_idx - start_idx
+    log_message(f"Processing compounds {start_idx} to {end_idx} ({process_count} compounds)")
     log_message("")
     
+    # Shard processes run side by side: each uses the browser profile of its shard
+    shard = shard_index(input_file)
+    worker_id = shard if shard is not None else 0
+    
     # Create WebDriver
-    driver = create_driver()
+    driver = create_driver(worker_id)
     if not driver:
         log_message("✗ Failed to create WebDriver, exiting...")
+        compounds.close()
         return
     
-    # Process each compound
+    # Process each compound (predicted compounds are counted once their report is decided)
     success_count = 0
     fail_count = 0
+    outcomes = {True: 0, False: 0}
+    outcomes_lock = threading.Lock()
+    run_started = time.time()
+    
+    # Shard processes started side by side each publish their own status
+    status = RunStatus(total=process_count, status_file=status_file_for(shard))
+    status_url = status.serve()
+    if status_url:
+        log_message(f"Live status: {status_url}")
+    log_message(f"Status file: {status.status_file}")
+    
+    # Standardized inputs carry an InChIKey used to reuse earlier results
+    result_index = load_result_index()
+    duplicates = load_duplicates()
+    
+    # Shards written by cost_model.py carry a predicted time per compound
+    has_predictions = 'Predicted_Seconds' in compounds.fieldnames
+    predicted = 0.0
     
     try:
-        for idx, compound in enumerate(compounds_to_process, start=start_idx):
+        for idx, compound in enumerate(compounds.iter_rows(start_idx, end_idx), start=start_idx):
             pubchem_id = compound['PubChem_ID']
+            if has_predictions:
+                predicted += float(compound['Predicted_Seconds'] or 0)
             canonical_smiles = compound['Canonical_SMILES']
+            inchikey = compound.get('InChIKey')
             
             log_message(f"\n[{idx+1}/{end_idx}] Processing compound {pubchem_id}")
             
-            # Retry logic
-            success = False
-            for attempt in range(config.RETRY_TIMES):
-                if attempt > 0:
-                    log_message(f"  Retry attempt {attempt}/{config.RETRY_TIMES - 1}")
-                
-                success = process_compound(driver, pubchem_id, canonical_smiles)
-                
-                if success:
-                    break
-                elif attempt < config.RETRY_TIMES - 1:
-                    log_message(f"  ⚠ Attempt {attempt + 1} failed, retrying...")
-                    time.sleep(10)  # Wait before retry
-            
-            if success:
+            if reuse_result(pubchem_id, inchikey, result_index):
                 success_count += 1
-                log_message(f"✓ Compound {pubchem_id} processed successfully")
+                status.skip()
+                share_result(pubchem_id, inchikey, result_index, duplicates)
             else:
-                fail_count += 1
-                log_message(f"✗ Compound {pubchem_id} processing failed after {config.RETRY_TIMES} attempts")
+                status.start_compound(worker_id, pubchem_id)
+                started = time.time()
+                captured = process_with_retries(driver, pubchem_id, canonical_smiles)
+                seconds = time.time() - started
+                status.worker_state(worker_id, 'idle')
+                
+                def count_outcome(success, pubchem_id=pubchem_id, seconds=seconds):
+                    with outcomes_lock:
+                        outcomes[success] += 1
+                    status.finish_compound(None, pubchem_id, success, seconds if success else None)
+                
+                when_reported(pubchem_id, captured, count_outcome)
+                if captured:
+                    share_result(pubchem_id, inchikey, result_index, duplicates)
+                status.set_stat('writer_queue_depth', get_result_writer().queue_depth())
             
             log_message("")
             
     finally:
         driver.quit()
         log_message("WebDriver closed")
+        if _result_writer is not None:
+            log_message(f"Waiting for {_result_writer.queue_depth()} queued report(s) to be written...")
+            _result_writer.shutdown()
+        status.worker_state(worker_id, 'stopped')
+        status.close()
+        compounds.close()
+    
+    success_count += outcomes[True]
+    fail_count += outcomes[False]
     
     # Summary
     log_message("=" * 60)
@@ -369,6 +716,13 @@ def main():
     log_message(f"Total processed: {success_count + fail_count}")
     log_message(f"Successful: {success_count}")
     log_message(f"Failed: {fail_count}")
+    log_message(f"Input page loads: {page_load_summary()}")
+    
+    if has_predictions and process_count:
+        actual = time.time() - run_started
+        log_message(f"Predicted completion time: {predicted / 3600:.1f} h")
+        log_message(f"Actual completion time: {actual / 3600:.1f} h")
+    
     log_message("")
     log_message("Next step: Run extract_cytotoxicity.py to aggregate results")
     log_message("=" * 60)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Query Stored Predictions
+Function: Select compounds by a filter over model predictions and probabilities and
+stream their PubChem IDs and values as CSV or JSON
+
+A filter is made of terms over model shorthands, combined with AND / OR
+(AND binds tighter); keywords, shorthands and predictions are case-insensitive:
+
+    cyto=Active                     # Prediction of a model
+    dili!=Inactive
+    dili.probability>0.7            # Probability of a model (>, >=, <, <=)
+
+Queries run on the columnar prediction store of prediction_stats.py through
+secondary indexes kept in QUERY_INDEX_FILE: rows grouped by (model,
+prediction), rows sorted by probability within each model, and rows sorted by
+compound within each model for looking up output values. Each term is a
+binary search or a slice; terms are combined with sorted-array set operations.
+
+Usage:
+    python3 query_predictions.py "<filter>" [--format csv|json] [--models SHORTHAND ...] [--refresh]
+
+Examples:
+    python3 query_predictions.py "cyto=Active AND dili.probability>0.7"
+    python3 query_predictions.py "muta=Active OR carcino=Active" --format json > hits.jsonl
+"""
+
+import os
+import re
+import csv
+import sys
+import json
+import argparse
+from pathlib import Path
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+from prediction_stats import PredictionStore, load_store, PREDICTION_LABELS
+
+TERM_PATTERN = re.compile(
+    r'^\s*(?P<model>[\w-]+)'
+    r'(?:(?P<probability>\.probability)\s*(?P<prob_op>>=|<=|>|<)\s*(?P<value>[0-9.]+)'
+    r'|\s*(?P<pred_op>!=|=)\s*(?P<prediction>\w+))\s*$',
+    re.IGNORECASE,
+)
+OUTPUT_CHUNK = 10000  # Compounds decoded per output step
+
+
+class QueryError(Exception):
+    """The filter expression is invalid"""
+
+
+def parse_filter(expression):
+    """
+    Parse a filter expression
+
+    Returns:
+        list: OR-groups, each a list of AND-ed term dicts
+    """
+    groups = []
+    for group_text in re.split(r'\s+OR\s+', expression.strip(), flags=re.IGNORECASE):
+        terms = []
+        for term_text in re.split(r'\s+AND\s+', group_text, flags=re.IGNORECASE):
+            match = TERM_PATTERN.match(term_text)
+            if not match:
+                raise QueryError(f"Cannot parse term: {term_text.strip()!r}")
+            if match.group('probability'):
+                terms.append({'model': match.group('model'), 'op': match.group('prob_op'),
+                              'value': float(match.group('value'))})
+            else:
+                prediction = match.group('prediction').capitalize()
+                if prediction not in PREDICTION_LABELS:
+                    raise QueryError(f"Prediction must be Active or Inactive: {term_text.strip()!r}")
+                terms.append({'model': match.group('model'), 'op': match.group('pred_op'),
+                              'prediction': prediction})
+        groups.append(terms)
+    return groups
+
+
+class QueryIndex:
+    """Secondary indexes over a PredictionStore"""
+
+    ARRAYS = ('mp_order', 'mp_offsets', 'prob_order', 'prob_sorted', 'model_offsets',
+              'cm_order', 'cm_compound')
+
+    def __init__(self, store, arrays):
+        self.store = store
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def build(cls, store):
+        """Build all indexes with a few sorts over the store columns"""
+        n_models = len(store.models)
+        model = store.model.astype(np.int64)
+
+        # Rows grouped by (model, prediction), compound-sorted within each group
+        mp_key = model * 2 + store.active
+        mp_order = np.lexsort((store.compound, mp_key)).astype(np.int64)
+        mp_offsets = np.searchsorted(mp_key[mp_order], np.arange(n_models * 2 + 1))
+
+        # Rows sorted by probability within each model (NaN last)
+        prob_order = np.lexsort((store.probability, model)).astype(np.int64)
+        model_offsets = np.searchsorted(model[prob_order], np.arange(n_models + 1))
+
+        # Rows sorted by compound within each model, for value lookups
+        cm_order = np.lexsort((store.compound, model)).astype(np.int64)
+
+        return cls(store, {
+            'mp_order': mp_order,
+            'mp_offsets': mp_offsets,
+            'prob_order': prob_order,
+            'prob_sorted': store.probability[prob_order],
+            'model_offsets': model_offsets,
+            'cm_order': cm_order,
+            'cm_compound': store.compound[cm_order],
+        })
+
+    @classmethod
+    def open(cls, store, store_file=None, index_file=None):
+        """Load the indexes, rebuilding them if the store changed since they were built"""
+        store_file = store_file or config.PREDICTION_STORE_FILE
+        index_file = index_file or config.QUERY_INDEX_FILE
+        store_mtime = os.stat(store_file).st_mtime_ns if os.path.exists(store_file) else 0
+        if os.path.exists(index_file):
+            data = np.load(index_file)
+            if int(data['store_mtime']) == store_mtime and int(data['store_rows']) == len(store):
+                return cls(store, {name: data[name] for name in cls.ARRAYS})
+        index = cls.build(store)
+        temp_file = f"{index_file}.{os.getpid()}.tmp.npz"
+        np.savez(temp_file, store_mtime=store_mtime, store_rows=len(store),
+                 **{name: getattr(index, name) for name in cls.ARRAYS})
+        os.replace(temp_file, index_file)
+        return index
+
+    # ------------------------------------------------------------------
+
+    def model_code(self, shorthand):
+        """Code of a model shorthand, matched exactly or else ignoring case"""
+        code = self.store.model_code(shorthand)
+        if code is None:
+            matches = np.flatnonzero(np.char.lower(self.store.models.astype(str)) == shorthand.lower())
+            code = int(matches[0]) if len(matches) else None
+        if code is None:
+            raise QueryError(f"Unknown model: {shorthand} (known: {', '.join(self.store.models.tolist())})")
+        return code
+
+    def compounds_with_prediction(self, code, prediction):
+        """Sorted compound codes with a given prediction for one model"""
+        group = code * 2 + PREDICTION_LABELS.index(prediction)
+        rows = self.mp_order[self.mp_offsets[group]:self.mp_offsets[group + 1]]
+        return self.store.compound[rows]
+
+    def compounds_with_probability(self, code, op, value):
+        """Sorted compound codes whose probability for one model satisfies op value"""
+        lo, hi = self.model_offsets[code], self.model_offsets[code + 1]
+        values = self.prob_sorted[lo:hi]
+        valid = hi - lo - int(np.count_nonzero(np.isnan(values)))
+        if op == '>':
+            start, end = np.searchsorted(values[:valid], value, side='right'), valid
+        elif op == '>=':
+            start, end = np.searchsorted(values[:valid], value, side='left'), valid
+        elif op == '<':
+            start, end = 0, np.searchsorted(values[:valid], value, side='left')
+        else:
+            start, end = 0, np.searchsorted(values[:valid], value, side='right')
+        return np.sort(self.store.compound[self.prob_order[lo + start:lo + end]])
+
+    def evaluate_term(self, term):
+        code = self.model_code(term['model'])
+        if 'prediction' in term:
+            prediction = term['prediction']
+            if term['op'] == '!=':
+                prediction = PREDICTION_LABELS[1 - PREDICTION_LABELS.index(prediction)]
+            compounds = self.compounds_with_prediction(code, prediction)
+        else:
+            compounds = self.compounds_with_probability(code, term['op'], np.float32(term['value']))
+        return np.unique(compounds)
+
+    def evaluate(self, groups):
+        """Sorted compound codes matching an OR of AND-groups"""
+        result = np.array([], dtype=np.int32)
+        for terms in groups:
+            matches = None
+            for term in terms:
+                compounds = self.evaluate_term(term)
+                matches = compounds if matches is None else np.intersect1d(matches, compounds, assume_unique=True)
+            result = np.union1d(result, matches)
+        return result
+
+    def values(self, code, compounds):
+        """Prediction and probability of one model for sorted compound codes (None where missing)"""
+        lo, hi = self.model_offsets[code], self.model_offsets[code + 1]
+        if lo == hi:
+            missing = np.zeros(len(compounds), dtype=bool)
+            return missing, missing, np.full(len(compounds), np.nan, dtype=np.float32)
+        compound_slice = self.cm_compound[lo:hi]
+        pos = np.searchsorted(compound_slice, compounds)
+        found = pos < len(compound_slice)
+        found[found] = compound_slice[pos[found]] == compounds[found]
+        rows = self.cm_order[lo + np.minimum(pos, len(compound_slice) - 1)]
+        return found, self.store.active[rows], self.store.probability[rows]
+
+
+def stream_results(index, compounds, model_codes, output_format, out):
+    """Write matching compounds with the values of the given models"""
+    names = [str(index.store.models[code]) for code in model_codes]
+    if output_format == 'csv':
+        writer = csv.writer(out)
+        header = ['PubChem_ID']
+        for name in names:
+            header += [f"{name}_prediction", f"{name}_probability"]
+        writer.writerow(header)
+
+    for start in range(0, len(compounds), OUTPUT_CHUNK):
+        chunk = compounds[start:start + OUTPUT_CHUNK]
+        ids = index.store.compound_ids[chunk].tolist()
+        columns = [index.values(code, chunk) for code in model_codes]
+        for i, pubchem_id in enumerate(ids):
+            if output_format == 'csv':
+                row = [pubchem_id]
+                for found, active, probability in columns:
+                    if found[i]:
+                        p = float(probability[i])
+                        row += [PREDICTION_LABELS[int(active[i])], '' if np.isnan(p) else f"{p:g}"]
+                    else:
+                        row += ['', '']
+                writer.writerow(row)
+            else:
+                record = {'pubchem_id': pubchem_id}
+                for name, (found, active, probability) in zip(names, columns):
+                    if found[i]:
+                        p = float(probability[i])
+                        record[name] = {'prediction': PREDICTION_LABELS[int(active[i])],
+                                        'probability': None if np.isnan(p) else round(p, 4)}
+                out.write(json.dumps(record) + '\n')
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Query stored predictions with a filter expression')
+    parser.add_argument('filter', help='Filter, e.g. "cyto=Active AND dili.probability>0.7"')
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv',
+                        help='Output format: CSV or JSON Lines (default: csv)')
+    parser.add_argument('--models', nargs='+', default=None,
+                        help='Models whose values are output (default: models in the filter)')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Scan the results directory for new reports before querying')
+    parser.add_argument('--count', action='store_true', help='Only print the number of matches')
+    args = parser.parse_args()
+
+    try:
+        groups = parse_filter(args.filter)
+    except QueryError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        sys.exit(2)
+
+    # The store is only rescanned on request (or when it does not exist yet)
+    refresh = args.refresh or not os.path.exists(config.PREDICTION_STORE_FILE)
+    store = load_store(refresh=refresh) if refresh else PredictionStore.load()
+    if not len(store):
+        print("✗ No predictions found in stored reports", file=sys.stderr)
+        sys.exit(1)
+
+    index = QueryIndex.open(store)
+    try:
+        compounds = index.evaluate(groups)
+        shorthands = args.models or list(dict.fromkeys(term['model'] for terms in groups for term in terms))
+        model_codes = [index.model_code(shorthand) for shorthand in shorthands]
+    except QueryError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        sys.exit(2)
+
+    if args.count:
+        print(len(compounds))
+        return
+    stream_results(index, compounds, model_codes, args.format, sys.stdout)
+    print(f"{len(compounds)} matching compounds", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
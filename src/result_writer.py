@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Background Results Parser/Writer Pool
+Function: Parse captured ProTox-3 results pages and write CID_*.csv reports off the
+browser thread
+
+process_compound captures the page source once and hands it to this pool,
+then goes straight on to the next compound. Workers archive the raw page,
+extract every table row with results_archive.extract_table_rows (lxml; same
+rows as the former in-browser table walk) and decide the outcome: a page
+without a Cytotoxicity row is a failed prediction and gets no report.
+Otherwise the report is written atomically.
+
+Code that reads a report right after a prediction calls wait() first; it
+returns at once when no write for that compound is pending. A compound's
+outcome is only reported through when_written(), after its report is on
+disk, so a failed write is never logged as a success.
+"""
+
+import os
+import csv
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+from results_archive import archive_page, extract_table_rows, extract_cytotoxicity_row
+
+
+def write_report(pubchem_id, rows, output_dir):
+    """
+    Write the CID_<id>.csv report of one results page from its table rows
+
+    Returns:
+        str: Path of the written report
+    """
+    output_file = os.path.join(output_dir, f"CID_{pubchem_id}.csv")
+    temp_file = f"{output_file}.tmp"
+    with open(temp_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        for row in rows:
+            if row:  # Skip empty rows
+                writer.writerow(row)
+    os.replace(temp_file, output_file)
+    return output_file
+
+
+class ResultWriterPool:
+    """Thread pool that parses results pages and writes reports in the background"""
+
+    def __init__(self, workers=None, output_dir=None, log=print):
+        self.output_dir = output_dir or config.RESULTS_DIR
+        self.log = log
+        self.executor = ThreadPoolExecutor(max_workers=workers or config.RESULT_WRITER_WORKERS,
+                                           thread_name_prefix='result-writer')
+        self.pending = {}  # PubChem_ID -> Future
+        self.lock = threading.Lock()
+
+    def submit(self, pubchem_id, html):
+        """Queue a captured results page for parsing, writing and archiving"""
+        future = self.executor.submit(self._process, pubchem_id, html)
+        with self.lock:
+            self.pending[pubchem_id] = future
+        future.add_done_callback(lambda f: self._forget(pubchem_id, f))
+        return future
+
+    def _forget(self, pubchem_id, future):
+        with self.lock:
+            if self.pending.get(pubchem_id) is future:
+                del self.pending[pubchem_id]
+
+    def _process(self, pubchem_id, html):
+        # Keep the raw page so other endpoints can be re-extracted offline
+        if config.ARCHIVE_RESULTS_PAGES:
+            try:
+                sha256 = archive_page(pubchem_id, html)
+                self.log(f"  ✓ Results page of {pubchem_id} archived: {sha256[:12]}")
+            except Exception as e:
+                self.log(f"  Warning: Failed to archive results page of {pubchem_id}: {e}")
+        try:
+            rows = extract_table_rows(html)
+            cyto_data = extract_cytotoxicity_row(rows)
+            if cyto_data is None:
+                self.log(f"  ✗ Failed to extract Cytotoxicity data of {pubchem_id}")
+                return None
+            self.log(f"  ✓ Cytotoxicity data of {pubchem_id} extracted: {cyto_data}")
+            output_file = write_report(pubchem_id, rows, self.output_dir)
+            self.log(f"  ✓ Saved report to: {output_file}")
+            return output_file
+        except Exception as e:
+            self.log(f"  ✗ Failed to write report of {pubchem_id}: {e}")
+            return None
+
+    def wait(self, pubchem_id):
+        """Block until a pending report of this compound has been written"""
+        with self.lock:
+            future = self.pending.get(pubchem_id)
+        if future is not None:
+            future.result()
+
+    def when_written(self, pubchem_id, callback):
+        """
+        Call callback(written) once the pending report of a compound is done
+
+        written is True if the page had Cytotoxicity data and its report was
+        written. Without a pending write the callback runs at once (True if
+        a report exists).
+        """
+        with self.lock:
+            future = self.pending.get(pubchem_id)
+        if future is None:
+            callback(os.path.exists(os.path.join(self.output_dir, f"CID_{pubchem_id}.csv")))
+        else:
+            future.add_done_callback(lambda f: callback(f.result() is not None))
+
+    def queue_depth(self):
+        """Number of pages queued or being written"""
+        with self.lock:
+            return len(self.pending)
+
+    def shutdown(self):
+        """Finish every queued page and stop the workers"""
+        self.executor.shutdown(wait=True)
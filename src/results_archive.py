@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Compressed Raw Results-Page Archive
+Function: Keep every ProTox-3 results page, gzip-compressed and content-addressed,
+and rebuild CSV or JSON output from it offline
+
+process_compound stores the raw HTML of each results page under
+RESULTS_ARCHIVE_DIR/<first two hash characters>/<sha256>.html.gz and appends
+(PubChem_ID, SHA256) to the archive index. The reparse command extracts any
+table rows, or the acute toxicity class and LD50, from the archive in
+parallel without touching the network.
+
+Usage:
+    python3 results_archive.py list
+    python3 results_archive.py reparse [--ids ID ...] [--format csv|json] [--filter TEXT] [--output-dir DIR]
+
+Examples:
+    python3 results_archive.py reparse --format json                # All endpoints as JSON
+    python3 results_archive.py reparse --filter Hepatotoxicity      # Only DILI rows as CSV
+"""
+
+import os
+import re
+import csv
+import sys
+import gzip
+import json
+import time
+import hashlib
+import argparse
+from multiprocessing import Pool
+from pathlib import Path
+import lxml.html
+from lxml import etree
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+
+INDEX_FIELDS = ['PubChem_ID', 'SHA256', 'Timestamp', 'Bytes']
+
+LD50_PATTERN = re.compile(r'Predicted LD50:\s*([\d.]+)\s*mg/kg', re.IGNORECASE)
+TOX_CLASS_PATTERN = re.compile(r'Predicted Toxicity Class:\s*(\d+)', re.IGNORECASE)
+
+
+def archive_path(sha256):
+    """Return the archive file path for a content hash"""
+    return os.path.join(config.RESULTS_ARCHIVE_DIR, sha256[:2], f"{sha256}.html.gz")
+
+
+def archive_page(pubchem_id, html):
+    """
+    Store a results page in the archive
+
+    Args:
+        pubchem_id: PubChem ID the page belongs to
+        html: Raw page HTML
+
+    Returns:
+        str: SHA-256 of the page content
+    """
+    data = html.encode('utf-8')
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = archive_path(sha256)
+
+    # Identical pages are stored once
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    write_header = not os.path.exists(config.RESULTS_ARCHIVE_INDEX_FILE)
+    with open(config.RESULTS_ARCHIVE_INDEX_FILE, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(INDEX_FIELDS)
+        writer.writerow([pubchem_id, sha256, time.strftime('%Y-%m-%d %H:%M:%S'), len(data)])
+
+    return sha256
+
+
+def load_page(sha256):
+    """Return the archived HTML for a content hash"""
+    with gzip.open(archive_path(sha256), 'rb') as f:
+        return f.read().decode('utf-8')
+
+
+def load_index():
+    """Return the latest archived page hash for every PubChem ID"""
+    latest = {}
+    if os.path.exists(config.RESULTS_ARCHIVE_INDEX_FILE):
+        with open(config.RESULTS_ARCHIVE_INDEX_FILE, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                latest[row['PubChem_ID']] = row['SHA256']
+    return latest
+
+
+def _wrap_loose_cells(document):
+    """
+    Put cells that sit directly in a table (or its tbody/thead/tfoot) into a row
+
+    A browser opens the implied <tr> for such cells; libxml2 leaves them
+    loose, and they would be missed by the row walk.
+    """
+    for section in list(document.iter('table', 'tbody', 'thead', 'tfoot')):
+        row = None
+        for child in list(section):
+            if child.tag in ('td', 'th'):
+                if row is None:
+                    row = lxml.html.Element('tr')
+                    child.addprevious(row)
+                row.append(child)
+            elif isinstance(child.tag, str):
+                row = None
+
+
+def extract_table_rows(html):
+    """
+    Return all table rows of a results page as lists of cell texts
+
+    Same rows as document.querySelectorAll('table') -> table.querySelectorAll('tr')
+    -> row.querySelectorAll('td, th') in a browser: rows of a nested table
+    are returned once for every table that contains them, and a cell's text
+    includes the text of any table nested inside it. Parsed with lxml.
+    """
+    try:
+        document = lxml.html.document_fromstring(html)
+    except etree.ParserError:
+        return []  # Empty page
+    _wrap_loose_cells(document)
+    rows = []
+    for table in document.iter('table'):
+        for row in table.iter('tr'):
+            cells = [cell.text_content().strip() for cell in row.iter('td', 'th')]
+            if cells:
+                rows.append(cells)
+    return rows
+
+
+def extract_cytotoxicity_row(rows):
+    """
+    Return the Cytotoxicity prediction row of a results page, or None
+
+    Like the former in-browser extraction, the last row mentioning
+    Cytotoxicity counts, and it needs at least five cells (classification,
+    target, shorthand, prediction, probability).
+    """
+    matches = [row for row in rows if 'Cytotoxicity' in ' '.join(row)]
+    if matches and len(matches[-1]) >= 5:
+        return matches[-1]
+    return None
+
+
+def extract_acute_toxicity(html):
+    """Return the predicted LD50 (mg/kg) and toxicity class from a results page"""
+    text = re.sub(r'<[^>]+>', ' ', html)
+    ld50 = LD50_PATTERN.search(text)
+    tox_class = TOX_CLASS_PATTERN.search(text)
+    return {
+        'ld50_mg_kg': float(ld50.group(1)) if ld50 else None,
+        'toxicity_class': int(tox_class.group(1)) if tox_class else None,
+    }
+
+
+def reparse_page(task):
+    """Rebuild the output file of one archived page (runs in a worker process)"""
+    pubchem_id, sha256, output_dir, output_format, row_filter = task
+    try:
+        html = load_page(sha256)
+        rows = extract_table_rows(html)
+        if row_filter:
+            rows = [row for row in rows if row_filter in ' '.join(row)]
+
+        if output_format == 'json':
+            output_file = os.path.join(output_dir, f"CID_{pubchem_id}.json")
+            record = {'pubchem_id': pubchem_id, 'sha256': sha256, 'rows': rows}
+            record.update(extract_acute_toxicity(html))
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(record, f, indent=2)
+        else:
+            output_file = os.path.join(output_dir, f"CID_{pubchem_id}.csv")
+            with open(output_file, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows(rows)
+        return pubchem_id, True, output_file
+    except Exception as e:
+        return pubchem_id, False, str(e)
+
+
+def reparse(args):
+    """Rebuild outputs for archived pages in parallel"""
+    index = load_index()
+    ids = args.ids or sorted(index)
+    tasks = []
+    for pubchem_id in ids:
+        if pubchem_id not in index:
+            print(f"  ⚠ No archived page for PubChem_ID {pubchem_id}")
+            continue
+        tasks.append((pubchem_id, index[pubchem_id], args.output_dir, args.format, args.filter))
+
+    print("=" * 60)
+    print("Re-parsing Archived Results Pages")
+    print("=" * 60)
+    print(f"Pages: {len(tasks)}")
+    print(f"Format: {args.format}")
+    print(f"Row filter: {args.filter or 'none'}")
+    print(f"Output directory: {args.output_dir}")
+    print("")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    success_count = 0
+    with Pool(args.workers) as pool:
+        for pubchem_id, ok, detail in pool.imap_unordered(reparse_page, tasks, chunksize=16):
+            if ok:
+                success_count += 1
+            else:
+                print(f"  ✗ PubChem_ID {pubchem_id}: {detail}")
+
+    print("")
+    print(f"✓ Re-parsed {success_count}/{len(tasks)} pages")
+    print("=" * 60)
+
+
+def list_archive():
+    """Print archive statistics"""
+    index = load_index()
+    print(f"Archive directory: {config.RESULTS_ARCHIVE_DIR}")
+    print(f"Compounds with archived pages: {len(index)}")
+    print(f"Unique pages: {len(set(index.values()))}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Compressed raw results-page archive')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help='Show archive statistics')
+
+    reparse_parser = subparsers.add_parser('reparse', help='Rebuild CSV or JSON output from archived pages')
+    reparse_parser.add_argument('--ids', nargs='+', default=None,
+                                help='PubChem IDs to re-parse (default: all archived)')
+    reparse_parser.add_argument('--format', choices=['csv', 'json'], default='csv',
+                                help='Output format (default: csv)')
+    reparse_parser.add_argument('--filter', default=None,
+                                help='Keep only table rows containing this text (e.g. an endpoint name)')
+    reparse_parser.add_argument('--output-dir', default=os.path.join(config.RESULTS_DIR, 'reparsed'),
+                                help='Output directory (default: results/reparsed)')
+    reparse_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                                help='Number of worker processes (default: CPU count)')
+
+    args = parser.parse_args()
+
+    if args.command == 'reparse':
+        reparse(args)
+    else:
+        list_archive()
+
+
+if __name__ == "__main__":
+    main()
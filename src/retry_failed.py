@@ -73,21 +73,15 @@ def check_result_files(results_dir):
     return compounds_with_results
 
 def get_all_compounds(input_file):
-    """Get all compounds from input file"""
-    all_compounds = {}
-    
+    """Stream (PubChem_ID, Canonical_SMILES) pairs from the input file"""
     if not os.path.exists(input_file):
         print(f"Error: Input file not found: {input_file}")
-        return all_compounds
+        return
     
     with open(input_file, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         for row in reader:
-            pubchem_id = row['PubChem_ID']
-            canonical_smiles = row['Canonical_SMILES']
-            all_compounds[pubchem_id] = canonical_smiles
-    
-    return all_compounds
+            yield row['PubChem_ID'], row['Canonical_SMILES']
 
 def identify_failed_compounds():
     """Identify compounds that need to be retried"""
@@ -96,13 +90,6 @@ def identify_failed_compounds():
     print("=" * 70)
     print()
     
-    # Get all compounds
-    print(f"Reading input file: {config.CANONICAL_SMILES_FILE}")
-    all_compounds = get_all_compounds(config.CANONICAL_SMILES_FILE)
-    total_compounds = len(all_compounds)
-    print(f"  Total compounds in input: {total_compounds}")
-    print()
-    
     # Parse log file
     print(f"Analyzing log file: {config.PROCESSING_LOG_FILE}")
     failed_from_log, successful_from_log = parse_log_file(config.PROCESSING_LOG_FILE)
@@ -116,11 +103,16 @@ def identify_failed_compounds():
     print(f"  Compounds with result files: {len(compounds_with_results)}")
     print()
     
-    # Identify truly failed compounds
+    # Identify truly failed compounds while streaming the input file
     # Failed = (in input file) AND (no result file OR marked as failed in log)
+    # Only the SMILES of failed compounds are kept in memory
+    print(f"Reading input file: {config.CANONICAL_SMILES_FILE}")
     truly_failed = set()
+    failed_smiles = {}
+    total_compounds = 0
     
-    for pubchem_id in all_compounds.keys():
+    for pubchem_id, canonical_smiles in get_all_compounds(config.CANONICAL_SMILES_FILE):
+        total_compounds += 1
         has_result = pubchem_id in compounds_with_results
         marked_failed = pubchem_id in failed_from_log
         marked_success = pubchem_id in successful_from_log
@@ -128,8 +120,12 @@ def identify_failed_compounds():
         # Failed if: no result file, or marked as failed but not marked as success
         if not has_result or (marked_failed and not marked_success):
             truly_failed.add(pubchem_id)
+            failed_smiles[pubchem_id] = canonical_smiles
+    
+    print(f"  Total compounds in input: {total_compounds}")
+    print()
     
-    return truly_failed, all_compounds
+    return truly_failed, failed_smiles
 
 def save_failed_list(failed_compounds, all_compounds, output_file):
     """Save failed compounds to a CSV file"""
@@ -151,7 +147,7 @@ def main():
     args = parser.parse_args()
     
     # Identify failed compounds
-    failed_compounds, all_compounds = identify_failed_compounds()
+    failed_compounds, failed_smiles = identify_failed_compounds()
     
     if not failed_compounds:
         print("=" * 70)
@@ -181,7 +177,7 @@ def main():
     
     # Save failed compounds list
     failed_list_file = os.path.join(config.DATA_DIR, 'failed_compounds.csv')
-    save_failed_list(failed_compounds, all_compounds, failed_list_file)
+    save_failed_list(failed_compounds, failed_smiles, failed_list_file)
     print()
     
     # Offer to retry
@@ -210,7 +206,7 @@ def main():
         
         # Create a temporary input file with only failed compounds
         temp_input = os.path.join(config.DATA_DIR, 'temp_retry_input.csv')
-        save_failed_list(failed_compounds, all_compounds, temp_input)
+        save_failed_list(failed_compounds, failed_smiles, temp_input)
         
         # Run protox_full_automation.py with the failed compounds
         script_path = os.path.join(os.path.dirname(__file__), 'protox_full_automation.py')
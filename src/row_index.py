@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Byte-Offset Row Index for Large CSV Inputs
+Function: Select a range of rows, or the row of a PubChem ID, from a huge CSV
+without parsing everything before it
+
+The index is stored next to the CSV (<file>.idx) and rebuilt automatically
+when the CSV changes size or modification time. It holds the byte offset of
+every data row and, when all PubChem IDs are integers, the IDs in sorted order
+with their row numbers for binary search. Both the index and the CSV are
+memory-mapped, so opening a 10M-row file costs no parsing and reading rows
+N..M touches only those rows.
+
+Usage:
+    python3 row_index.py build [csv_file]
+    python3 row_index.py show [csv_file] [--start N] [--end M] [--id PUBCHEM_ID]
+
+Examples:
+    python3 row_index.py build                      # Index the canonical SMILES file
+    python3 row_index.py show --start 5000000 --end 5000010
+    python3 row_index.py show --id 2244
+"""
+
+import io
+import os
+import csv
+import sys
+import mmap
+import struct
+import bisect
+import argparse
+from array import array
+from pathlib import Path
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+
+INDEX_SUFFIX = '.idx'
+MAGIC = b'PTXROWS1'
+# magic, CSV size, CSV mtime_ns, data row count, has ID table, header length
+HEADER = struct.Struct('<8sQQQQQ')
+READ_CHUNK_ROWS = 10000  # Rows decoded per step when streaming a range
+
+
+def index_path(csv_file):
+    """Return the index file path for a CSV file"""
+    return csv_file + INDEX_SUFFIX
+
+
+def scan_row_offsets(csv_file):
+    """
+    Return (header_length, offsets) for a CSV file
+
+    A row ends at a newline outside quotes, so quoted fields containing line
+    breaks are handled like csv.reader does.
+    """
+    offsets = array('Q')
+    with open(csv_file, 'rb') as f:
+        header_length = 0
+        position = 0
+        row_start = 0
+        in_quotes = False
+        first = True
+        for line in f:
+            position += len(line)
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if in_quotes:
+                continue
+            if first:
+                header_length = position
+                first = False
+            elif line.strip():
+                offsets.append(row_start)
+            row_start = position
+    return header_length, offsets
+
+
+class RowIndex:
+    """Memory-mapped row offsets (and sorted PubChem IDs) of one CSV file"""
+
+    def __init__(self, csv_file):
+        self.csv_file = csv_file
+        self._csv_handle = open(csv_file, 'rb')
+        size = os.fstat(self._csv_handle.fileno()).st_size
+        self._csv_map = mmap.mmap(self._csv_handle.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.csv_size = size
+
+        self._index_handle = open(index_path(csv_file), 'rb')
+        self._index_map = mmap.mmap(self._index_handle.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, _, rows, has_ids, header_length = HEADER.unpack_from(self._index_map, 0)
+        self.row_count = rows
+
+        self._view = view = memoryview(self._index_map)[HEADER.size:]
+        self.offsets = view[:rows * 8].cast('Q')
+        if has_ids:
+            self.sorted_ids = view[rows * 8:rows * 16].cast('q')
+            self.id_rows = view[rows * 16:rows * 24].cast('Q')
+        else:
+            self.sorted_ids = None
+            self.id_rows = None
+
+        header = bytes(self._csv_map[:header_length]).decode('utf-8-sig')
+        self.fieldnames = next(csv.reader([header]), [])
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def is_current(csv_file):
+        """True if the index exists and matches the CSV's size and mtime"""
+        path = index_path(csv_file)
+        if not os.path.exists(path):
+            return False
+        stat = os.stat(csv_file)
+        with open(path, 'rb') as f:
+            data = f.read(HEADER.size)
+        if len(data) < HEADER.size:
+            return False
+        magic, size, mtime_ns, _, _, _ = HEADER.unpack(data)
+        return magic == MAGIC and size == stat.st_size and mtime_ns == stat.st_mtime_ns
+
+    @staticmethod
+    def build(csv_file):
+        """Scan the CSV once and write its index atomically"""
+        stat = os.stat(csv_file)
+        header_length, offsets = scan_row_offsets(csv_file)
+
+        # Sorted integer IDs with their row numbers, for lookups by PubChem ID
+        ids = array('q')
+        with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            try:
+                for row in reader:
+                    ids.append(int(row['PubChem_ID']))
+            except (KeyError, TypeError, ValueError):
+                ids = None
+        has_ids = ids is not None and len(ids) == len(offsets)
+        if has_ids:
+            order = sorted(range(len(ids)), key=ids.__getitem__)
+            sorted_ids = array('q', (ids[i] for i in order))
+            id_rows = array('Q', order)
+
+        temp_file = f"{index_path(csv_file)}.{os.getpid()}.tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, stat.st_size, stat.st_mtime_ns, len(offsets), int(has_ids), header_length))
+            offsets.tofile(f)
+            if has_ids:
+                sorted_ids.tofile(f)
+                id_rows.tofile(f)
+        os.replace(temp_file, index_path(csv_file))
+        return len(offsets)
+
+    @classmethod
+    def open(cls, csv_file):
+        """Open the index of a CSV file, building it first if missing or stale"""
+        if not cls.is_current(csv_file):
+            cls.build(csv_file)
+        return cls(csv_file)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return self.row_count
+
+    def _row_end(self, n):
+        """Byte offset where data row n ends"""
+        return self.offsets[n + 1] if n + 1 < self.row_count else self.csv_size
+
+    def iter_rows(self, start=0, end=None):
+        """Yield rows start..end-1 as dicts, decoding only that byte range"""
+        end = self.row_count if end is None else min(end, self.row_count)
+        for chunk_start in range(max(start, 0), end, READ_CHUNK_ROWS):
+            chunk_end = min(chunk_start + READ_CHUNK_ROWS, end)
+            data = bytes(self._csv_map[self.offsets[chunk_start]:self._row_end(chunk_end - 1)])
+            reader = csv.DictReader(io.StringIO(data.decode('utf-8'), newline=''), fieldnames=self.fieldnames)
+            yield from reader
+
+    def row(self, n):
+        """Return data row n as a dict"""
+        if not 0 <= n < self.row_count:
+            raise IndexError(n)
+        return next(self.iter_rows(n, n + 1))
+
+    def find(self, pubchem_id):
+        """Return the row number of a PubChem ID, or None if it is not in the file"""
+        if self.sorted_ids is not None:
+            try:
+                key = int(pubchem_id)
+            except ValueError:
+                return None
+            pos = bisect.bisect_left(self.sorted_ids, key)
+            if pos < self.row_count and self.sorted_ids[pos] == key:
+                return self.id_rows[pos]
+            return None
+        for n, row in enumerate(self.iter_rows()):
+            if row.get('PubChem_ID') == str(pubchem_id):
+                return n
+        return None
+
+    def close(self):
+        """Release the memory maps"""
+        self.offsets.release()
+        if self.sorted_ids is not None:
+            self.sorted_ids.release()
+            self.id_rows.release()
+        self._view.release()
+        self._index_map.close()
+        self._index_handle.close()
+        if self.csv_size:
+            self._csv_map.close()
+        self._csv_handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Byte-offset row index for large CSV inputs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Build (or rebuild) the index of a CSV file')
+    build_parser.add_argument('csv_file', nargs='?', default=config.CANONICAL_SMILES_FILE,
+                              help='CSV file (default: canonical SMILES file)')
+
+    show_parser = subparsers.add_parser('show', help='Print rows selected through the index')
+    show_parser.add_argument('csv_file', nargs='?', default=config.CANONICAL_SMILES_FILE,
+                             help='CSV file (default: canonical SMILES file)')
+    show_parser.add_argument('--start', type=int, default=0, help='First row (default: 0)')
+    show_parser.add_argument('--end', type=int, default=None, help='End row (default: start + 10)')
+    show_parser.add_argument('--id', default=None, help='Show the row of this PubChem ID')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv_file):
+        print(f"✗ File not found: {args.csv_file}")
+        return
+
+    if args.command == 'build':
+        rows = RowIndex.build(args.csv_file)
+        print(f"✓ Indexed {rows} rows: {index_path(args.csv_file)}")
+        return
+
+    with RowIndex.open(args.csv_file) as index:
+        if args.id is not None:
+            n = index.find(args.id)
+            if n is None:
+                print(f"✗ PubChem_ID {args.id} not found")
+                return
+            print(f"Row {n}: {index.row(n)}")
+            return
+        end = args.end if args.end is not None else args.start + 10
+        for n, row in enumerate(index.iter_rows(args.start, end), start=args.start):
+            print(f"Row {n}: {row}")
+
+
+if __name__ == "__main__":
+    main()
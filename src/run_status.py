@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Live Run Status
+Function: Publish throughput and ETA of a running prediction job as a JSON status
+file and a small local HTTP endpoint
+
+protox_full_automation.py and pipeline.py keep a RunStatus up to date. It
+reports completed, failed and in-flight counts, the state of every worker, a
+rolling compounds/hour rate and an ETA computed from measured per-compound
+durations (seeded from DURATION_HISTORY_FILE, then updated as the run goes).
+
+While a run is active the status is available at
+http://127.0.0.1:<RUN_STATUS_PORT>/status and in RUN_STATUS_FILE. Shard
+processes (protox_full_automation.py --input .../shard_<N>.csv) each write
+their own file, run_status.shard_<N>.json next to RUN_STATUS_FILE; this
+script shows all of them.
+
+Usage:
+    python3 run_status.py [--watch SECONDS]
+    python3 run_status.py estimate <compound_count>
+
+Examples:
+    python3 run_status.py                # Print the current status once
+    python3 run_status.py --watch 60     # Refresh every minute
+    python3 run_status.py estimate 500   # Expected hours for 500 compounds
+"""
+
+import os
+import csv
+import sys
+import glob
+import json
+import time
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+
+# Measured durations kept for the ETA (most recent first to go)
+DURATION_SAMPLES = 200
+# Minimum seconds between status file writes
+WRITE_INTERVAL = 5
+
+
+def load_recent_durations(limit=DURATION_SAMPLES, history_file=None):
+    """Return the most recent successful prediction durations (seconds)"""
+    history_file = history_file or config.DURATION_HISTORY_FILE
+    durations = deque(maxlen=limit)
+    if os.path.exists(history_file):
+        with open(history_file, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if row.get('Outcome') == 'success':
+                    try:
+                        durations.append(float(row['Seconds']))
+                    except (KeyError, ValueError):
+                        continue
+    return durations
+
+
+def status_file_for(shard=None):
+    """Status file of a run: RUN_STATUS_FILE, or a per-shard file for shard processes"""
+    if shard is None:
+        return config.RUN_STATUS_FILE
+    base, ext = os.path.splitext(config.RUN_STATUS_FILE)
+    return f"{base}.shard_{shard}{ext}"
+
+
+def status_files():
+    """Existing status files: the main run first, then every shard"""
+    base, ext = os.path.splitext(config.RUN_STATUS_FILE)
+    shards = {}
+    for path in glob.glob(f"{glob.escape(base)}.shard_*{ext}"):
+        shard = path[len(base) + len('.shard_'):len(path) - len(ext)]
+        if shard.isdigit():
+            shards[int(shard)] = path
+    main_file = [config.RUN_STATUS_FILE] if os.path.exists(config.RUN_STATUS_FILE) else []
+    return main_file + [shards[shard] for shard in sorted(shards)]
+
+
+class RunStatus:
+    """Thread-safe progress counters of one run, published as JSON"""
+
+    def __init__(self, total=None, workers=1, status_file=None):
+        self.total = total
+        self.workers = workers
+        self.status_file = status_file or config.RUN_STATUS_FILE
+        self.started_at = time.time()
+
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.worker_states = {}
+        self.completion_times = deque()
+        self.durations = load_recent_durations()
+        self.extra = {}  # Additional stats published by the caller
+
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.last_write = 0.0
+        self.server = None
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def add_total(self, n=1):
+        """Add compounds to the expected total (for inputs read as they stream in)"""
+        with self.lock:
+            self.total = (self.total or 0) + n
+
+    def worker_state(self, worker_id, state, pubchem_id=None):
+        """Record what a worker is doing ('starting', 'idle', 'predicting', 'stopped')"""
+        with self.lock:
+            self.worker_states[str(worker_id)] = {
+                'state': state,
+                'compound': pubchem_id,
+                'since': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'since_epoch': time.time(),
+            }
+        self.write()
+
+    def start_compound(self, worker_id, pubchem_id):
+        """A worker started predicting a compound"""
+        self.worker_state(worker_id, 'predicting', pubchem_id)
+
+    def finish_compound(self, worker_id, pubchem_id, success, seconds=None):
+        """
+        A compound finished (seconds is the measured duration)
+
+        worker_id is None when the outcome is only known after the worker
+        moved on (the report writer decided it); the worker state is left alone.
+        """
+        now = time.time()
+        with self.lock:
+            if success:
+                self.completed += 1
+                self.completion_times.append(now)
+                if seconds is not None:
+                    self.durations.append(seconds)
+            else:
+                self.failed += 1
+        if worker_id is None:
+            self.write()
+        else:
+            self.worker_state(worker_id, 'idle')
+
+    def skip(self, n=1):
+        """Compounds that needed no prediction (already done or reused)"""
+        with self.lock:
+            self.skipped += n
+        self.write()
+
+    def set_stat(self, name, value):
+        """Publish an additional value (e.g. a queue depth) with the status"""
+        with self.lock:
+            self.extra[name] = value
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def snapshot(self):
+        """Return the current status as a dict"""
+        now = time.time()
+        with self.lock:
+            window_start = now - config.RUN_STATUS_RATE_WINDOW
+            while self.completion_times and self.completion_times[0] < window_start:
+                self.completion_times.popleft()
+            window = min(config.RUN_STATUS_RATE_WINDOW, max(now - self.started_at, 1))
+            rolling_rate = len(self.completion_times) * 3600 / window
+
+            in_flight = sum(1 for w in self.worker_states.values() if w['state'] == 'predicting')
+            active_workers = sum(1 for w in self.worker_states.values() if w['state'] != 'stopped') or self.workers
+            mean_duration = sum(self.durations) / len(self.durations) if self.durations else None
+
+            remaining = None
+            eta_seconds = None
+            if self.total is not None:
+                remaining = max(self.total - self.completed - self.failed - self.skipped, 0)
+                if mean_duration is not None:
+                    eta_seconds = remaining * mean_duration / active_workers
+
+            workers = {}
+            for worker_id, w in self.worker_states.items():
+                workers[worker_id] = {
+                    'state': w['state'],
+                    'compound': w['compound'],
+                    'since': w['since'],
+                    'elapsed_seconds': round(now - w['since_epoch'], 1),
+                }
+
+            status = {
+                'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at)),
+                'updated_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now)),
+                'elapsed_seconds': round(now - self.started_at, 1),
+                'total': self.total,
+                'completed': self.completed,
+                'failed': self.failed,
+                'skipped': self.skipped,
+                'in_flight': in_flight,
+                'remaining': remaining,
+                'rolling_rate_per_hour': round(rolling_rate, 2),
+                'rate_window_seconds': config.RUN_STATUS_RATE_WINDOW,
+                'mean_seconds_per_compound': round(mean_duration, 1) if mean_duration is not None else None,
+                'eta_seconds': round(eta_seconds) if eta_seconds is not None else None,
+                'eta': (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now + eta_seconds))
+                        if eta_seconds is not None else None),
+                'workers': workers,
+            }
+            status.update(self.extra)
+        return status
+
+    def write(self, force=False):
+        """Atomically write the status file (at most every WRITE_INTERVAL seconds)"""
+        # Periodic writes never wait for one in progress; the final write does
+        if not self.write_lock.acquire(blocking=force):
+            return
+        try:
+            now = time.time()
+            if not force and now - self.last_write < WRITE_INTERVAL:
+                return
+            self.last_write = now
+            temp_file = f"{self.status_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(temp_file, self.status_file)
+        except OSError:
+            pass  # Status reporting must never stop a run
+        finally:
+            self.write_lock.release()
+
+    # ------------------------------------------------------------------
+    # HTTP endpoint
+    # ------------------------------------------------------------------
+
+    def serve(self, port=None):
+        """
+        Serve the status as JSON on 127.0.0.1 in a background thread
+
+        Returns:
+            str: URL of the status endpoint, or None if it could not be started
+        """
+        port = config.RUN_STATUS_PORT if port is None else port
+        if not port:
+            return None
+
+        status = self
+
+        class StatusHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/status'):
+                    self.send_error(404)
+                    return
+                body = json.dumps(status.snapshot(), indent=2).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep the console for the run log
+
+        try:
+            self.server = ThreadingHTTPServer(('127.0.0.1', port), StatusHandler)
+        except OSError:
+            return None
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name='status-http', daemon=True).start()
+        return f"http://127.0.0.1:{port}/status"
+
+    def close(self):
+        """Write the final status and stop the HTTP endpoint"""
+        self.write(force=True)
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def format_duration(seconds):
+    """Format seconds as e.g. '2d 03h 15m'"""
+    if seconds is None:
+        return 'unknown'
+    minutes, _ = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours:02d}h {minutes:02d}m" if days else f"{hours}h {minutes:02d}m"
+
+
+def print_status(status):
+    """Print a status dict in human-readable form"""
+    print("=" * 60)
+    print(f"Run status (updated {status['updated_at']})")
+    print("=" * 60)
+    print(f"  Total: {status['total'] if status['total'] is not None else 'unknown'}")
+    print(f"  Completed: {status['completed']}")
+    print(f"  Failed: {status['failed']}")
+    print(f"  Skipped: {status['skipped']}")
+    print(f"  In flight: {status['in_flight']}")
+    print(f"  Rate: {status['rolling_rate_per_hour']:.2f} compounds/hour "
+          f"(last {status['rate_window_seconds'] // 60} minutes)")
+    if status['mean_seconds_per_compound'] is not None:
+        print(f"  Mean time per compound: {status['mean_seconds_per_compound'] / 60:.1f} minutes")
+    print(f"  ETA: {format_duration(status['eta_seconds'])}"
+          + (f" ({status['eta']})" if status['eta'] else ""))
+    for worker_id, worker in sorted(status['workers'].items()):
+        compound = f" compound {worker['compound']}" if worker['compound'] else ""
+        print(f"  Worker {worker_id}: {worker['state']}{compound} for {format_duration(worker['elapsed_seconds'])}")
+    print("=" * 60)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Show the live status of a prediction run')
+    parser.add_argument('--watch', type=int, default=None, metavar='SECONDS',
+                        help='Refresh the status every SECONDS')
+    subparsers = parser.add_subparsers(dest='command')
+    estimate_parser = subparsers.add_parser('estimate', help='Estimate run time from measured durations')
+    estimate_parser.add_argument('count', type=int, help='Number of compounds')
+    estimate_parser.add_argument('-w', '--workers', type=int, default=config.PIPELINE_WORKERS,
+                                 help='Number of prediction workers (default: from config.py)')
+    args = parser.parse_args()
+
+    if args.command == 'estimate':
+        durations = load_recent_durations()
+        if not durations:
+            print("No measured durations yet")
+            return
+        mean_duration = sum(durations) / len(durations)
+        hours = args.count * mean_duration / max(args.workers, 1) / 3600
+        print(f"{hours:.1f} hours ({mean_duration / 60:.1f} minutes per compound, "
+              f"{len(durations)} measured runs, {args.workers} worker(s))")
+        return
+
+    while True:
+        files = status_files()
+        if not files:
+            print(f"✗ No status file found: {config.RUN_STATUS_FILE}")
+            return
+        for status_file in files:
+            if len(files) > 1:
+                print(f"[{os.path.basename(status_file)}]")
+            try:
+                with open(status_file, 'r', encoding='utf-8') as f:
+                    print_status(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"✗ Cannot read {status_file}: {e}")
+        if not args.watch:
+            return
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
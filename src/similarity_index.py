@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Local Fingerprint Similarity Index over Predicted Compounds
+Function: Give instant provisional cytotoxicity calls for new compounds from their
+nearest already-predicted neighbours
+
+The index holds Morgan fingerprints (radius 2, 2048 bits) of every compound
+with a CID_*.csv result, packed into a NumPy bit array, together with its
+Cytotoxicity prediction. Queries compute Tanimoto similarity against the whole
+index with vectorized bit operations.
+
+Usage:
+    python3 similarity_index.py build [--smiles-file FILE ...]
+    python3 similarity_index.py query <SMILES> [-k 5]
+    python3 similarity_index.py triage <input_csv> [-o output_csv] [-k 5]
+
+Examples:
+    python3 similarity_index.py build
+    python3 similarity_index.py query "CC(=O)OC1=CC=CC=C1C(=O)O"
+    python3 similarity_index.py triage data/canonical_smiles.csv -o data/triage.csv
+"""
+
+import os
+import sys
+import csv
+import argparse
+from pathlib import Path
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import rdFingerprintGenerator
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import config
+from extract_cytotoxicity import find_cytotoxicity_row
+
+FINGERPRINT_RADIUS = 2
+FINGERPRINT_BITS = 2048
+QUERY_CHUNK_ROWS = 200000  # Index rows compared per vectorized step
+
+# Number of set bits for every byte value
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint16)
+
+_generator = rdFingerprintGenerator.GetMorganGenerator(radius=FINGERPRINT_RADIUS, fpSize=FINGERPRINT_BITS)
+
+
+def fingerprint(smiles):
+    """Return the packed Morgan fingerprint (uint8 array) of a SMILES, or None"""
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        return None
+    return np.packbits(_generator.GetFingerprintAsNumPy(mol).astype(np.uint8))
+
+
+class SimilarityIndex:
+    """Packed fingerprints of predicted compounds with their cytotoxicity calls"""
+
+    def __init__(self, ids, fingerprints, predictions, probabilities):
+        self.ids = ids
+        self.fingerprints = fingerprints
+        self.predictions = predictions
+        self.probabilities = probabilities
+        self.bit_counts = POPCOUNT[fingerprints].sum(axis=1)
+
+    @classmethod
+    def load(cls, index_file=None):
+        """Load the index from disk"""
+        data = np.load(index_file or config.SIMILARITY_INDEX_FILE)
+        return cls(data['ids'], data['fingerprints'], data['predictions'], data['probabilities'])
+
+    def save(self, index_file=None):
+        """Save the index to disk"""
+        np.savez_compressed(
+            index_file or config.SIMILARITY_INDEX_FILE,
+            ids=self.ids,
+            fingerprints=self.fingerprints,
+            predictions=self.predictions,
+            probabilities=self.probabilities,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def tanimoto(self, query):
+        """Tanimoto similarity of a packed fingerprint to every indexed compound"""
+        query_bits = POPCOUNT[query].sum()
+        similarities = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), QUERY_CHUNK_ROWS):
+            end = start + QUERY_CHUNK_ROWS
+            common = POPCOUNT[self.fingerprints[start:end] & query].sum(axis=1)
+            union = self.bit_counts[start:end] + query_bits - common
+            similarities[start:end] = np.where(union > 0, common / np.maximum(union, 1), 0.0)
+        return similarities
+
+    def nearest(self, smiles, k=5):
+        """
+        Return the k most similar predicted compounds
+
+        Returns:
+            list: Tuples of (PubChem_ID, similarity, prediction, probability),
+                  most similar first (empty if the SMILES is invalid)
+        """
+        query = fingerprint(smiles)
+        if query is None or len(self) == 0:
+            return []
+        similarities = self.tanimoto(query)
+        k = min(k, len(self))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(str(self.ids[i]), float(similarities[i]), str(self.predictions[i]),
+                 float(self.probabilities[i])) for i in top]
+
+
+def provisional_call(neighbours):
+    """Similarity-weighted Active/Inactive vote over the nearest neighbours"""
+    votes = {}
+    for _, similarity, prediction, _ in neighbours:
+        votes[prediction] = votes.get(prediction, 0.0) + similarity
+    if not votes:
+        return '', 0.0
+    call = max(votes, key=votes.get)
+    return call, votes[call] / sum(votes.values())
+
+
+def build_index(args):
+    """Build the index from CID_*.csv results and canonical SMILES files"""
+    print("=" * 60)
+    print("Building Similarity Index")
+    print("=" * 60)
+
+    result_ids = set()
+    if os.path.exists(config.RESULTS_DIR):
+        for filename in os.listdir(config.RESULTS_DIR):
+            if filename.startswith('CID_') and filename.endswith('.csv'):
+                result_ids.add(filename[4:-4])
+    print(f"Result files: {len(result_ids)}")
+
+    ids, fingerprints, predictions, probabilities = [], [], [], []
+    seen = set()
+    for smiles_file in args.smiles_file:
+        if not os.path.exists(smiles_file):
+            print(f"  ⚠ SMILES file not found: {smiles_file}")
+            continue
+        with open(smiles_file, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                pubchem_id = row['PubChem_ID']
+                if pubchem_id not in result_ids or pubchem_id in seen:
+                    continue
+                cyto_row = find_cytotoxicity_row(os.path.join(config.RESULTS_DIR, f"CID_{pubchem_id}.csv"))
+                fp = fingerprint(row['Canonical_SMILES'])
+                if not cyto_row or len(cyto_row) < 5 or fp is None:
+                    continue
+                try:
+                    probability = float(cyto_row[4])
+                except ValueError:
+                    probability = np.nan
+                seen.add(pubchem_id)
+                ids.append(pubchem_id)
+                fingerprints.append(fp)
+                predictions.append(cyto_row[3])
+                probabilities.append(probability)
+
+    if not ids:
+        print("✗ No predicted compounds with SMILES found, index not written")
+        return
+
+    index = SimilarityIndex(
+        np.array(ids),
+        np.vstack(fingerprints),
+        np.array(predictions),
+        np.array(probabilities, dtype=np.float32),
+    )
+    index.save(args.index)
+    print(f"✓ Indexed {len(index)} compounds: {args.index}")
+    print("=" * 60)
+
+
+def query_index(args):
+    """Print the nearest predicted neighbours of one SMILES"""
+    index = SimilarityIndex.load(args.index)
+    neighbours = index.nearest(args.smiles, args.k)
+    if not neighbours:
+        print("✗ Invalid SMILES or empty index")
+        return
+
+    print(f"{'PubChem_ID':>12}  {'Tanimoto':>8}  {'Prediction':<10}  Probability")
+    for pubchem_id, similarity, prediction, probability in neighbours:
+        print(f"{pubchem_id:>12}  {similarity:8.3f}  {prediction:<10}  {probability:.2f}")
+    call, confidence = provisional_call(neighbours)
+    print("")
+    print(f"Provisional Cytotoxicity call: {call} (vote share {confidence:.2f})")
+
+
+def triage(args):
+    """Write provisional calls for a compound list, least-covered compounds first"""
+    index = SimilarityIndex.load(args.index)
+    rows = []
+    with open(args.input, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            neighbours = index.nearest(row['Canonical_SMILES'], args.k)
+            call, confidence = provisional_call(neighbours)
+            rows.append({
+                'PubChem_ID': row['PubChem_ID'],
+                'Canonical_SMILES': row['Canonical_SMILES'],
+                'Nearest_PubChem_ID': neighbours[0][0] if neighbours else '',
+                'Max_Similarity': f"{neighbours[0][1]:.3f}" if neighbours else '0.000',
+                'Provisional_Call': call,
+                'Call_Confidence': f"{confidence:.2f}",
+            })
+
+    # Compounds unlike anything predicted so far gain the most from submission
+    rows.sort(key=lambda r: float(r['Max_Similarity']))
+    for priority, row in enumerate(rows, 1):
+        row['Priority'] = priority
+
+    with open(args.output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['Priority', 'PubChem_ID', 'Canonical_SMILES', 'Nearest_PubChem_ID',
+                                               'Max_Similarity', 'Provisional_Call', 'Call_Confidence'])
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"✓ Triage of {len(rows)} compounds saved to: {args.output}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Fingerprint similarity index over predicted compounds')
+    parser.add_argument('--index', default=config.SIMILARITY_INDEX_FILE,
+                        help='Index file (default: from config.py)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Build the index from stored results')
+    build_parser.add_argument('--smiles-file', action='append', default=None,
+                              help='Canonical SMILES file(s) with PubChem_ID and Canonical_SMILES '
+                                   '(default: from config.py; repeat for several files)')
+
+    query_parser = subparsers.add_parser('query', help='Show nearest predicted neighbours of a SMILES')
+    query_parser.add_argument('smiles', help='Query SMILES')
+    query_parser.add_argument('-k', type=int, default=5, help='Number of neighbours (default: 5)')
+
+    triage_parser = subparsers.add_parser('triage', help='Provisional calls and priorities for a compound list')
+    triage_parser.add_argument('input', help='CSV file with PubChem_ID and Canonical_SMILES')
+    triage_parser.add_argument('-o', '--output', default=os.path.join(config.DATA_DIR, 'triage.csv'),
+                               help='Output CSV file (default: data/triage.csv)')
+    triage_parser.add_argument('-k', type=int, default=5, help='Number of neighbours (default: 5)')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        args.smiles_file = args.smiles_file or [config.CANONICAL_SMILES_FILE]
+        build_index(args)
+    elif args.command == 'query':
+        query_index(args)
+    else:
+        triage(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""Shared pytest setup: make src/ modules and config importable"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'src'))
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: long-running test (deselect with -m "not slow")')
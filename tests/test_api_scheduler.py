@@ -0,0 +1,30 @@
+"""Tests for the multi-day API scheduler"""
+
+import argparse
+
+import pytest
+
+pytest.importorskip('requests')
+
+import config
+from api_scheduler import QUEUE_FIELDS, save_queue, show_status
+
+
+def status_output(tmp_path, monkeypatch, capsys, daily_limit, pending):
+    monkeypatch.setattr(config, 'API_QUOTA_LEDGER_FILE', str(tmp_path / 'ledger.json'))
+    monkeypatch.setattr(config, 'API_MAX_QUERIES_PER_DAY', daily_limit)
+    queue_file = str(tmp_path / 'queue.csv')
+    save_queue([dict(zip(QUEUE_FIELDS, [f"C{i}", 'smiles', 'normal', 'pending', '0'])) for i in range(pending)],
+               queue_file)
+    show_status(argparse.Namespace(queue=queue_file, batch_size=1))
+    return capsys.readouterr().out
+
+
+def test_status_projects_days_from_the_daily_limit(tmp_path, monkeypatch, capsys):
+    assert "in 2 more day(s)" in status_output(tmp_path, monkeypatch, capsys, 10, 25)
+
+
+def test_status_with_zero_daily_limit_has_no_projection(tmp_path, monkeypatch, capsys):
+    out = status_output(tmp_path, monkeypatch, capsys, 0, 3)
+    assert "no completion date can be projected" in out
+    assert "today" in status_output(tmp_path, monkeypatch, capsys, 0, 0)
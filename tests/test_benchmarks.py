@@ -0,0 +1,34 @@
+"""Quick-scale run of the data-processing benchmarks (see benchmarks/run_benchmarks.py)"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+SCRIPT = ROOT / 'benchmarks' / 'run_benchmarks.py'
+BASELINE = ROOT / 'benchmarks' / 'baseline.json'
+
+
+def run_benchmarks(*args):
+    return subprocess.run([sys.executable, str(SCRIPT), '--scale', 'quick', *args],
+                          capture_output=True, text=True)
+
+
+@pytest.mark.slow
+def test_quick_benchmarks(tmp_path):
+    """Compare against the recorded quick baseline, or check every benchmark runs if there is none"""
+    if BASELINE.exists() and '"quick"' in BASELINE.read_text():
+        completed = run_benchmarks()
+    else:
+        completed = run_benchmarks('--update-baseline', '--baseline', str(tmp_path / 'baseline.json'))
+    assert completed.returncode == 0, completed.stdout + completed.stderr
+
+
+@pytest.mark.slow
+def test_comparison_without_baseline_fails(tmp_path):
+    completed = run_benchmarks('--only', 'log_parse', '--baseline', str(tmp_path / 'baseline.json'))
+    assert completed.returncode == 1
+    assert 'No benchmark was compared' in completed.stdout
+    assert 'within tolerance' not in completed.stdout
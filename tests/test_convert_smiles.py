@@ -0,0 +1,21 @@
+"""Tests for SMILES conversion and pre-screening"""
+
+import pytest
+
+pytest.importorskip('rdkit')
+
+from convert_smiles import convert_compound
+
+
+def test_salt_passes_the_screen_with_or_without_standardization():
+    row = {'PubChem_ID': '517044', 'SMILES': 'CC(=O)[O-].[Na+]'}
+    assert convert_compound((row, False))['status'] == 'converted'
+
+    outcome = convert_compound((row, True))
+    assert outcome['status'] == 'converted'
+    assert outcome['Canonical_SMILES'] == 'CC(=O)O'
+    assert outcome['InChIKey']
+
+
+def test_empty_smiles():
+    assert convert_compound(({'PubChem_ID': '1', 'SMILES': ''}, True))['status'] == 'empty'
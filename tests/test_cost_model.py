@@ -0,0 +1,45 @@
+"""Tests for the duration history and the adaptive timeout model"""
+
+import csv
+
+import pytest
+
+pytest.importorskip('rdkit')
+
+import config
+import cost_model
+from cost_model import HISTORY_FIELDS, TimeoutModel, censored_quantile, load_history, record_duration
+
+
+def test_old_history_header_is_migrated(tmp_path):
+    history_file = tmp_path / 'prediction_durations.csv'
+    with open(history_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HISTORY_FIELDS[:5])
+        writer.writerow(['2026-01-01 00:00:00', '1', 'CCO', '120.0', 'success'])
+        writer.writerow(['2026-01-01 00:05:00', '2', 'CCC', '900.0', 'timeout', '900'])
+
+    record_duration('3', 'CCN', 60.0, 'success', 600, history_file=str(history_file))
+
+    rows = load_history(str(history_file))
+    assert list(rows[0]) == HISTORY_FIELDS
+    assert [(row['PubChem_ID'], row['Timeout']) for row in rows] == [('1', ''), ('2', '900'), ('3', '600')]
+
+
+def test_censored_quantile():
+    completed = [(float(seconds), False) for seconds in range(1, 21)]
+    assert censored_quantile(completed, 0.5) == 11.0
+    # Half the runs timed out after the last completion: the median is unknown
+    assert censored_quantile(completed + [(25.0, True)] * 21, 0.5) is None
+    # Timeouts above the completions push the quantile up
+    assert censored_quantile(completed[:10] + [(10.0, True)] * 10 + [(30.0, False)], 0.5) == 30.0
+
+
+def test_timeouts_lengthen_the_ceiling(monkeypatch):
+    monkeypatch.setattr(cost_model, 'molecule_descriptors', lambda smiles: (len(smiles), 0))
+    monkeypatch.setattr(config, 'ADAPTIVE_TIMEOUT_MIN_SAMPLES', 5)
+    successes = [{'Canonical_SMILES': 'CCCCCC', 'Seconds': '300', 'Outcome': 'success'}] * 10
+    timeouts = [{'Canonical_SMILES': 'CCCCCC', 'Seconds': '600', 'Outcome': 'timeout'}] * 10
+
+    assert TimeoutModel(successes).timeout_for('CCCCCC') == int(300 * config.ADAPTIVE_TIMEOUT_MARGIN)
+    assert TimeoutModel(successes + timeouts).timeout_for('CCCCCC') == config.ADAPTIVE_TIMEOUT_CAP
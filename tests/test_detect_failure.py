@@ -0,0 +1,25 @@
+"""Tests for early failure detection on results pages"""
+
+import pytest
+
+pytest.importorskip('selenium')
+pytest.importorskip('rdkit')
+
+from protox_full_automation import detect_failure, visible_text
+
+
+def test_markup_and_scripts_do_not_match():
+    page = ('<html><head><script>if (x) alert("Invalid SMILES");</script>'
+            '<style>.maintenance-mode {}</style></head>'
+            '<body><!-- internal server error --><div class="bad-gateway">Please wait</div></body></html>')
+    assert detect_failure(visible_text(page)) is None
+
+
+def test_visible_message_matches():
+    page = '<body><p>The input is <b>not&nbsp;a valid\n SMILES</b>.</p></body>'
+    assert detect_failure(visible_text(page)) == 'invalid_smiles'
+    assert detect_failure('502 Bad Gateway') == 'server_error'
+
+
+def test_generic_phrases_are_not_failures():
+    assert detect_failure('Fatal error rates could not parse temporarily unavailable') is None
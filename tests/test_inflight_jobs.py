@@ -0,0 +1,98 @@
+"""Tests for the in-flight prediction job store"""
+
+import time
+
+import pytest
+
+import config
+import inflight_jobs
+from inflight_jobs import expired, get_job, is_job_url, load_jobs, remove_job, save_job
+
+
+@pytest.fixture(autouse=True)
+def job_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'INFLIGHT_JOBS_FILE', str(tmp_path / 'inflight_jobs.json'))
+
+
+def test_save_get_remove_job():
+    cookies = [{'name': 'PHPSESSID', 'value': 'abc'}]
+    save_job(2244, 'CC(=O)Oc1ccccc1C(=O)O', 'https://example.org/job', cookies, time.time(), 600)
+    job = get_job('2244')
+    assert job['url'] == 'https://example.org/job'
+    assert job['cookies'] == cookies
+    assert not expired(job)
+
+    remove_job(2244)
+    assert get_job(2244) is None
+    assert load_jobs() == {}
+
+
+def test_expired_job_is_kept_for_one_check():
+    save_job(1, 'C', 'https://example.org/job', [], time.time() - 1000, 600)
+    job = get_job(1)
+    assert job is not None and expired(job)
+    assert '1' in load_jobs()
+
+
+def test_is_job_url_excludes_input_page_in_either_scheme():
+    input_url = config.PROTOX_INPUT_URL
+    assert not is_job_url(input_url)
+    assert not is_job_url(input_url.replace('http://', 'https://', 1))
+    assert not is_job_url(config.PROTOX_BASE_URL + '/')
+    assert not is_job_url('about:blank')
+    assert not is_job_url('https://other.example.org/protox3/index.php?site=compound_search_similarity')
+    assert is_job_url(config.PROTOX_RESULTS_URL)
+    assert is_job_url(config.PROTOX_RESULTS_URL.replace('http://', 'https://', 1) + '&id=42')
+
+
+def test_poll_job_http_checks_an_expired_job_once(monkeypatch):
+    requests = pytest.importorskip('requests')
+    pytest.importorskip('selenium')  # poll_job_http uses detect_failure from protox_full_automation
+    calls = []
+
+    class Response:
+        text = '<html>Toxicity Model Report</html>'
+
+    def fake_get(self, url, timeout=None):
+        calls.append(url)
+        return Response()
+
+    monkeypatch.setattr(requests.Session, 'get', fake_get)
+    job = {'url': 'https://example.org/job', 'cookies': [], 'submitted_at': time.time() - 1000, 'max_wait': 600}
+    assert inflight_jobs.poll_job_http(job, log=lambda message: None) == Response.text
+    assert calls == ['https://example.org/job']
+
+
+def test_resume_continues_after_a_rejected_job(monkeypatch):
+    pytest.importorskip('selenium')
+    import protox_full_automation
+    from protox_full_automation import PredictionRejected
+
+    save_job(1, 'ONN', 'https://example.org/job1', [], time.time(), 600)
+    save_job(2, 'CCO', 'https://example.org/job2', [], time.time(), 600)
+    messages, succeeded = [], []
+
+    class Driver:
+        def quit(self):
+            pass
+
+    class Writer:
+        def shutdown(self):
+            pass
+
+    def reattach(driver, job):
+        if job['pubchem_id'] == '1':
+            raise PredictionRejected('invalid_smiles')
+        remove_job(job['pubchem_id'])
+        return True
+
+    monkeypatch.setattr(protox_full_automation, 'log_message', messages.append)
+    monkeypatch.setattr(protox_full_automation, 'log_success', succeeded.append)
+    monkeypatch.setattr(protox_full_automation, 'create_driver', lambda *args, **kwargs: Driver())
+    monkeypatch.setattr(protox_full_automation, 'reattach_compound', reattach)
+    monkeypatch.setattr(protox_full_automation, 'get_result_writer', lambda: Writer())
+
+    inflight_jobs.resume_jobs(use_http=False)
+    assert '✗ Compound 1 processing failed: invalid_smiles (not retried)' in messages
+    assert succeeded == ['2']
+    assert load_jobs() == {}
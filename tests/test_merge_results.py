@@ -0,0 +1,44 @@
+"""Tests for merging result sets from several machines"""
+
+import csv
+import os
+
+from merge_results import find_conflicts, merge_results, source_labels
+
+
+def write_report(results_dir, pubchem_id, prediction):
+    os.makedirs(results_dir, exist_ok=True)
+    with open(os.path.join(results_dir, f"CID_{pubchem_id}.csv"), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Toxicity end points', 'Cytotoxicity', 'cyto', prediction, '0.70'])
+        writer.writerow(['Organ toxicity', 'Hepatotoxicity', 'dili', 'Inactive', '0.55'])
+
+
+def test_source_labels_use_parent_of_results_and_number_collisions():
+    assert source_labels(['hostA/results', 'hostB/results/']) == ['hostA', 'hostB']
+    assert source_labels(['a/run', 'b/run', 'hostC']) == ['run#1', 'run#2', 'hostC']
+
+
+def test_find_conflicts_keys_values_by_source():
+    candidates = [
+        {'source': 0, 'label': 'run#1', 'predictions': {'cyto': 'Active'}},
+        {'source': 1, 'label': 'run#2', 'predictions': {'cyto': 'Inactive'}},
+    ]
+    assert find_conflicts(7, candidates, candidates[0]) == [[7, 'cyto', 'run#1', 'Active', 'run#2=Inactive']]
+
+
+def test_merge_reports_conflicts_between_results_directories(tmp_path):
+    write_report(tmp_path / 'hostA' / 'results', 1, 'Active')
+    write_report(tmp_path / 'hostB' / 'results', 1, 'Inactive')
+    write_report(tmp_path / 'hostB' / 'results', 2, 'Inactive')
+    output = tmp_path / 'merged'
+
+    assert merge_results([str(tmp_path / 'hostA' / 'results'), str(tmp_path / 'hostB' / 'results')], str(output))
+
+    assert sorted(os.listdir(output / 'results'))[:2] == ['CID_1.csv', 'CID_2.csv']
+    with open(output / 'merge_conflicts.csv', encoding='utf-8') as f:
+        rows = list(csv.reader(f))[1:]
+    assert len(rows) == 1
+    pubchem_id, shorthand, chosen, _, others = rows[0]
+    assert (pubchem_id, shorthand) == ('1', 'cyto')
+    assert {chosen, others.split('=')[0]} == {'hostA', 'hostB'}
@@ -0,0 +1,76 @@
+"""Tests for the prediction daemon job handling (no browser is started)"""
+
+import threading
+
+import pytest
+
+pytest.importorskip('selenium')
+pytest.importorskip('rdkit')
+
+import config
+import prediction_daemon
+from prediction_daemon import Job, PredictionService
+from run_status import RunStatus
+
+
+def record(pubchem_id, status='done'):
+    return {'pubchem_id': pubchem_id, 'status': status}
+
+
+def test_iter_results_streams_records_until_finished():
+    job = Job([{'pubchem_id': '1', 'smiles': 'C'}, {'pubchem_id': '2', 'smiles': 'CC'}])
+    job.add_result(record('1'))
+    results = job.iter_results(poll=0.05)
+    assert next(results)['pubchem_id'] == '1'
+
+    threading.Timer(0.1, job.add_result, args=(record('2', 'failed'),)).start()
+    assert [r['pubchem_id'] for r in results] == ['2']
+    assert job.summary()['state'] == 'finished'
+    assert (job.summary()['done'], job.summary()['failed']) == (1, 1)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'RESULTS_DIR', str(tmp_path))
+    monkeypatch.setattr(prediction_daemon, 'convert_to_canonical_smiles', None)
+    monkeypatch.setattr(prediction_daemon, 'create_driver', lambda worker_id: object())
+    monkeypatch.setattr(prediction_daemon, 'driver_alive', lambda driver: True)
+    monkeypatch.setattr(prediction_daemon, 'quit_driver', lambda driver: None)
+    monkeypatch.setattr(prediction_daemon, 'wait_for_result', lambda pubchem_id: None)
+    monkeypatch.setattr(prediction_daemon, 'log_message', lambda message: None)
+    return PredictionService(workers=1, status=RunStatus(total=0, status_file=str(tmp_path / 'status.json')))
+
+
+def finish(service, *jobs):
+    service.start()
+    for job in jobs:
+        list(job.iter_results(poll=0.05))
+    for _ in service.threads:
+        service.queue.put(prediction_daemon.STOP)
+    for thread in service.threads:
+        thread.join(timeout=5)
+
+
+def test_same_compound_in_two_jobs_is_predicted_once(service, monkeypatch):
+    calls = []
+    monkeypatch.setattr(prediction_daemon, 'process_with_retries',
+                        lambda driver, pubchem_id, smiles: calls.append(pubchem_id) or False)
+    first = service.submit([{'pubchem_id': '2244', 'smiles': 'C'}])
+    second = service.submit([{'pubchem_id': '2244', 'smiles': 'C'}, {'pubchem_id': '7', 'smiles': 'CC'}])
+    finish(service, first, second)
+
+    assert sorted(calls) == ['2244', '7']
+    assert [r['status'] for r in first.results] == ['failed']
+    assert sorted(r['pubchem_id'] for r in second.results) == ['2244', '7']
+
+
+def test_exception_in_prediction_gives_failed_record(service, monkeypatch):
+    def explode(driver, pubchem_id, smiles):
+        raise RuntimeError('browser crashed')
+
+    monkeypatch.setattr(prediction_daemon, 'process_with_retries', explode)
+    job = service.submit([{'pubchem_id': '1', 'smiles': 'C'}, {'pubchem_id': '2', 'smiles': 'CC'}])
+    finish(service, job)
+
+    assert [r['status'] for r in job.results] == ['failed', 'failed']
+    assert job.results[0]['error'] == 'browser crashed'
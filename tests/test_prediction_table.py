@@ -0,0 +1,47 @@
+"""Tests for the columnar prediction table"""
+
+import csv
+import io
+import math
+
+from prediction_table import PredictionTable, SHARED_VOCABULARIES
+
+
+def export(table):
+    buffer = io.StringIO()
+    table.write_csv(csv.writer(buffer))
+    return buffer.getvalue().splitlines()
+
+
+def make_table(compound, probability='0.7'):
+    table = PredictionTable()
+    table.append(compound, 'Toxicity', 'Cytotoxicity', 'Active', probability)
+    return table
+
+
+def test_shared_vocabularies_stay_flat_over_distinct_inputs():
+    make_table('CCO')
+    sizes = {field: len(vocabulary) for field, vocabulary in SHARED_VOCABULARIES.items()}
+    for i in range(5000):
+        make_table('C' * (i + 1))
+    assert 'input' not in SHARED_VOCABULARIES
+    assert {field: len(vocabulary) for field, vocabulary in SHARED_VOCABULARIES.items()} == sizes
+
+
+def test_invalid_probability_keeps_raw_string_on_export():
+    table = make_table('CCO', 'n/a')
+    table.append('CCO', 'Toxicity', 'Hepatotoxicity', 'Inactive', '')
+    assert math.isnan(list(table)[0][-1])
+    lines = export(table)
+    assert lines[0].endswith(',n/a')
+    assert lines[1].endswith(',')
+
+
+def test_extend_and_filter_carry_inputs_and_raw_probabilities():
+    merged = make_table('CCO', '0.9')
+    merged.extend(make_table('c1ccccc1', 'n/a'))
+    assert [row[0] for row in merged] == ['CCO', 'c1ccccc1']
+
+    subset = merged.filter(input='c1ccccc1')
+    assert [row[0] for row in subset] == ['c1ccccc1']
+    assert export(subset)[0].endswith(',n/a')
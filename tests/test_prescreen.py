@@ -0,0 +1,28 @@
+"""Tests for the pre-screen rules"""
+
+import pytest
+
+pytest.importorskip('rdkit')
+
+from prescreen import screen_smiles
+
+
+@pytest.mark.parametrize('smiles', [
+    'CC(=O)[O-].[Na+]',                 # sodium acetate
+    '[K+].[O-]C(=O)c1ccccc1',           # potassium benzoate
+    'C[N+](C)(C)C.[Cl-]',               # tetramethylammonium chloride
+    'CC(=O)Oc1ccccc1C(=O)O',
+])
+def test_accepted(smiles):
+    assert screen_smiles(smiles) is None
+
+
+@pytest.mark.parametrize('smiles, reason', [
+    ('not a smiles', 'invalid_smiles'),
+    ('[Na+].[Cl-]', 'disallowed_element: Na'),
+    ('O.O', 'no_carbon'),
+    ('C[Hg]C', 'disallowed_element: Hg'),  # metal bonded into the organic fragment
+    ('[Na+].[Na+].[O-]S(=O)(=O)[O-]', 'no_carbon'),  # inorganic salt
+])
+def test_rejected(smiles, reason):
+    assert screen_smiles(smiles).startswith(reason)
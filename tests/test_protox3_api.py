@@ -0,0 +1,112 @@
+"""Tests for batch querying with quota accounting"""
+
+import csv
+import sys
+
+import pytest
+
+pytest.importorskip('requests')
+
+import config
+import protox3_api
+from api_quota import QuotaLedger
+from name_cache import NameResolver
+
+
+def prediction(compound):
+    return {'input': compound, 'type': 'Toxicity', 'target': 'Cytotoxicity',
+            'prediction': 'Inactive', 'probability': '0.61'}
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Record single and batch queries; answers are set per test"""
+    calls = {'single': [], 'batch': [], 'batch_responses': []}
+
+    def query_protox(compound, input_type="name", models=None, quiet=False, resolver=None):
+        calls['single'].append(compound)
+        return {'predictions': [prediction(compound)]}
+
+    def query_protox_batch(compounds, input_type="name", models=None, quiet=False):
+        calls['batch'].append(list(compounds))
+        if calls['batch_responses']:
+            return calls['batch_responses'].pop(0)
+        return {'predictions': [prediction(compound) for compound in compounds]}
+
+    monkeypatch.setattr(protox3_api, 'query_protox', query_protox)
+    monkeypatch.setattr(protox3_api, 'query_protox_batch', query_protox_batch)
+    monkeypatch.setattr(protox3_api, 'REQUEST_DELAY', 0)
+    monkeypatch.setattr(protox3_api, 'BATCH_RETRY_DELAY', 0)
+    return calls
+
+
+def test_failed_batch_is_retried_not_fanned_out(calls, tmp_path):
+    ledger = QuotaLedger(str(tmp_path / 'ledger.json'), daily_limit=100)
+    calls['batch_responses'] = [None] * (protox3_api.BATCH_RETRIES + 1)
+    results, requests, _ = protox3_api.query_with_fallback(['a', 'b', 'c'], quiet=True, ledger=ledger)
+    assert calls['single'] == []
+    assert requests == protox3_api.BATCH_RETRIES + 1
+    assert ledger.used_today() == requests
+    assert set(results) == {'a', 'b', 'c'} and not any(results.values())
+
+
+def test_retry_of_failed_batch_can_succeed(calls):
+    calls['batch_responses'] = [None, {'predictions': [prediction('a'), prediction('b')]}]
+    results, requests, _ = protox3_api.query_with_fallback(['a', 'b'], quiet=True)
+    assert requests == 2 and calls['single'] == []
+    assert len(results['a']) == 1 and len(results['b']) == 1
+
+
+def test_compound_missing_from_batch_response_is_queried_alone(calls):
+    calls['batch_responses'] = [{'predictions': [prediction('a')]}]
+    results, requests, _ = protox3_api.query_with_fallback(['a', 'b'], quiet=True)
+    assert calls['single'] == ['b']
+    assert requests == 2 and len(results['b']) == 1
+
+
+def test_batch_is_split_only_when_enough_names_are_cached(calls, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'NAME_CACHE_MIN_SPLIT_FRACTION', 0.5)
+    resolver = NameResolver(str(tmp_path / 'names.sqlite'))
+    resolver.add('aspirin', 'CC(=O)Oc1ccccc1C(=O)O')
+    names = ['aspirin', 'caffeine', 'vorinostat']
+    calls['batch_responses'] = [{'predictions': [prediction(name) for name in names]}]
+    results, requests, _ = protox3_api.query_with_fallback(names, quiet=True, resolver=resolver)
+    assert requests == 1 and calls['batch'] == [names]
+
+    resolver.add('caffeine', 'Cn1cnc2c1c(=O)n(C)c(=O)n2C')
+    calls['batch'] = []
+    calls['batch_responses'] = [{'predictions': [prediction('CC(=O)Oc1ccccc1C(=O)O'),
+                                                 prediction('Cn1cnc2c1c(=O)n(C)c(=O)n2C')]}]
+    results, requests, _ = protox3_api.query_with_fallback(names, quiet=True, resolver=resolver)
+    assert requests == 2 and calls['single'] == ['vorinostat']
+    assert all(len(results[name]) == 1 for name in names)
+    resolver.close()
+
+
+def test_quota_refusal_is_reported(calls, tmp_path):
+    ledger = QuotaLedger(str(tmp_path / 'ledger.json'), daily_limit=1)
+    calls['batch_responses'] = [{'predictions': [prediction('a')]}]
+    results, requests, quota_exhausted = protox3_api.query_with_fallback(['a', 'b'], quiet=True, ledger=ledger)
+    assert quota_exhausted and requests == 1
+    assert set(results) == {'a'}
+
+    results, requests, quota_exhausted = protox3_api.query_with_fallback(['a', 'a'], quiet=True)
+    assert not quota_exhausted and requests == 1 and set(results) == {'a'}
+
+
+def test_duplicate_compounds_do_not_stop_the_run(calls, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(config, 'API_QUOTA_LEDGER_FILE', str(tmp_path / 'ledger.json'))
+    output = tmp_path / 'results.csv'
+    monkeypatch.setattr(sys, 'argv', ['protox3_api.py', '-b', '2', '--no-name-cache', '-o', str(output),
+                                      'aspirin,aspirin,caffeine,ibuprofen'])
+    protox3_api.main()
+    assert 'limit reached' not in capsys.readouterr().out
+    with open(output, newline='') as f:
+        queried = {row[0] for row in csv.reader(f)}
+    assert {'aspirin', 'caffeine', 'ibuprofen'} <= queried
+
+
+def test_zero_daily_limit_is_not_replaced_by_default(tmp_path):
+    ledger = QuotaLedger(str(tmp_path / 'ledger.json'), daily_limit=0)
+    assert ledger.daily_limit == 0
+    assert ledger.acquire(1) == 0
@@ -0,0 +1,59 @@
+"""Tests for the streaming ProTox-3 client"""
+
+import io
+import tracemalloc
+
+import pytest
+
+pytest.importorskip('requests')
+
+import protox_client
+from api_quota import QuotaLedger
+from prediction_table import PredictionTable, SHARED_VOCABULARIES
+from protox_client import ProToxClient, iter_input_lines
+
+
+def test_iter_input_lines_keeps_commas_in_names():
+    lines = io.StringIO("2,4-dinitrophenol\n\n aspirin \n")
+    assert list(iter_input_lines(lines)) == ['2,4-dinitrophenol', 'aspirin']
+
+
+def test_iter_input_lines_splits_on_first_key_delimiter():
+    lines = io.StringIO("7475\t2,4-dinitrophenol\n2244,CC(=O)Oc1ccccc1C(=O)O\nCCO\n")
+    assert list(iter_input_lines(lines, '\t')) == [
+        ('7475', '2,4-dinitrophenol'), '2244,CC(=O)Oc1ccccc1C(=O)O', 'CCO']
+    lines = io.StringIO("123,2,4-dinitrophenol\n")
+    assert list(iter_input_lines(lines, ',')) == [('123', '2,4-dinitrophenol')]
+
+
+def fake_query(compounds, input_type, models, quiet=False, ledger=None, resolver=None):
+    table = PredictionTable()
+    for compound in compounds:
+        table.append(compound, 'Toxicity', 'Cytotoxicity', 'Inactive', '0.61')
+    return {compound: table for compound in compounds}, len(compounds), False
+
+
+def test_predict_many_memory_stays_flat_over_distinct_inputs(monkeypatch, tmp_path):
+    monkeypatch.setattr(protox_client, 'query_with_fallback', fake_query)
+    monkeypatch.setattr(protox_client, 'REQUEST_DELAY', 0)
+    client = ProToxClient(max_concurrency=4, ledger=QuotaLedger(str(tmp_path / 'ledger.json')))
+    compounds = (f"C{'C' * (i % 50)}O.{i}" for i in range(6000))
+    results = client.predict_many(compounds)
+
+    for _ in range(1000):
+        assert next(results).ok
+    vocabulary_sizes = {field: len(vocabulary) for field, vocabulary in SHARED_VOCABULARIES.items()}
+    tracemalloc.start()
+    try:
+        for _ in range(1000):
+            next(results)
+        baseline = tracemalloc.get_traced_memory()[0]
+        for _ in range(4000):
+            next(results)
+        growth = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+        results.close()
+
+    assert {field: len(vocabulary) for field, vocabulary in SHARED_VOCABULARIES.items()} == vocabulary_sizes
+    assert growth < 256 * 1024
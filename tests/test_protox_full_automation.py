@@ -0,0 +1,71 @@
+"""Tests for shard handling and page-load bookkeeping of the batch runner"""
+
+import sys
+import time
+
+import pytest
+
+pytest.importorskip('selenium')
+
+import config
+import protox_full_automation
+from protox_full_automation import load_input_page, page_load_summary, shard_index
+
+
+def test_shard_index_from_plan_file_names():
+    assert shard_index('data/shards/shard_3.csv') == 3
+    assert shard_index('data/canonical_smiles.csv') is None
+    assert shard_index('shard_3.csv.bak') is None
+
+
+class FakeDriver:
+    def get(self, url):
+        pass
+
+    def execute_script(self, script):
+        return [9, 10]
+
+
+def test_warm_up_load_is_recorded_separately(monkeypatch):
+    monkeypatch.setattr(protox_full_automation, '_page_loads', {'cold': [], 'warm': [], 'warm-up': []})
+    load_input_page(FakeDriver(), warm_up_load=True)
+    assert page_load_summary().startswith('warm-up 1 ')
+    load_input_page(FakeDriver())
+    assert page_load_summary().startswith('warm 1 ')
+
+
+def test_timeouts_without_rdkit_fall_back_to_max_wait(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'cost_model', None)  # import fails as without RDKit
+    monkeypatch.setattr(config, 'ADAPTIVE_TIMEOUT', True)
+    assert protox_full_automation.choose_timeout('CCO') == protox_full_automation.MAX_WAIT_TIME
+    protox_full_automation.record_duration('1', 'CCO', 1.0, 'success', 900)
+
+
+def test_results_page_is_captured_and_judged_by_the_writer(monkeypatch):
+    page = '<html><body>Toxicity Model Report<table><tr><td>Target</td></tr></table></body></html>'
+    scripts, submitted, outcomes, durations = [], [], [], []
+
+    class Driver:
+        page_source = page
+
+        def execute_script(self, script):
+            scripts.append(script)
+
+    class Writer:
+        def submit(self, pubchem_id, html):
+            submitted.append((pubchem_id, html))
+
+        def when_written(self, pubchem_id, callback):
+            outcomes.append(callback)
+
+    monkeypatch.setattr(config, 'RESULT_POLL_INTERVAL', 0)
+    monkeypatch.setattr(protox_full_automation, 'log_message', lambda message: None)
+    monkeypatch.setattr(protox_full_automation, 'remove_job', lambda pubchem_id: None)
+    monkeypatch.setattr(protox_full_automation, 'get_result_writer', lambda: Writer())
+    monkeypatch.setattr(protox_full_automation, 'record_duration',
+                        lambda pubchem_id, smiles, seconds, outcome, timeout: durations.append(outcome))
+
+    assert protox_full_automation.wait_for_results(Driver(), '7', 'CCO', time.time(), 600)
+    assert submitted == [('7', page)] and scripts == []  # No in-browser table walk
+    outcomes[0](False)  # The writer found no Cytotoxicity row
+    assert durations == ['extract_failed']
@@ -0,0 +1,71 @@
+"""Tests for filter parsing and index queries over the prediction store"""
+
+import numpy as np
+import pytest
+
+from prediction_stats import PredictionStore
+from query_predictions import QueryError, QueryIndex, parse_filter
+
+
+def test_parse_filter_groups_and_before_or():
+    groups = parse_filter("cyto=active AND dili.probability>=0.7 or MUTA != Inactive")
+    assert groups == [
+        [{'model': 'cyto', 'op': '=', 'prediction': 'Active'},
+         {'model': 'dili', 'op': '>=', 'value': 0.7}],
+        [{'model': 'MUTA', 'op': '!=', 'prediction': 'Inactive'}],
+    ]
+
+
+@pytest.mark.parametrize('expression', ["cyto=Maybe", "cyto>Active", "dili.probability=0.5", "AND cyto=Active"])
+def test_parse_filter_rejects_invalid_terms(expression):
+    with pytest.raises(QueryError):
+        parse_filter(expression)
+
+
+@pytest.fixture
+def index():
+    """Compounds 100-103; cyto and dili predictions, 103 has no dili row"""
+    rows = [  # (compound, model, active, probability)
+        (0, 0, True, 0.9), (1, 0, False, 0.2), (2, 0, True, 0.6), (3, 0, False, np.nan),
+        (0, 1, True, 0.8), (1, 1, True, 0.75), (2, 1, False, 0.3),
+    ]
+    compound, model, active, probability = zip(*rows)
+    store = PredictionStore(
+        np.array(['100', '101', '102', '103']), np.zeros(4, dtype=np.int64),
+        np.array(['cyto', 'dili']), np.array(['Cytotoxicity', 'Hepatotoxicity']),
+        np.array(['Toxicity end points', 'Organ toxicity']),
+        np.array(compound, dtype=np.int32), np.array(model, dtype=np.int16),
+        np.array(active, dtype=bool), np.array(probability, dtype=np.float32))
+    return QueryIndex.build(store)
+
+
+def matching_ids(index, expression):
+    return index.store.compound_ids[index.evaluate(parse_filter(expression))].tolist()
+
+
+def test_prediction_and_probability_terms(index):
+    assert matching_ids(index, "cyto=Active") == ['100', '102']
+    assert matching_ids(index, "cyto!=Active") == ['101', '103']
+    assert matching_ids(index, "dili.probability>0.75") == ['100']
+    assert matching_ids(index, "dili.probability>=0.75") == ['100', '101']
+    assert matching_ids(index, "cyto.probability<0.6") == ['101']  # NaN never matches
+
+
+def test_and_or_combination(index):
+    assert matching_ids(index, "cyto=Active AND dili=Active") == ['100']
+    assert matching_ids(index, "cyto=Active AND dili=Active OR dili.probability<0.5") == ['100', '102']
+
+
+def test_model_shorthand_is_case_insensitive(index):
+    assert matching_ids(index, "CYTO=active") == ['100', '102']
+
+
+def test_unknown_model_is_a_query_error(index):
+    with pytest.raises(QueryError):
+        matching_ids(index, "carcino=Active")
+
+
+def test_values_marks_missing_rows(index):
+    found, active, probability = index.values(1, np.array([0, 3], dtype=np.int32))
+    assert found.tolist() == [True, False]
+    assert bool(active[0]) and probability[0] == pytest.approx(0.8)
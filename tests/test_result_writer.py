@@ -0,0 +1,43 @@
+"""Tests for the background report writer"""
+
+import pytest
+
+pytest.importorskip('lxml')
+
+import config
+from result_writer import ResultWriterPool
+
+PAGE = '<table><tr><td>Toxicity end points</td><td>Cytotoxicity</td><td>cyto</td><td>Active</td><td>0.7</td></tr></table>'
+
+
+def test_outcome_is_reported_after_the_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ARCHIVE_RESULTS_PAGES', False)
+    pool = ResultWriterPool(workers=1, output_dir=str(tmp_path), log=lambda message: None)
+    outcomes = []
+    pool.submit('2244', PAGE)
+    pool.when_written('2244', lambda written: outcomes.append((written, (tmp_path / 'CID_2244.csv').exists())))
+    pool.shutdown()
+    assert outcomes == [(True, True)]
+    assert (tmp_path / 'CID_2244.csv').read_text().startswith('Toxicity end points,Cytotoxicity,cyto,Active')
+
+
+def test_failed_write_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ARCHIVE_RESULTS_PAGES', False)
+    pool = ResultWriterPool(workers=1, output_dir=str(tmp_path / 'missing'), log=lambda message: None)
+    outcomes = []
+    pool.submit('1', PAGE)
+    pool.when_written('1', outcomes.append)
+    pool.shutdown()
+    pool.when_written('2', outcomes.append)  # Nothing pending and no report
+    assert outcomes == [False, False]
+
+
+def test_page_without_cytotoxicity_data_is_a_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'ARCHIVE_RESULTS_PAGES', False)
+    pool = ResultWriterPool(workers=1, output_dir=str(tmp_path), log=lambda message: None)
+    outcomes = []
+    pool.submit('3', '<html><body><p>Toxicity Model Report</p><table><tr><td>Target</td></tr></table></body></html>')
+    pool.when_written('3', outcomes.append)
+    pool.shutdown()
+    assert outcomes == [False]
+    assert not (tmp_path / 'CID_3.csv').exists()
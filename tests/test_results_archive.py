@@ -0,0 +1,45 @@
+"""Tests for table extraction from results pages"""
+
+import pytest
+
+pytest.importorskip('lxml')
+
+from results_archive import extract_cytotoxicity_row, extract_table_rows
+
+
+def test_rows_with_omitted_end_tags():
+    html = '<table><tr><td>a</td><td>b</td><tr><td>c</td></table>'
+    assert extract_table_rows(html) == [['a', 'b'], ['c']]
+
+
+def test_cells_without_end_tags_and_implied_row():
+    html = '<table><td>Cytotoxicity<td>cyto<td>Active</table>'
+    assert extract_table_rows(html) == [['Cytotoxicity', 'cyto', 'Active']]
+
+
+def test_nested_table_rows_repeat_like_query_selector_all():
+    html = ('<table>'
+            '<tr><td>x<table><tr><td>in</td></tr></table></td></tr>'
+            '<tr><th>h</th><td>y &amp; z</td></tr>'
+            '</table>')
+    assert extract_table_rows(html) == [['xin', 'in'], ['in'], ['h', 'y & z'], ['in']]
+
+
+def test_rows_outside_tables_are_ignored():
+    assert extract_table_rows('<tr><td>a</td></tr><p>text</p>') == []
+
+
+def test_loose_cells_in_a_table_section_form_a_row():
+    html = '<table><tbody><td>a<td>b<tr><td>c</tr></tbody></table>'
+    assert extract_table_rows(html) == [['a', 'b'], ['c']]
+
+
+def test_empty_page_has_no_rows():
+    assert extract_table_rows('') == []
+
+
+def test_cytotoxicity_row_needs_five_cells():
+    row = ['Toxicity end points', 'Cytotoxicity', 'cyto', 'Active', '0.7']
+    assert extract_cytotoxicity_row([['Target'], row]) == row
+    assert extract_cytotoxicity_row([['Cytotoxicity', 'cyto', 'Active']]) is None
+    assert extract_cytotoxicity_row([['Hepatotoxicity', 'dili', 'Active', '0.6', 'x']]) is None
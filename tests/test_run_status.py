@@ -0,0 +1,43 @@
+"""Tests for the live run status"""
+
+import json
+import threading
+
+import config
+from run_status import RunStatus, status_file_for, status_files
+
+
+def test_shards_get_their_own_status_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'RUN_STATUS_FILE', str(tmp_path / 'run_status.json'))
+    monkeypatch.setattr(config, 'DURATION_HISTORY_FILE', str(tmp_path / 'durations.csv'))
+    assert status_file_for() == config.RUN_STATUS_FILE
+    for shard in (10, 2):
+        status = RunStatus(total=5, status_file=status_file_for(shard))
+        status.finish_compound(0, str(shard), True, 60.0)
+        status.close()
+    assert [path.rsplit('/', 1)[1] for path in status_files()] == [
+        'run_status.shard_2.json', 'run_status.shard_10.json']
+    with open(status_file_for(2), encoding='utf-8') as f:
+        assert json.load(f)['completed'] == 1
+
+
+def test_concurrent_writes_leave_a_valid_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'DURATION_HISTORY_FILE', str(tmp_path / 'durations.csv'))
+    status = RunStatus(total=100, workers=8, status_file=str(tmp_path / 'status.json'))
+
+    def work(worker_id):
+        for i in range(50):
+            status.start_compound(worker_id, str(i))
+            status.finish_compound(worker_id, str(i), True, 1.0)
+            status.write(force=True)
+
+    threads = [threading.Thread(target=work, args=(worker_id,)) for worker_id in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    status.close()
+
+    with open(tmp_path / 'status.json', encoding='utf-8') as f:
+        assert json.load(f)['completed'] == 400
+    assert not list(tmp_path.glob('*.tmp'))